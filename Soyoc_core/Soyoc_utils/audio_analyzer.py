@@ -1,259 +1,362 @@
-import pyaudio, wave, librosa, threading, time, math, logging
+import pyaudio, wave, librosa, threading, os, math, time, logging, datetime
 import numpy as np
 
+SAMPLE_RATE = 44100         # 采样率
+CAPTURE_CHUNK = 1024        # 采集线程每次读取的帧数（约23ms）
+RING_SECONDS = 10           # 环形缓冲区保存的音频时长（秒）
+LOUDNESS_HOP = SAMPLE_RATE  # 响度检测的步长与窗口（1秒）
+ONSET_WINDOW = SAMPLE_RATE  # 重音检测的窗口（1秒）
+ONSET_HOP = SAMPLE_RATE // 2    # 重音检测的步长，每次检查窗口内最近 0.5 秒
+ONSET_CHUNK = 2048          # onset 动态阈值参数的换算单位（约46ms）
+STOP_TIMEOUT = 0.2          # stop() 等待线程退出的最长时间（秒），采集线程每次读取不超过一个 CAPTURE_CHUNK
+
+class AudioRingBuffer:
+    def __init__(self, capacity: int):
+        """
+        单写多读的 float32 环形缓冲区：采集线程写入，各分析线程按各自的步长读取最近的窗口
+
+        数据在长度为 2 * capacity 的数组中写两份，任意不超过 capacity 的最近窗口都是连续的一段，
+        window() 直接返回视图而不复制；视图中的数据在写入方再写入 capacity - 窗口长度 个采样之前保持有效
+
+        :param capacity: 缓冲区保存的采样数
+        """
+        self.capacity = capacity
+        self._data = np.zeros(2 * capacity, dtype=np.float32)
+        self.written = 0    # 累计写入的采样数
+        self._condition = threading.Condition()
+
+    def write(self, samples: np.ndarray):
+        """写入一段采样并唤醒等待中的读取方，只能由一个线程调用"""
+        count = len(samples)
+        if count > self.capacity:
+            samples = samples[-self.capacity:]
+            self.written += count - self.capacity
+            count = self.capacity
+        start = self.written % self.capacity
+        first = min(count, self.capacity - start)
+        for offset in (start, start + self.capacity):
+            self._data[offset:offset + first] = samples[:first]
+        if first < count:
+            rest = count - first
+            self._data[:rest] = samples[first:]
+            self._data[self.capacity:self.capacity + rest] = samples[first:]
+        with self._condition:
+            self.written += count
+            self._condition.notify_all()
+
+    def window(self, length: int, end: int = None) -> np.ndarray:
+        """
+        读取以累计采样位置 end (默认为最新) 结尾的 length 个采样
+
+        :return: 缓冲区的只读视图，尚未写入足够的采样时为 None
+        """
+        end = self.written if end is None else end
+        if length > self.capacity or end < length or end > self.written or self.written - end > self.capacity - length:
+            return None
+        stop = end % self.capacity + self.capacity
+        view = self._data[stop - length:stop]
+        view.flags.writeable = False
+        return view
+
+    def wait_until(self, position: int, stop_event: threading.Event, timeout: float = 0.1) -> bool:
+        """
+        等待累计写入的采样数达到 position
+
+        :return: 是否已达到，stop_event 置位时返回 False
+        """
+        with self._condition:
+            while self.written < position:
+                if stop_event.is_set():
+                    return False
+                self._condition.wait(timeout)
+        return not stop_event.is_set()
+
+    def notify(self):
+        """唤醒等待中的读取方，用于停止时让其检查 stop_event"""
+        with self._condition:
+            self._condition.notify_all()
+
 class AudioAnalyzer:
     """音频分析类"""
-    def __init__(self, loudness_threshold=-70):
-        self._audio_lock = threading.Lock()             # 线程锁
+    def __init__(self, loudness_threshold=-70, debug_dump_dir=None, on_loudness_changed=None, on_period_detected=None):
+        """
+        构造时不打开任何音频设备，start() 后才开始采集，stop() 关闭音频流与全部线程并释放 PortAudio
+
+        只打开一个音频流：采集线程把 int16 采样转换为 float32 写入环形缓冲区，
+        响度、节拍周期与重音检测按各自的步长从缓冲区读取窗口
+
+        :param loudness_threshold: 响度阈值 (dB)
+        :param debug_dump_dir: 调试用，节拍分析所用的音频另存为 WAV 的目录，默认不保存
+        :param on_loudness_changed: 响度越过阈值时在采集线程中调用，参数为新的响度标志
+        :param on_period_detected: 检测到节拍周期时在分析线程中调用，参数为节拍周期 (秒，大于 0)
+        """
         self.period = 0.0                               # 存储检测到的节拍周期
         self.is_accent = False                          # 重音触发标志
         self._recording_thread = None                   # 录音及节拍分析线程初始化
         self._monitoring_thread = None                  # 节拍检测线程初始化
+        self._capture_thread = None                     # 采集及响度检测线程初始化
         self.loudness_flag = False                      # 显式初始化响度标志位
         self.loudness_threshold = loudness_threshold    # 响度阈值
-        self.pa = pyaudio.PyAudio()
+        self.debug_dump_dir = debug_dump_dir
+        self.on_loudness_changed = on_loudness_changed
+        self.on_period_detected = on_period_detected
+        self.pa = None
+        self.device_index = None
         self.stream = None
+        self.ring = AudioRingBuffer(SAMPLE_RATE * RING_SECONDS)
         self._stop_event = threading.Event()
 
-        # 响度检测线程启动
-        self._loudness_thread = threading.Thread(target=self._loudness_monitor, daemon=True)
-        self._loudness_thread.start()
-
     def __del__(self):
-        self._stop_event.set()
-        if self.stream:
-            self.stream.close()
-        self.pa.terminate()
-
-    def _loudness_monitor(self):
-        """实时响度检测线程（每秒检测一次）"""
-        device_index = self.find_stereo_mix_device()
-        self.stream = self.pa.open(             # 打开音频流
-            format=pyaudio.paInt16,
-            channels=1,
-            rate=44100,
-            input=True,
-            input_device_index=device_index,
-            frames_per_buffer=44100             # 1秒缓冲区
-        )
-        
-        logging.info("响度检测线程已启动")
-        while not self._stop_event.is_set():
+        self.stop()
+
+    def start(self):
+        """
+        初始化 PortAudio，打开音频流并启动采集线程
+
+        :return: 是否成功启动，找不到录音设备或无法打开音频流时为 False
+        """
+        if self.is_running():
+            return True
+        # 每次启动使用新的停止标志，上次 stop() 时尚未退出的分析线程仍看到已置位的旧标志
+        self._stop_event = threading.Event()
+        self.loudness_flag = False
+        self.period = 0.0
+        self.pa = pyaudio.PyAudio()
+        try:
+            self.device_index = self.find_stereo_mix_device()
+            self.stream = self.pa.open(     # 打开音频流
+                format=pyaudio.paInt16,
+                channels=1,
+                rate=SAMPLE_RATE,
+                input=True,
+                input_device_index=self.device_index,
+                frames_per_buffer=CAPTURE_CHUNK
+            )
+        except Exception as e:
+            logging.error(f"音频流打开失败: {e}")
+            self.pa.terminate()
+            self.pa = None
+            return False
+
+        self._capture_thread = threading.Thread(target=self._capture, args=(self.pa, self.stream, self._stop_event), daemon=True)
+        self._capture_thread.start()
+        return True
+
+    def is_running(self):
+        """采集是否在运行"""
+        return self._capture_thread is not None and self._capture_thread.is_alive()
+
+    def _capture(self, pa, stream, stop_event: threading.Event):
+        """
+        采集线程：读取音频流写入环形缓冲区，并每秒检测一次响度；
+        停止后由本线程关闭音频流并释放 PortAudio，stop() 不必等待读取结束
+        """
+        logging.info("音频采集线程已启动")
+        samples = np.empty(CAPTURE_CHUNK, dtype=np.float32)
+        next_loudness = self.ring.written + LOUDNESS_HOP
+        while not stop_event.is_set():
             try:
-                # 读取1秒音频数据
-                data = self.stream.read(44100, exception_on_overflow=False)
-                audio_data = np.frombuffer(data, dtype=np.int16)
-                
-                # 计算RMS（均方根）声压级
-                rms = np.sqrt(np.mean(audio_data.astype(np.float32)**2))
-                db = 20 * math.log10(rms / 32768) if rms != 0 else 0  # 16bit PCM归一化
-                
-                # 转换为线性比例比较
-                if not self.loudness_flag and db > self.loudness_threshold: # 如果上一时刻响度低于阈值，这一时刻高于阈值
-                    self.loudness_flag = True                               # 响度标志置 True
-                elif self.loudness_flag and db < self.loudness_threshold:   # 如果上一时刻响度高于阈值，这一时刻低于阈值
-                    self.loudness_flag = False                              # 响度标志置 False
-                
+                data = stream.read(CAPTURE_CHUNK, exception_on_overflow=False)
+                # 16bit PCM归一化
+                np.multiply(np.frombuffer(data, dtype=np.int16), 1 / 32768, out=samples, casting="unsafe")
+                self.ring.write(samples)
+                if self.ring.written >= next_loudness:
+                    next_loudness += LOUDNESS_HOP
+                    self._update_loudness(self.ring.window(LOUDNESS_HOP), stop_event)
             except Exception as e:
-                logging.warning(f"响度检测异常: {e}")
-                time.sleep(1)
+                logging.warning(f"音频采集异常: {e}")
+                stop_event.wait(1)
+
+        try:
+            stream.close()
+        except OSError:
+            pass
+        pa.terminate()
+        if self.pa is pa:
+            self.pa = self.stream = None
+        self.ring.notify()
+        logging.info("音频采集线程已终止")
+
+    def _update_loudness(self, audio_data, stop_event: threading.Event):
+        """按最近 1 秒的音频更新响度标志，越过阈值时调用 on_loudness_changed"""
+        # 计算RMS（均方根）声压级
+        rms = math.sqrt(float(np.dot(audio_data, audio_data)) / len(audio_data))
+        db = 20 * math.log10(rms) if rms != 0 else 0
+
+        # 转换为线性比例比较
+        if not self.loudness_flag and db > self.loudness_threshold: # 如果上一时刻响度低于阈值，这一时刻高于阈值
+            self.loudness_flag = True                               # 响度标志置 True
+        elif self.loudness_flag and db < self.loudness_threshold:   # 如果上一时刻响度高于阈值，这一时刻低于阈值
+            self.loudness_flag = False                              # 响度标志置 False
+        else:
+            return
+        if self.on_loudness_changed is not None and not stop_event.is_set():
+            self.on_loudness_changed(self.loudness_flag)
 
     def find_stereo_mix_device(self):
-        """查找桌面音频录音设备"""
-        p = pyaudio.PyAudio()
-        device_count = p.get_device_count()
+        """查找桌面音频录音设备，使用 start() 中初始化的 PortAudio 实例"""
+        device_count = self.pa.get_device_count()
         for i in range(device_count):
-            device_info = p.get_device_info_by_index(i)
+            device_info = self.pa.get_device_info_by_index(i)
             if "立体声混音" in device_info["name"] and device_info["hostApi"] == 0:
                 logging.info(f"找到立体声混音设备: {device_info['name']} (索引: {i})")
-                p.terminate()
                 return i
-        p.terminate()
         raise Exception("未找到立体声混音设备，请检查设备是否启用")
 
-    def record_and_analyze(self, duration=3):
-        """录音并分析节拍周期"""
-        output_file = "./temp/beats_check_record.wav"
-        format = pyaudio.paInt16
-        channels = 2
-        rate = 44100
-        chunk = 1024
-        stream = None  # 显式初始化流变量
+    def record_and_analyze(self, duration=3, stop_event: threading.Event = None):
+        """
+        从环形缓冲区取得接下来 duration 秒的音频并分析节拍周期，
+        未检测到节拍时在响度仍高于阈值期间继续分析下一段，直到得到周期
 
-        try:
-            # 添加设备获取异常处理
-            try:
-                device_index = self.find_stereo_mix_device()
-            except Exception as e:
-                logging.error(f"设备获取失败: {e}")
-                return
+        :param stop_event: 启动本线程时的停止标志，默认为当前的停止标志
+        """
+        if stop_event is None:
+            stop_event = self._stop_event
+        length = int(SAMPLE_RATE * duration)
 
-            p = pyaudio.PyAudio()
-            stream = p.open(
-                format=format,
-                channels=channels,
-                rate=rate,
-                input=True,
-                input_device_index=device_index,
-                frames_per_buffer=chunk
-            )
+        try:
+            while self.loudness_flag and not stop_event.is_set():
+                logging.info("开始录制...")
+                end = self.ring.written + length
+                if not self.ring.wait_until(end, stop_event):
+                    return
+                audio_data = self.ring.window(length, end)
+                if audio_data is None:
+                    logging.warning("录音数据已被覆盖")
+                    continue
+                logging.info("录制完成")
 
-            logging.info("开始录制...")
-            frames = []
-            for _ in range(0, int(rate / chunk * duration)):
-                data = stream.read(chunk, exception_on_overflow=False)
-                frames.append(data)
-            logging.info("录制完成")
+                if self.debug_dump_dir:
+                    self.dump_audio(audio_data)
 
-            # 保存并分析音频
-            with wave.open(output_file, 'wb') as wf:
-                wf.setnchannels(channels)
-                wf.setsampwidth(p.get_sample_size(format))
-                wf.setframerate(rate)
-                wf.writeframes(b''.join(frames))
-
-            self.period = self.analyze_beats(output_file, rate)
-            logging.info(f"节拍周期已更新为: {self.period:.2f}秒")
+                # 直接分析缓冲区中的音频
+                period = self.analyze_beats(audio_data, SAMPLE_RATE)
+                if stop_event.is_set():
+                    return      # 分析期间已停止，丢弃结果
+                self.period = period
+                if self.period <= 0:
+                    logging.info("未检测到节拍，重新检测")
+                    continue
+                logging.info(f"节拍周期已更新为: {self.period:.2f}秒")
+                if self.on_period_detected is not None:
+                    self.on_period_detected(self.period)
+                return
 
         except Exception as e:
             logging.error(f"录制异常: {str(e)}")  # 捕获所有异常
-        finally:
-            if stream:
-                try:
-                    stream.close()  # 直接关闭流
-                except OSError:
-                    pass
-            p.terminate()
-    
+
     def period_reset(self):
         """重置周期变量"""
         self.period = 0.0
 
-    def analyze_beats(self, audio_file, sample_rate):
-        """分析音频文件的节拍周期"""
-        y, sr = librosa.load(audio_file, sr=sample_rate, mono=True)
-        tempo, beats = librosa.beat.beat_track(y=y, sr=sr)
-        beat_times = librosa.frames_to_time(beats, sr=sr)
+    def dump_audio(self, audio_data):
+        """调试用：把音频保存为 debug_dump_dir 中的 16bit WAV"""
+        output_file = os.path.join(self.debug_dump_dir, f"beats_check_{datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.wav")
+        try:
+            os.makedirs(self.debug_dump_dir, exist_ok=True)
+            with wave.open(output_file, 'wb') as wf:
+                wf.setnchannels(1)
+                wf.setsampwidth(2)
+                wf.setframerate(SAMPLE_RATE)
+                wf.writeframes((np.clip(audio_data, -1, 1) * 32767).astype(np.int16).tobytes())
+        except OSError as e:
+            logging.warning(f"音频保存失败: {e}")
+
+    def analyze_beats(self, audio_data, sample_rate):
+        """
+        分析音频的节拍周期
+
+        :param audio_data: 单声道 float32 音频
+        :param sample_rate: 采样率
+        """
+        tempo, beats = librosa.beat.beat_track(y=audio_data, sr=sample_rate)
+        beat_times = librosa.frames_to_time(beats, sr=sample_rate)
         intervals = np.diff(beat_times)
         return np.mean(intervals) if len(intervals) > 0 else 0.0
 
     def start_detection(self):
-        """启动检测流程"""
-        self._stop_event.clear()
+        """启动检测流程，已在运行的检测线程不会重复启动"""
+        if not self.is_running():
+            return
 
         # 启动录音及节拍分析线程
-        self._recording_thread = threading.Thread(target=self.record_and_analyze)
-        self._recording_thread.start()
+        if not self.record_and_analyze_is_alive():
+            self._recording_thread = threading.Thread(target=self.record_and_analyze, kwargs={"stop_event": self._stop_event}, daemon=True)
+            self._recording_thread.start()
 
         # 启动重音检测线程
-        self._monitoring_thread = threading.Thread(target=self._monitor_accent)
-        self._monitoring_thread.start()
-        
-    
+        if self._monitoring_thread is None or not self._monitoring_thread.is_alive():
+            self._monitoring_thread = threading.Thread(target=self._monitor_accent, args=(self._stop_event,), daemon=True)
+            self._monitoring_thread.start()
+
     def record_and_analyze_is_alive(self):
         """录音及分析线程运行标志"""
         if self._recording_thread is not None:          # 如果录音及分析线程已经启动
             return self._recording_thread.is_alive()
         return False
 
-    def _monitor_accent(self):
-        """使用librosa的onset检测实时监测重音"""
-        stream = None
-        retry_count = 0
-        with self._audio_lock:
-            try:
-                device_index = self.find_stereo_mix_device()
-                sr = 44100  # 采样率
-                chunk_size = 2048  # 每次读取的帧数（约46ms）
-                buffer_size = sr * 1  # 1秒的缓冲区
-                
-                stream = self.pa.open(
-                    format=pyaudio.paInt16,
-                    channels=1,
-                    rate=sr,
-                    input=True,
-                    input_device_index=device_index,
-                    frames_per_buffer=chunk_size
+    def _monitor_accent(self, stop_event: threading.Event):
+        """使用librosa的onset检测实时监测重音，每 0.5 秒检测一次最近 1 秒的音频"""
+        sr = SAMPLE_RATE
+        chunk_size = ONSET_CHUNK
+        try:
+            logging.info("开始实时重音监测（librosa onset检测）...")
+            position = self.ring.written
+            while True:
+                position = max(position + ONSET_HOP, ONSET_WINDOW)
+                if not self.ring.wait_until(position, stop_event):
+                    break
+                audio_buffer = self.ring.window(ONSET_WINDOW, position)
+                if audio_buffer is None:
+                    position = self.ring.written    # 检测落后于采集，跳到最新位置
+                    continue
+
+                # 计算onset强度
+                onset_env = librosa.onset.onset_strength(
+                    y=audio_buffer,
+                    sr=sr,
+                    aggregate=np.median,
+                    center=False
                 )
-                
-                logging.info("开始实时重音监测（librosa onset检测）...")
-                audio_buffer = np.zeros((buffer_size,), dtype=np.float32)
-                write_idx = 0
-                
-                while not self._stop_event.is_set() and retry_count < 3:
-                    try:
-                        # 读取音频数据
-                        data = stream.read(chunk_size, exception_on_overflow=False)
-                        chunk = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
-                        
-                        # 滑动更新缓冲区
-                        if write_idx + len(chunk) > buffer_size:
-                            overlap = write_idx + len(chunk) - buffer_size
-                            audio_buffer[:-overlap] = audio_buffer[overlap:]
-                            audio_buffer[-overlap:] = chunk[:overlap]
-                            write_idx = buffer_size
-                        else:
-                            audio_buffer[write_idx:write_idx+len(chunk)] = chunk
-                            write_idx += len(chunk)
-                        
-                        # 当缓冲区填满时进行检测
-                        if write_idx >= buffer_size:
-                            # 计算onset强度
-                            onset_env = librosa.onset.onset_strength(
-                                y=audio_buffer,
-                                sr=sr,
-                                aggregate=np.median,
-                                center=False
-                            )
-                            
-                            # 检测onset事件（使用动态阈值）
-                            onsets = librosa.onset.onset_detect(
-                                onset_envelope=onset_env,
-                                sr=sr,
-                                units='time',
-                                backtrack=True,
-                                pre_max=0.5*sr//chunk_size,  # 动态参数调整
-                                post_max=0.5*sr//chunk_size,
-                                pre_avg=2*sr//chunk_size,
-                                post_avg=2*sr//chunk_size,
-                                delta=0.2
-                            )
-                            
-                            # 检测最近0.5秒内的onset
-                            if len(onsets) > 0:
-                                recent_onsets = onsets[onsets > (buffer_size/sr - 0.5)]
-                                if len(recent_onsets) > 0:
-                                    logging.info(f"检测到重音事件: {recent_onsets[-1]:.2f}s")
-                                    self.is_accent = True
-                                    break
-                                    
-                            # 重置写入指针
-                            write_idx = 0
-                        
-                        retry_count = 0
-                        time.sleep(0.01)
-                        
-                    except OSError as e:
-                        retry_count += 1
-                        logging.warning(f"音频流异常，重试次数: {retry_count}/3")
-                        time.sleep(0.1)
-                        if retry_count >= 3:
-                            raise e
-                            
-            except Exception as e:
-                logging.error(f"重音监测异常: {str(e)}")
-                self._stop_event.set()
-            finally:
-                if stream:
-                    try:
-                        stream.close()
-                    except OSError:
-                        pass
-                logging.info("重音监测线程已终止")
-
-    def stop(self):
+
+                # 检测onset事件（使用动态阈值）
+                onsets = librosa.onset.onset_detect(
+                    onset_envelope=onset_env,
+                    sr=sr,
+                    units='time',
+                    backtrack=True,
+                    pre_max=0.5*sr//chunk_size,  # 动态参数调整
+                    post_max=0.5*sr//chunk_size,
+                    pre_avg=2*sr//chunk_size,
+                    post_avg=2*sr//chunk_size,
+                    delta=0.2
+                )
+
+                # 检测最近0.5秒内的onset
+                if len(onsets) > 0:
+                    recent_onsets = onsets[onsets > (ONSET_WINDOW / sr - ONSET_HOP / sr)]
+                    if len(recent_onsets) > 0:
+                        logging.info(f"检测到重音事件: {recent_onsets[-1]:.2f}s")
+                        self.is_accent = True
+                        break
+
+        except Exception as e:
+            logging.error(f"重音监测异常: {str(e)}")
+        finally:
+            logging.info("重音监测线程已终止")
+
+    def stop(self, timeout: float = STOP_TIMEOUT):
+        """
+        通知全部线程停止，之后可再次 start()；最多等待 timeout 秒，不会因正在进行的节拍分析阻塞调用方 (GUI 线程)
+
+        采集线程退出时关闭音频流并释放 PortAudio；超时仍未退出的分析线程在当前分析结束后自行退出，不再回调结果
+        """
         self._stop_event.set()
-        if self._recording_thread:
-            self._recording_thread.join()
-        if self._monitoring_thread:
-            self._monitoring_thread.join()
\ No newline at end of file
+        self.ring.notify()
+        deadline = time.perf_counter() + timeout
+        for thread in (self._capture_thread, self._recording_thread, self._monitoring_thread):
+            if thread is not None and thread is not threading.current_thread():
+                thread.join(max(deadline - time.perf_counter(), 0.0))
+        self._capture_thread = self._recording_thread = self._monitoring_thread = None
+        self.loudness_flag = False
+        self.period = 0.0
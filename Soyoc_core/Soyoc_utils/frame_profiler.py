@@ -0,0 +1,155 @@
+"""
+逐帧分阶段计时
+
+把每帧的耗时拆分为输入轮询、音频检测、模型更新、参数混合、物理、绘制等阶段，
+记录到固定长度的环形缓冲区中，按需统计各阶段最近若干帧的 p50/p95/p99，
+并定期以 CSV/JSON 写入 ./logs；关闭时每个计时点只有一次属性判断
+"""
+import os, json, time, logging, datetime, threading
+import numpy as np
+
+# 计时阶段，frame 为相邻两次 end_frame 的间隔，即实际帧间隔
+STAGES = ("input", "audio", "update", "params", "physics", "draw", "frame")
+PERCENTILES = (50, 95, 99)
+
+class FrameProfiler:
+    _shared: "FrameProfiler" = None
+
+    def __init__(self, capacity: int = 600, log_dir: str = "./logs"):
+        """
+        :param capacity: 环形缓冲区保存的帧数
+        :param log_dir: CSV/JSON 的输出目录
+        """
+        self.capacity = capacity
+        self.log_dir = log_dir
+        self.enabled = False
+        self.samples = np.zeros((capacity, len(STAGES)), dtype=np.float32)    # 各阶段耗时 (毫秒)
+        self.count = 0          # 已记录的帧数，不超过 capacity
+        self.position = 0       # 下一帧写入的行
+        self._columns = {stage: column for column, stage in enumerate(STAGES)}
+        self._row = np.zeros(len(STAGES), dtype=np.float64)
+        self._pending = np.zeros(len(STAGES), dtype=np.float64)    # 其他线程 add() 的累计耗时，由 end_frame 取走
+        self._pending_lock = threading.Lock()
+        self._last = 0.0
+        self._last_frame: float = None
+        self._dump_name: str = None
+
+    @classmethod
+    def shared(cls) -> "FrameProfiler":
+        """进程内共享的计时器"""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def set_enabled(self, enabled: bool):
+        """开启时清空缓冲区并开始新的输出文件，关闭时写出最后一次统计"""
+        if enabled == self.enabled:
+            return
+        if enabled:
+            self.samples.fill(0.0)
+            self.count = self.position = 0
+            self._row.fill(0.0)
+            with self._pending_lock:
+                self._pending.fill(0.0)
+            self._last_frame = None
+            self._dump_name = f"frame_profile_{datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}"
+            self.enabled = True
+        else:
+            self.dump()
+            self.enabled = False
+
+    def mark(self):
+        """设置计时起点，之后的 lap() 从此刻开始计时"""
+        if not self.enabled:
+            return
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str):
+        """把距上一个计时点的时间累加到 stage，并以当前时刻作为新的计时点"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self._row[self._columns[stage]] += now - self._last
+        self._last = now
+
+    def add(self, stage: str, seconds: float):
+        """把一段在其他线程中测得的耗时累加到 stage，不改变计时点，计入下一次 end_frame 的一帧"""
+        if not self.enabled:
+            return
+        with self._pending_lock:
+            self._pending[self._columns[stage]] += seconds
+
+    def end_frame(self):
+        """结束一帧：把本帧各阶段的累计耗时写入环形缓冲区"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self._last_frame is not None:
+            self._row[-1] = now - self._last_frame
+        self._last_frame = now
+        with self._pending_lock:
+            self._row += self._pending
+            self._pending.fill(0.0)
+        self.samples[self.position] = self._row * 1000
+        self.position = (self.position + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self._row.fill(0.0)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """
+        统计缓冲区内各阶段的耗时
+
+        :return: 阶段名 -> {"p50", "p95", "p99", "max"}，单位为毫秒；尚无数据时为空字典
+        """
+        if self.count == 0:
+            return {}
+        samples = self.samples[:self.count]
+        percentiles = np.percentile(samples, PERCENTILES, axis=0)
+        maximum = samples.max(axis=0)
+        return {
+            stage: {
+                **{f"p{p}": round(float(percentiles[i, column]), 3) for i, p in enumerate(PERCENTILES)},
+                "max": round(float(maximum[column]), 3),
+            }
+            for column, stage in enumerate(STAGES)
+        }
+
+    def overlay_text(self) -> str:
+        """叠加层显示的统计表"""
+        summary = self.summary()
+        lines = [f"{'ms':<8}{'p50':>7}{'p95':>7}{'p99':>7}"]
+        for stage, stats in summary.items():
+            lines.append(f"{stage:<8}{stats['p50']:>7.2f}{stats['p95']:>7.2f}{stats['p99']:>7.2f}")
+        return "\n".join(lines)
+
+    def dump(self):
+        """
+        写出当前统计：CSV 每次追加一组各阶段的统计行，JSON 覆盖为最新的统计与缓冲区内的原始数据
+        """
+        if not self.enabled or self.count == 0:
+            return
+        summary = self.summary()
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        csv_path = os.path.join(self.log_dir, f"{self._dump_name}.csv")
+        json_path = os.path.join(self.log_dir, f"{self._dump_name}.json")
+        try:
+            os.makedirs(self.log_dir, exist_ok=True)
+            write_header = not os.path.exists(csv_path)
+            with open(csv_path, "a", encoding="utf-8") as f:
+                if write_header:
+                    f.write("time,stage,frames," + ",".join(f"p{p}" for p in PERCENTILES) + ",max\n")
+                for stage, stats in summary.items():
+                    f.write(f"{timestamp},{stage},{self.count}," + ",".join(str(value) for value in stats.values()) + "\n")
+
+            # 原始数据按时间顺序排列
+            order = np.arange(self.position - self.count, self.position) % self.capacity
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "time": timestamp,
+                    "frames": self.count,
+                    "summary": summary,
+                    "stages": list(STAGES),
+                    "samples": np.round(self.samples[order], 3).tolist(),
+                }, f, ensure_ascii=False)
+        except OSError as e:
+            logging.warning(f"帧耗时统计写入失败: {e}")
@@ -0,0 +1,60 @@
+"""
+检查已安装的 live2d-py 是否在 Update 后保留 SetIndexParamValue 写入的参数值
+
+ParamPusher 只推送变化的参数，依赖于写入的值在之后的 Update 中保留；程序在载入模型时做一次同样的检查，
+不满足时改为每帧推送所有参数。本工具在离屏上下文中载入模型，写入后连续调用多次 Update 再读回，
+逐个列出未保留的参数，用于升级 live2d-py 后确认差量推送仍然有效。
+
+用法:
+    python -m Soyoc_core.Soyoc_utils.param_persistence_check
+    python -m Soyoc_core.Soyoc_utils.param_persistence_check --model ./model/hiyori_free_t08 --frames 10
+"""
+import os, sys, argparse, logging
+import PySide6.QtWidgets as QtWidgets
+import PySide6.QtCore as QtCore
+import Soyoc_core.config_editor as Soyoc_config
+import Soyoc_core.param_mixer as Soyoc_mixer
+import Soyoc_core.Soyoc_utils.render_benchmark as Soyoc_render_benchmark
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="检查 live2d-py 是否在 Update 后保留写入的参数值")
+    parser.add_argument("--main-dir", default=".", help="程序根目录 (读取其中的 config.toml)")
+    parser.add_argument("--model", default=None, help="模型文件夹 (默认使用配置中的模型)")
+    parser.add_argument("--frames", type=int, default=3, help="写入后调用 Update 的次数")
+    parser.add_argument("--hardware", action="store_true", help="使用系统 OpenGL 驱动而不是软件渲染")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="[%(levelname)-8s] %(module)s: %(message)s")
+    Soyoc_render_benchmark.setup_platform(not args.hardware)
+    if not args.hardware:
+        QtCore.QCoreApplication.setAttribute(QtCore.Qt.ApplicationAttribute.AA_UseSoftwareOpenGL)
+    app = QtWidgets.QApplication(sys.argv[:1])
+
+    config_editor = Soyoc_config.ConfigEditor(os.path.abspath(args.main_dir))
+    if args.model:
+        config_editor.l2d_model = args.model
+    renderer = Soyoc_render_benchmark.OffscreenRenderer(config_editor, 64, 64)
+    l2d_manager = renderer.l2d_manager
+    table = l2d_manager.param_table
+
+    # 载入时的检查失败后推送器已改为全部推送，这里用新的推送器重新检查
+    pusher = Soyoc_mixer.ParamPusher(
+        l2d_manager.model,
+        table,
+        always_indices=l2d_manager.l2d_physics.io_graph.output_indices
+    )
+    skip = l2d_manager._blink_mask | l2d_manager._breath_mask
+    failed = pusher.check_persistence(skip=skip, frames=args.frames)
+    renderer.release()
+    del app
+
+    if len(failed):
+        print(f"{len(failed)} 个参数在 {args.frames} 次 Update 后未保留写入值，差量推送不可用:")
+        for index in failed.tolist():
+            print(f"    {table.ids[index]}")
+        return 1
+    print(f"参与差量推送的参数在 {args.frames} 次 Update 后均保留写入值，差量推送可用")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""
+物理模拟基准测试与金标准轨迹回归
+
+无需显示器与 live2d 渲染，直接读取模型的 *.physics3.json，
+用合成或录制的输入轨迹驱动 Live2DPhysics.update_model_params，
+统计每步耗时并与保存的金标准输出轨迹比对。
+
+用法:
+    python -m Soyoc_core.Soyoc_utils.physics_benchmark --model ./model/Lulu_body
+    python -m Soyoc_core.Soyoc_utils.physics_benchmark --model ./model/Lulu_body --update-golden
+    python -m Soyoc_core.Soyoc_utils.physics_benchmark --check-alloc
+"""
+import os, sys, json, math, time, argparse, logging, itertools, tracemalloc
+import numpy as np
+import Soyoc_core.physics as Soyoc_physics
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "physics_golden")
+
+# Cubism 标准参数的取值范围，未列出的参数默认为 [-1, 1]
+STANDARD_PARAM_RANGES = {
+    "ParamAngleX": (-30, 30),
+    "ParamAngleY": (-30, 30),
+    "ParamAngleZ": (-30, 30),
+    "ParamBodyAngleX": (-10, 10),
+    "ParamBodyAngleY": (-10, 10),
+    "ParamBodyAngleZ": (-10, 10),
+    "ParamBreath": (0, 1),
+    "ParamEyeLOpen": (0, 1),
+    "ParamEyeROpen": (0, 1),
+}
+
+def default_param_range(param_id: str) -> dict:
+    """获取参数的默认取值范围"""
+    minimum, maximum = STANDARD_PARAM_RANGES.get(param_id, (-1, 1))
+    return {"min": minimum, "max": maximum, "default": 0.0 if minimum < 0 else minimum}
+
+def find_physics_file(model_dir: str) -> str:
+    """查找模型文件夹中的 *.physics3.json 文件"""
+    for file_name in os.listdir(model_dir):
+        if file_name.endswith(".physics3.json"):
+            return os.path.join(model_dir, file_name)
+    raise FileNotFoundError(f"未找到 .physics3.json 文件: {model_dir}")
+
+def load_physics(model_dir: str, ranges_file: str = None, world=None):
+    """
+    以无渲染方式加载模型物理
+
+    :param model_dir: 模型文件夹
+    :param ranges_file: 可选的参数范围 JSON 文件，格式为 {"参数id": {"min": , "max": , "default": }}
+    :param world: 注册到的物理世界，默认为独占的物理世界
+    :return: (Live2DPhysics, 初始模型参数字典)
+    """
+    with open(find_physics_file(model_dir), "r", encoding="utf-8") as f:
+        physics3_data = json.load(f)
+
+    param_ids = []
+    for physics_setting_param in physics3_data["PhysicsSettings"]:
+        for input_param in physics_setting_param["Input"]:
+            param_ids.append(input_param["Source"]["Id"])
+        for output_param in physics_setting_param["Output"]:
+            param_ids.append(output_param["Destination"]["Id"])
+
+    model_params_range = {param_id: default_param_range(param_id) for param_id in dict.fromkeys(param_ids)}
+    if ranges_file:
+        with open(ranges_file, "r", encoding="utf-8") as f:
+            model_params_range.update(json.load(f))
+    model_params = {param_id: value["default"] for param_id, value in model_params_range.items()}
+
+    l2d_physics = Soyoc_physics.Live2DPhysics(
+        None,
+        model_params,
+        model_params_range,
+        physics3_data["Meta"]["PhysicsSettingCount"],
+        physics3_data["Meta"]["PhysicsDictionary"],
+        physics3_data["Meta"].get("Fps", 60),
+        world=world,
+        effective_forces=physics3_data["Meta"].get("EffectiveForces")
+    )
+    l2d_physics.set_physics_settings(physics3_data["PhysicsSettings"])
+    return l2d_physics, model_params
+
+def tracking_trace(frames: int, refresh_rate: float):
+    """鼠标跟随扫动：角度参数随光标左右上下往复"""
+    for frame in range(frames):
+        t = frame / refresh_rate
+        dx, dy = math.sin(t * 2.1), math.sin(t * 1.3) * 0.5
+        yield {
+            "ParamAngleX": dx * 30,
+            "ParamAngleY": dy * 30,
+            "ParamAngleZ": - dx * 30,
+            "ParamBodyAngleX": dx * 10,
+        }, [0, 0]
+
+def drag_trace(frames: int, refresh_rate: float):
+    """高速拖动：窗口来回甩动，拖动速度以像素/秒计"""
+    for frame in range(frames):
+        t = frame / refresh_rate
+        velocity = [3000 * math.sin(t * 8), 1500 * math.cos(t * 5)] if (frame // int(refresh_rate)) % 2 == 0 else [0, 0]
+        yield {}, velocity
+
+def idle_trace(frames: int, refresh_rate: float):
+    """空闲：输入保持不变"""
+    for _ in range(frames):
+        yield {}, [0, 0]
+
+def recorded_trace(file_path: str):
+    """
+    录制的输入轨迹，JSON 格式为
+    [{"params": {"参数id": 值}, "velocity": [x, y]}, ...]
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        for frame in json.load(f):
+            yield frame.get("params", {}), frame.get("velocity", [0, 0])
+
+SYNTHETIC_TRACES = {
+    "tracking": tracking_trace,
+    "drag": drag_trace,
+    "idle": idle_trace,
+}
+
+def load_world(model_dir: str, ranges_file: str = None, instances: int = 1):
+    """
+    加载注册到同一物理世界的多个模型实例
+
+    :return: (Live2DPhysics 列表, 初始模型参数字典)
+    """
+    l2d_physics, model_params = load_physics(model_dir, ranges_file)
+    physics_list = [l2d_physics]
+    for _ in range(instances - 1):
+        physics_list.append(load_physics(model_dir, ranges_file, l2d_physics.world)[0])
+    return physics_list, model_params
+
+def run_trace(physics_list: list, model_params: dict, trace, refresh_rate: float):
+    """
+    运行一条输入轨迹，所有实例每帧输入相同
+
+    :return: (每帧所有实例的总耗时数组 (微秒), 输出参数 id 列表, 第一个实例的输出轨迹 (frames x outputs))
+    """
+    output_ids = physics_list[0].io_graph.output_ids
+    params = model_params.copy()
+    timings = []
+    outputs = []
+    for frame_params, velocity in trace:
+        params.update(frame_params)
+        start = time.perf_counter_ns()
+        for l2d_physics in physics_list:
+            l2d_physics.update_model_params(params, 1 / refresh_rate, velocity)
+        timings.append((time.perf_counter_ns() - start) / 1000)
+        outputs.append([physics_list[0].model_params[param_id] for param_id in output_ids])
+    return np.array(timings), output_ids, np.array(outputs, dtype=np.float32)
+
+def summarize(timings: np.ndarray) -> dict:
+    """统计每步耗时"""
+    return {
+        "mean_us": float(np.mean(timings)),
+        "p50_us": float(np.percentile(timings, 50)),
+        "p99_us": float(np.percentile(timings, 99)),
+        "steps_per_second": float(1e6 / np.mean(timings)),
+    }
+
+def check_allocations(l2d_physics, model_params: dict, trace, refresh_rate: float, warmup: int = 120) -> int:
+    """
+    用 tracemalloc 检查稳态下 update_param_values 是否产生堆分配
+
+    输入帧预先写入稠密参数矩阵，计时循环只做视图拷贝与物理更新
+    :return: 测量区间内的峰值分配字节数 (应为 0)
+    """
+    frames = []
+    for frame_params, velocity in trace:
+        params = model_params.copy()
+        params.update(frame_params)
+        frames.append(([params.get(param_id, 0.0) for param_id in l2d_physics.param_ids], [float(velocity[0]), float(velocity[1])]))
+    values = np.array([frame[0] for frame in frames], dtype=np.float32)
+    rows = [values[index] for index in range(len(frames))]
+    velocities = [frame[1] for frame in frames]
+    param_values = l2d_physics.param_values
+    delta_t = 1 / refresh_rate
+
+    # 预热：首帧唤醒、惰性初始化等一次性开销不计入
+    # 迭代器在开始追踪前创建，循环变量不产生新的整数对象
+    frame_iter = zip(rows, velocities)
+    for row, velocity in itertools.islice(frame_iter, warmup):
+        np.copyto(param_values, row)
+        l2d_physics.update_param_values(param_values, delta_t, velocity)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for row, velocity in frame_iter:
+        np.copyto(param_values, row)
+        l2d_physics.update_param_values(param_values, delta_t, velocity)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak - baseline
+
+def golden_path(model_dir: str, trace_name: str) -> str:
+    model_name = os.path.basename(os.path.normpath(model_dir))
+    return os.path.join(GOLDEN_DIR, model_name, f"{trace_name}.npz")
+
+def compare_golden(file_path: str, output_ids: list, outputs: np.ndarray, tolerance: float):
+    """
+    与金标准轨迹比对
+
+    :return: (是否通过, 说明)
+    """
+    if not os.path.exists(file_path):
+        return False, f"缺少金标准文件 {file_path}"
+    golden = np.load(file_path)
+    golden_ids = golden["output_ids"].tolist()
+    if golden_ids != list(output_ids) or golden["outputs"].shape != outputs.shape:
+        return False, "输出参数或帧数与金标准不一致"
+    error = np.abs(golden["outputs"] - outputs)
+    max_error = float(error.max()) if error.size else 0.0
+    if max_error > tolerance:
+        frame, column = np.unravel_index(np.argmax(error), error.shape)
+        return False, f"最大误差 {max_error:.3g} 超出容差 (第 {frame} 帧, {output_ids[column]})"
+    return True, f"最大误差 {max_error:.3g}"
+
+def save_golden(file_path: str, output_ids: list, outputs: np.ndarray):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    np.savez_compressed(file_path, output_ids=np.array(output_ids), outputs=outputs)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="物理模拟基准测试与金标准轨迹回归")
+    parser.add_argument("--model", default="./model/Lulu_body", help="模型文件夹")
+    parser.add_argument("--ranges", default=None, help="参数范围 JSON 文件 (默认使用 Cubism 标准参数范围)")
+    parser.add_argument("--trace", action="append", default=None,
+                        help=f"输入轨迹，可重复指定：{', '.join(SYNTHETIC_TRACES)} 或录制轨迹的 JSON 文件路径")
+    parser.add_argument("--frames", type=int, default=1200, help="合成轨迹的帧数")
+    parser.add_argument("--refresh-rate", type=float, default=120, help="渲染刷新率")
+    parser.add_argument("--tolerance", type=float, default=1e-4, help="金标准比对的绝对误差容差")
+    parser.add_argument("--update-golden", action="store_true", help="用本次结果覆盖金标准文件")
+    parser.add_argument("--no-golden", action="store_true", help="只测性能，不比对金标准")
+    parser.add_argument("--instances", type=int, default=1, help="注册到同一物理世界的模型实例数")
+    parser.add_argument("--check-alloc", action="store_true", help="检查稳态物理步是否产生堆分配")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="[%(levelname)-8s] %(module)s: %(message)s")
+
+    passed = True
+    for trace_name in args.trace or list(SYNTHETIC_TRACES):
+        if trace_name in SYNTHETIC_TRACES:
+            trace = SYNTHETIC_TRACES[trace_name](args.frames, args.refresh_rate)
+        else:
+            trace = recorded_trace(trace_name)
+            trace_name = os.path.basename(trace_name).split(".")[0]
+
+        physics_list, model_params = load_world(args.model, args.ranges, args.instances)
+        timings, output_ids, outputs = run_trace(physics_list, model_params, trace, args.refresh_rate)
+        stats = summarize(timings)
+        print(f"{trace_name:<10} mean {stats['mean_us']:8.1f} us  p50 {stats['p50_us']:8.1f} us  "
+              f"p99 {stats['p99_us']:8.1f} us  {stats['steps_per_second']:9.0f} steps/s")
+
+        file_path = golden_path(args.model, trace_name)
+        if args.update_golden:
+            save_golden(file_path, output_ids, outputs)
+            print(f"{'':<10} 已更新金标准 {file_path}")
+        elif not args.no_golden:
+            ok, message = compare_golden(file_path, output_ids, outputs, args.tolerance)
+            passed &= ok
+            print(f"{'':<10} 金标准{'通过' if ok else '失败'}: {message}")
+
+        if args.check_alloc and trace_name in SYNTHETIC_TRACES:
+            l2d_physics, model_params = load_physics(args.model, args.ranges)
+            trace = SYNTHETIC_TRACES[trace_name](args.frames, args.refresh_rate)
+            allocated = check_allocations(l2d_physics, model_params, trace, args.refresh_rate)
+            passed &= allocated == 0
+            print(f"{'':<10} 堆分配{'通过' if allocated == 0 else '失败'}: 峰值 {allocated} 字节")
+
+    return 0 if passed else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+无窗口渲染基准测试与金标准图像回归
+
+不创建窗口，在 QOffscreenSurface 上建立 OpenGL 上下文，把配置中的模型渲染到帧缓冲对象 (FBO)，
+用输入轨迹驱动完整的 Update -> simulate -> apply_frame -> Draw 流程，统计帧率与每帧延迟；
+默认使用 Qt 的 offscreen 平台与软件 OpenGL (Mesa llvmpipe)，可在没有显示器与 GPU 的构建机上运行。
+
+帧时钟以暂停 + 单步的方式推进，每帧的帧间隔固定为 1 / refresh_rate；
+自动呼吸与自动眨眼由 SDK 按真实时间驱动，金标准比对时关闭。
+
+用法:
+    python -m Soyoc_core.Soyoc_utils.render_benchmark
+    python -m Soyoc_core.Soyoc_utils.render_benchmark --trace drag --frames 600 --save-frames 0,300
+    python -m Soyoc_core.Soyoc_utils.render_benchmark --golden --update-golden
+"""
+import os, sys, time, argparse, logging
+import numpy as np
+import PySide6.QtWidgets as QtWidgets
+import PySide6.QtCore as QtCore
+import PySide6.QtGui as QtGui
+import PySide6.QtOpenGL as QtOpenGL
+import live2d.v3 as live2d
+import OpenGL.GL as GL
+import Soyoc_core.config_editor as Soyoc_config
+import Soyoc_core.live2d_manager as Soyoc_l2d_manager
+import Soyoc_core.Soyoc_utils.frame_profiler as Soyoc_profiler
+import Soyoc_core.Soyoc_utils.physics_benchmark as Soyoc_physics_benchmark
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "render_golden")
+
+def setup_platform(software: bool):
+    """选择 Qt 平台与 OpenGL 实现，需在创建 QApplication 之前调用"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    if software:
+        os.environ["LIBGL_ALWAYS_SOFTWARE"] = "1"   # Mesa: 使用 llvmpipe
+        os.environ["QT_OPENGL"] = "software"        # Windows: 使用 Qt 自带的软件 OpenGL
+
+def image_array(image):
+    """QImage -> RGBA uint8 数组 (height x width x 4)"""
+    image = image.convertToFormat(QtGui.QImage.Format.Format_RGBA8888)
+    rows = np.frombuffer(image.constBits(), np.uint8).reshape(image.height(), image.bytesPerLine())
+    return rows[:, :image.width() * 4].reshape(image.height(), image.width(), 4).copy()
+
+def golden_path(model_dir: str, trace_name: str, frame: int) -> str:
+    model_name = os.path.basename(os.path.normpath(model_dir))
+    return os.path.join(GOLDEN_DIR, model_name, f"{trace_name}_{frame:05d}.png")
+
+def compare_golden(file_path: str, image, tolerance: float):
+    """
+    与金标准图像比对，以像素通道的平均绝对误差 (0~255) 衡量
+
+    :return: (是否通过, 说明)
+    """
+    if not os.path.exists(file_path):
+        return False, f"缺少金标准文件 {file_path}"
+    golden = image_array(QtGui.QImage(file_path))
+    current = image_array(image)
+    if golden.shape != current.shape:
+        return False, f"图像尺寸与金标准不一致 {current.shape[1]}x{current.shape[0]}"
+    error = float(np.abs(golden.astype(np.int16) - current.astype(np.int16)).mean())
+    if error > tolerance:
+        return False, f"平均误差 {error:.3g} 超出容差"
+    return True, f"平均误差 {error:.3g}"
+
+class OffscreenRenderer:
+    def __init__(self, config_editor, width: int, height: int):
+        """
+        在离屏上下文中载入配置的模型
+
+        :param width: 帧缓冲宽度 (像素)
+        :param height: 帧缓冲高度 (像素)
+        """
+        self.surface = QtGui.QOffscreenSurface()
+        self.surface.setFormat(QtGui.QSurfaceFormat.defaultFormat())
+        self.surface.create()
+        self.context = QtGui.QOpenGLContext()
+        self.context.setFormat(self.surface.format())
+        if not self.context.create() or not self.context.makeCurrent(self.surface):
+            raise RuntimeError("无法创建离屏 OpenGL 上下文")
+        logging.info(f"OpenGL: {GL.glGetString(GL.GL_RENDERER)}")
+
+        fbo_format = QtOpenGL.QOpenGLFramebufferObjectFormat()
+        fbo_format.setAttachment(QtOpenGL.QOpenGLFramebufferObject.Attachment.CombinedDepthStencil)
+        self.fbo = QtOpenGL.QOpenGLFramebufferObject(width, height, fbo_format)
+        self.fbo.bind()
+        GL.glViewport(0, 0, width, height)
+
+        self.l2d_manager = Soyoc_l2d_manager.Live2DManager(config_editor)
+        self.l2d_manager.l2d_and_glew_init()
+        self.l2d_manager.load_l2d_model(restore_cache=False)   # 不依赖上次退出时保存的物理状态，从静止姿态开始
+        self.l2d_manager.model.Resize(width, height)
+
+        # 与 Live2DWidget.initializeGL 相同的渲染状态
+        GL.glEnable(GL.GL_BLEND)
+        GL.glBlendFunc(GL.GL_SRC_ALPHA, GL.GL_ONE_MINUS_SRC_ALPHA)
+        GL.glClearColor(0.0, 0.0, 0.0, 0.0)
+        GL.glEnable(GL.GL_DEPTH_TEST)
+        GL.glClearDepth(1.0)
+
+    def render(self, profiler=None):
+        """渲染一帧并等待 GPU 完成，流程与 Live2DWidget.paintGL 相同"""
+        if profiler is not None:
+            profiler.mark()
+        self.fbo.bind()
+        live2d.clearBuffer()
+        self.l2d_manager.model.Update()
+        if profiler is not None:
+            profiler.lap("update")
+        self.l2d_manager.simulate()
+        if profiler is not None:
+            profiler.mark()     # simulate() 的耗时已由其自身计入 params 与 physics
+        self.l2d_manager.apply_frame()
+        if profiler is not None:
+            profiler.lap("params")
+        self.l2d_manager.model.Draw()
+        GL.glFinish()
+        if profiler is not None:
+            profiler.lap("draw")
+            profiler.end_frame()
+
+    def grab(self):
+        """读取当前帧缓冲为 QImage"""
+        return self.fbo.toImage()
+
+    def release(self):
+        self.l2d_manager.l2d_physics.release()  # 不覆盖程序保存的物理状态
+        self.fbo.release()
+        self.context.doneCurrent()
+
+def run_trace(renderer: OffscreenRenderer, trace, save_frames: set, profiler) -> tuple:
+    """
+    运行一条输入轨迹：轨迹中的参数写入视线跟随图层，速度作为拖动速度
+
+    :return: (每帧延迟数组 (毫秒), 总耗时 (秒), 帧号 -> QImage)
+    """
+    l2d_manager = renderer.l2d_manager
+    clock = l2d_manager.clock
+    clock.pause()
+    latencies = []
+    images = {}
+    total_start = time.perf_counter()
+    for frame, (frame_params, velocity) in enumerate(trace):
+        for param_id, value in frame_params.items():
+            l2d_manager.set_layer_param("track", param_id, value)
+        l2d_manager.velocity = list(velocity)
+        clock.step()
+
+        start = time.perf_counter()
+        renderer.render(profiler)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if frame in save_frames:
+            images[frame] = renderer.grab()
+    return np.array(latencies), time.perf_counter() - total_start, images
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="无窗口渲染基准测试与金标准图像回归")
+    parser.add_argument("--main-dir", default=".", help="程序根目录 (读取其中的 config.toml)")
+    parser.add_argument("--model", default=None, help="模型文件夹 (默认使用配置中的模型)")
+    parser.add_argument("--trace", action="append", default=None,
+                        help="输入轨迹，可重复指定：tracking, drag, idle 或录制轨迹的 JSON 文件路径")
+    parser.add_argument("--frames", type=int, default=600, help="合成轨迹的帧数")
+    parser.add_argument("--refresh-rate", type=float, default=60, help="帧时钟的标称帧率")
+    parser.add_argument("--size", default=None, help="渲染尺寸 WxH (默认使用配置中的模型尺寸)")
+    parser.add_argument("--hardware", action="store_true", help="使用系统 OpenGL 驱动而不是软件渲染")
+    parser.add_argument("--save-frames", default="", help="保存为 PNG 的帧号，以逗号分隔")
+    parser.add_argument("--output", default="./logs/render_benchmark", help="PNG 输出目录")
+    parser.add_argument("--golden", action="store_true", help="与金标准图像比对 --save-frames 指定的帧 (默认第 0 帧与最后一帧)")
+    parser.add_argument("--update-golden", action="store_true", help="用本次结果覆盖金标准图像")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="金标准比对的平均像素误差容差 (0~255)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="[%(levelname)-8s] %(module)s: %(message)s")
+    setup_platform(not args.hardware)
+
+    if not args.hardware:
+        QtCore.QCoreApplication.setAttribute(QtCore.Qt.ApplicationAttribute.AA_UseSoftwareOpenGL)
+    app = QtWidgets.QApplication(sys.argv[:1])
+
+    config_editor = Soyoc_config.ConfigEditor(os.path.abspath(args.main_dir))
+    config_editor.refresh_rate = args.refresh_rate
+    if args.model:
+        config_editor.l2d_model = args.model
+    if args.golden or args.update_golden:
+        # 自动呼吸与眨眼按真实时间驱动，关闭以保证结果可复现
+        config_editor.auto_breath = config_editor.auto_blink = False
+    if args.size:
+        width, height = (int(value) for value in args.size.lower().split("x"))
+    else:
+        width, height = config_editor.l2d_size.width(), config_editor.l2d_size.height()
+
+    save_frames = {int(frame) for frame in args.save_frames.split(",") if frame.strip()}
+    if (args.golden or args.update_golden) and not save_frames:
+        save_frames = {0, args.frames - 1}
+
+    passed = True
+    for trace_name in args.trace or ["tracking"]:
+        if trace_name in Soyoc_physics_benchmark.SYNTHETIC_TRACES:
+            trace = Soyoc_physics_benchmark.SYNTHETIC_TRACES[trace_name](args.frames, args.refresh_rate)
+        else:
+            trace = Soyoc_physics_benchmark.recorded_trace(trace_name)
+            trace_name = os.path.basename(trace_name).split(".")[0]
+
+        renderer = OffscreenRenderer(config_editor, width, height)
+        profiler = Soyoc_profiler.FrameProfiler(capacity=max(args.frames, 1))
+        profiler.set_enabled(True)
+        renderer.l2d_manager.profiler = profiler
+        latencies, elapsed, images = run_trace(renderer, trace, save_frames, profiler)
+        renderer.release()
+
+        print(f"{trace_name:<10} {len(latencies)} 帧  {len(latencies) / elapsed:8.1f} fps  "
+              f"mean {latencies.mean():7.2f} ms  p50 {float(np.percentile(latencies, 50)):7.2f} ms  "
+              f"p99 {float(np.percentile(latencies, 99)):7.2f} ms")
+        for stage, stats in profiler.summary().items():
+            if stage in ("update", "params", "physics", "draw"):
+                print(f"{'':<10} {stage:<8} p50 {stats['p50']:7.2f} ms  p95 {stats['p95']:7.2f} ms  p99 {stats['p99']:7.2f} ms")
+
+        model_dir = config_editor.l2d_model
+        for frame, image in sorted(images.items()):
+            os.makedirs(args.output, exist_ok=True)
+            image.save(os.path.join(args.output, f"{trace_name}_{frame:05d}.png"))
+            file_path = golden_path(model_dir, trace_name, frame)
+            if args.update_golden:
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                image.save(file_path)
+                print(f"{'':<10} 已更新金标准 {file_path}")
+            elif args.golden:
+                ok, message = compare_golden(file_path, image, args.tolerance)
+                passed &= ok
+                print(f"{'':<10} 第 {frame} 帧金标准{'通过' if ok else '失败'}: {message}")
+
+    del app
+    return 0 if passed else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,7 @@ import PySide6.QtCore as QtCore
 import PySide6.QtGui as QtGui
 import toml, os, json, logging
 import Soyoc_core.live2d_manager as Soyoc_l2d_manager
+import Soyoc_core.render_scale as Soyoc_render_scale
 
 class MotionLoader:
     def __init__(self, folder_path: str):
@@ -187,6 +188,21 @@ class GeneralPage(QtWidgets.QWidget):
 
         form_layout.addRow("模型尺寸", model_size_slider_layout)
 
+        # 渲染比例下拉框
+        render_scale_layout = QtWidgets.QHBoxLayout()
+        render_scale_layout.addStretch()
+        self.render_scale_combo = QtWidgets.QComboBox()
+        self.render_scale_combo.setFixedHeight(30)
+        self.render_scale_combo.addItem("自动", "auto")
+        for scale in Soyoc_render_scale.RENDER_SCALES:
+            self.render_scale_combo.addItem(f"{scale:.0%}" if scale * 100 % 1 == 0 else f"{scale:.1%}", scale)
+        render_scale, render_scale_auto = Soyoc_render_scale.parse_render_scale(self.config_editor.render_scale)
+        current_index = 0 if render_scale_auto else self.render_scale_combo.findData(render_scale)
+        self.render_scale_combo.setCurrentIndex(max(current_index, 0))
+        self.render_scale_combo.currentIndexChanged.connect(self.update_render_scale)
+        render_scale_layout.addWidget(self.render_scale_combo)
+        form_layout.addRow("渲染比例", render_scale_layout)
+
         # 信息字体尺寸滑条
         message_size_slider_layout = QtWidgets.QHBoxLayout()
 
@@ -218,6 +234,11 @@ class GeneralPage(QtWidgets.QWidget):
         self.model_size_label.setText(str(value))
         self.config_editor.config["general"]["l2d_size"] = [value * base_size[0], value * base_size[1]]
 
+    def update_render_scale(self):
+        """更新渲染比例配置"""
+        self.config_editor.render_scale = self.render_scale_combo.currentData()
+        self.config_editor.config["general"]["render_scale"] = self.config_editor.render_scale
+
     def update_message_size(self):
         self.config_editor.message_size = self.message_size_slider.value()
         self.message_size_label.setText(str(self.config_editor.message_size))
@@ -625,6 +646,7 @@ class ConfigEditor(QtWidgets.QWidget):
         # 加载菜单配置
         menu_config: dict = self.config.get("menu")
         self.beats_enable = menu_config.get("beats_enable", False)
+        self.beats_debug_dump = menu_config.get("beats_debug_dump", "")    # 节拍分析所用音频的 WAV 保存目录，为空时不保存
 
         # 加载通用配置
         general_config: dict = self.config.get("general")
@@ -632,6 +654,8 @@ class ConfigEditor(QtWidgets.QWidget):
         config_l2d_size = general_config.get("l2d_size", [300, 600])
         self.l2d_size = QtCore.QSize(config_l2d_size[0], config_l2d_size[1])
         self.message_size = general_config.get("message_size", 12)
+        self.rest_refresh_rate = general_config.get("rest_refresh_rate", 15)   # 模型静止时的重绘频率
+        self.render_scale = general_config.get("render_scale", 1.0)            # 内部渲染比例 (0.5~1.0)，"auto" 按渲染耗时自动调整
 
         # 加载 Live2D 配置
         l2d_config: dict = self.config.get("l2d")
@@ -642,6 +666,10 @@ class ConfigEditor(QtWidgets.QWidget):
         self.auto_blink = l2d_config.get("auto_blink", "True") == "True"    # str 转 bool
         self.tracking_sensitivity = l2d_config.get("tracking_sensitivity", 1)
         self.standby_active_rate = l2d_config.get("standby_active_rate", 1)
+        self.motion_memory_budget = l2d_config.get("motion_memory_budget", 64)    # 已载入动作的内存上限 (MB)
+        self.motion_bake = l2d_config.get("motion_bake", "actions")               # 预烘焙的动作: "actions" 待机与点击动作, "all", "none"
+        self.motion_bake_rate = l2d_config.get("motion_bake_rate", 0)             # 烘焙采样频率，0 表示使用动作文件的 Fps
+        self.motion_bake_budget = l2d_config.get("motion_bake_budget", 16)        # 烘焙采样表的内存上限 (MB)
 
         # 加载大模型配置
         llm_config: dict = self.config.get("llm")
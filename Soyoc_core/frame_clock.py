@@ -0,0 +1,95 @@
+import time
+
+class FrameClock:
+    _shared: "FrameClock" = None
+
+    def __init__(self, nominal_rate: float = 60, max_delta: float = 0.25, smoothing: float = 0.1):
+        """
+        单调帧时钟：以 time.perf_counter_ns 测量真实帧间隔，向动作、物理、视线跟随等模块发布统一的帧时间
+        不受系统时间调整 (NTP 校时、夏令时) 的影响；暂停后时间不再前进，可逐帧单步推进用于调试
+
+        :param nominal_rate: 标称帧率，第一帧与单步推进使用 1 / nominal_rate 作为帧间隔
+        :param max_delta: 单帧间隔上限 (秒)，避免窗口挂起或调试断点后的一帧跳过过长时间
+        :param smoothing: 平滑帧间隔的指数滑动平均系数
+        """
+        self.nominal_delta = 1 / nominal_rate
+        self.max_delta = max_delta
+        self.smoothing = smoothing
+
+        self.frame = 0                              # 帧序号
+        self.delta = 0.0                            # 最近一帧的间隔 (秒)，暂停时为 0
+        self.smoothed_delta = self.nominal_delta    # 平滑后的帧间隔 (秒)
+        self.time_ns = 0                            # 累计的帧时间 (纳秒)，暂停时不前进
+        self.paused = False
+        self._last_ns: int = None
+        self._pending_steps = 0
+
+    @classmethod
+    def shared(cls, nominal_rate: float = 60) -> "FrameClock":
+        """进程内共享的帧时钟"""
+        if cls._shared is None:
+            cls._shared = cls(nominal_rate)
+        return cls._shared
+
+    @staticmethod
+    def now() -> float:
+        """单调时钟的当前读数 (秒)，只用于计算时间差"""
+        return time.perf_counter_ns() / 1e9
+
+    @property
+    def time(self) -> float:
+        """累计的帧时间 (秒)"""
+        return self.time_ns / 1e9
+
+    @property
+    def fps(self) -> float:
+        """按平滑帧间隔计算的帧率"""
+        return 1 / self.smoothed_delta
+
+    def set_nominal_rate(self, nominal_rate: float):
+        self.nominal_delta = 1 / nominal_rate
+
+    def tick(self) -> float:
+        """
+        开始新的一帧，每个渲染帧调用一次
+
+        :return: 本帧的帧间隔 (秒)
+        """
+        now_ns = time.perf_counter_ns()
+        if self._last_ns is None:
+            delta_ns = int(self.nominal_delta * 1e9)
+        else:
+            delta_ns = min(now_ns - self._last_ns, int(self.max_delta * 1e9))
+        self._last_ns = now_ns
+
+        if self.paused:
+            if self._pending_steps > 0:
+                self._pending_steps -= 1
+                delta_ns = int(self.nominal_delta * 1e9)
+            else:
+                delta_ns = 0
+
+        self.frame += 1
+        self.time_ns += delta_ns
+        self.delta = delta_ns / 1e9
+        if delta_ns > 0:
+            self.smoothed_delta += (self.delta - self.smoothed_delta) * self.smoothing
+        return self.delta
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+        self._pending_steps = 0
+
+    def toggle_pause(self):
+        if self.paused:
+            self.resume()
+        else:
+            self.pause()
+
+    def step(self, frames: int = 1):
+        """暂停状态下，让之后的 frames 帧各推进一个标称帧间隔"""
+        self.paused = True
+        self._pending_steps += frames
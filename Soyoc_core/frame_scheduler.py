@@ -0,0 +1,82 @@
+import PySide6.QtCore as QtCore
+import PySide6.QtOpenGLWidgets as QtOpenGLWidgets
+import Soyoc_core.frame_clock as Soyoc_clock
+
+# 帧调度模式
+MODE_ACTIVE = "active"  # 全速渲染，跟随垂直同步，不超过 refresh_rate
+MODE_IDLE = "idle"      # 模型静止，以 rest_refresh_rate 轮询输入，有自动呼吸/眨眼时同时重绘
+MODE_HIDDEN = "hidden"  # 窗口隐藏、最小化或会话锁定，只低频轮询，不重绘
+
+HIDDEN_INTERVAL = 0.5   # 隐藏时的轮询间隔 (秒)
+SWAP_TIMEOUT = 0.25     # 等待 frameSwapped 的最长时间 (秒)，超时后重新调度，避免窗口未显示时循环停止
+
+class FrameScheduler(QtCore.QObject):
+    woken = QtCore.Signal()     # 从低频模式恢复全速时发出
+    def __init__(self, widget: QtOpenGLWidgets.QOpenGLWidget, config_editor, on_frame, is_idle, is_hidden):
+        """
+        唯一的帧循环：每帧先调用 on_frame 处理输入，再请求重绘；
+        重绘完成后由 frameSwapped 信号调度下一帧，因此全速时跟随显示器的垂直同步
+
+        :param widget: 负责渲染的 QOpenGLWidget
+        :param on_frame: 每帧渲染前的回调，用于轮询光标等输入
+        :param is_idle: 返回模型是否静止的回调
+        :param is_hidden: 返回窗口是否不可见 (隐藏、最小化、会话锁定) 的回调
+        """
+        super().__init__(widget)
+        self.widget = widget
+        self.config_editor = config_editor
+        self.on_frame = on_frame
+        self.is_idle = is_idle
+        self.is_hidden = is_hidden
+        self.mode = MODE_ACTIVE
+        self._frame_start = Soyoc_clock.FrameClock.now()
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self._tick)
+        self.widget.frameSwapped.connect(self._on_frame_swapped)
+
+    def start(self):
+        self._tick()
+
+    def wake(self):
+        """有交互、开始播放动作或进入音乐模式时立即恢复全速"""
+        if self.mode != MODE_ACTIVE:
+            self.mode = MODE_ACTIVE
+            self.timer.stop()
+            self._tick()
+            self.woken.emit()
+
+    def interval(self) -> float:
+        """当前模式下相邻两帧的最短间隔 (秒)"""
+        if self.mode == MODE_ACTIVE:
+            return 1 / self.config_editor.refresh_rate
+        if self.mode == MODE_IDLE:
+            return 1 / max(self.config_editor.rest_refresh_rate, 1)
+        return HIDDEN_INTERVAL
+
+    def _tick(self):
+        self._frame_start = Soyoc_clock.FrameClock.now()
+        self.on_frame()
+
+        if self.is_hidden():
+            self.mode = MODE_HIDDEN
+        elif self.is_idle():
+            self.mode = MODE_IDLE
+        else:
+            self.mode = MODE_ACTIVE
+
+        # 静止且没有自动呼吸/眨眼时画面不变，只轮询输入
+        render = self.mode == MODE_ACTIVE or (
+            self.mode == MODE_IDLE and (self.config_editor.auto_breath or self.config_editor.auto_blink))
+        if render:
+            self.widget.update()
+            self.timer.start(int(max(SWAP_TIMEOUT, self.interval()) * 1000))
+        else:
+            self.timer.start(int(self.interval() * 1000))
+
+    def _on_frame_swapped(self):
+        """一帧呈现完成，按当前模式的帧间隔调度下一帧；全速且跟不上 refresh_rate 时立即开始下一帧"""
+        remaining = self.interval() - (Soyoc_clock.FrameClock.now() - self._frame_start)
+        self.timer.start(max(int(remaining * 1000), 0))
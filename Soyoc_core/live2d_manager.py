@@ -1,64 +1,21 @@
 import live2d.v3 as live2d
-import os, json, logging
+import os, json, logging, hashlib, threading
+import numpy as np
 import Soyoc_core.physics as Soyoc_physics
 import Soyoc_core.motion_manager as Soyoc_motion_manager
-
-class Live2DPhysics:
-    def __init__(self, model: live2d.LAppModel, model_params: dict, model_params_range: dict, physics_setting_count: int, physics_dictionary: list[dict]):
-        self.model = model
-        self.model_params = model_params.copy()
-        self.model_params_range = model_params_range
-        self.physics_setting_count = physics_setting_count
-        self.physics_settings: list[Soyoc_physics.PhysicsSetting] = []
-        for item in physics_dictionary:
-            physics_setting = Soyoc_physics.PhysicsSetting(item["Id"], item["Name"])
-            self.physics_settings.append(physics_setting)
-    
-    def set_physics_settings(self, physics_setting_params: list[dict]):
-        if len(physics_setting_params) is not self.physics_setting_count:
-            logging.error("PhysicsSettings 长度与 PhysicsSettingCount 不符，请检查 .physics3.json 文件")
-            return
-
-        for index, physics_setting_param in enumerate(physics_setting_params):
-            if physics_setting_param["Id"] == self.physics_settings[index].get_id():
-                self.physics_settings[index].add_input_param(physics_setting_param["Input"])
-                self.physics_settings[index].add_output_param(physics_setting_param["Output"])
-                self.physics_settings[index].add_physics_simulator(
-                    count=len(physics_setting_param["Vertices"]),
-                    mobility=[item["Mobility"] for item in physics_setting_param["Vertices"]],
-                    delay=[item["Delay"] for item in physics_setting_param["Vertices"]],
-                    acceleration=[item["Acceleration"] for item in physics_setting_param["Vertices"]],
-                    radius=[item["Radius"] for item in physics_setting_param["Vertices"]])
-            else:
-                logging.warning("PhysicsSettings 顺序与 PhysicsDictionary 不一致，请检查 .physics3.json 文件")
-    
-    def update_model_params(self, new_model_params: dict, delta_t: float, velocity: list):
-        model_params_normalized = {}
-        for key in new_model_params:
-            model_params_normalized[key] = new_model_params[key] * 20 / (self.model_params_range[key]["max"] - self.model_params_range[key]["min"])
-
-        output_delta_all = {}
-        for physics_setting in self.physics_settings:
-            physics_setting.inertial_simulation(velocity, delta_t)
-            output_delta = physics_setting.calculate_output_delta(new_model_params, delta_t)
-
-            for key in output_delta:
-                output_delta[key] = output_delta[key] * (self.model_params_range[key]["max"] - self.model_params_range[key]["min"]) / 20
-            output_delta_all.update(output_delta)
-
-        self.model_params.update(new_model_params)
-        self.model_params.update(output_delta_all)
-
-        return self.model_params
+import Soyoc_core.param_mixer as Soyoc_mixer
+import Soyoc_core.param_table as Soyoc_param_table
+import Soyoc_core.frame_clock as Soyoc_clock
+import Soyoc_core.simulation as Soyoc_simulation
+import Soyoc_core.Soyoc_utils.frame_profiler as Soyoc_profiler
 
 class Live2DManager:
     def __init__(self, config_editor):
         self.config_editor = config_editor
         self.l2d_folder_name = self.config_editor.l2d_model
         self.model: live2d.LAppModel
-        self.model_params: dict = {}
-        self.model_params_range: dict = {}
-        self.l2d_physics: Live2DPhysics
+        self.param_table: Soyoc_param_table.ParamTable = None
+        self.l2d_physics: Soyoc_physics.Live2DPhysics
         self.velocity = [0, 0]
         self.state = {
             "track": True,
@@ -66,46 +23,123 @@ class Live2DManager:
             "motion": False,
         }
         self.motion_now: str
-        self.motion_manager = Soyoc_motion_manager.MotionManager(self.config_editor)
-        self.to_default = 0
+        # 状态、动作图层与物理休眠只由模拟线程改写，其他线程的切换请求记录在此，于下一帧开始时应用
+        self._state_lock = threading.Lock()
+        self._requested_state: str = None
+        self._requested_motion: str = None
+        self._requested_active = False  # 图层参数已被改写，下一帧重新开始静止计时
+        self.clock = Soyoc_clock.FrameClock.shared(self.config_editor.refresh_rate)
+        self.motion_manager = Soyoc_motion_manager.MotionManager(self.config_editor, self.clock)
+        self.profiler = Soyoc_profiler.FrameProfiler.shared()
+        self.mixer: Soyoc_mixer.ParamMixer = None
+        self._playing_motion: Soyoc_motion_manager.Motion = None
+        self._motion_indices: dict[str, tuple] = {}    # 动作名 -> 动作曲线在稠密参数向量中的下标
+        self.unchanged_time = 0.0
+        self._physics_time = 0.0
+        self.model_groups: dict[str, list[str]] = {}    # model3.json 中的参数组名 -> 参数名
+        self.param_pusher: Soyoc_mixer.ParamPusher = None
+        self._excluded_flags = None
+        self.frame_buffer: Soyoc_simulation.FrameBuffer = None  # 模拟结果，模拟与推送可位于不同线程
     
+    def _is_state(self, state_name: str):
+        """当前状态，尚未应用的切换请求视为已生效"""
+        requested = self._requested_state
+        if requested is not None:
+            return requested == state_name
+        return self.state[state_name]
+
     def is_track(self):
-        return self.state["track"]
+        return self._is_state("track")
     
     def is_music(self):
-        return self.state["music"]
+        return self._is_state("music")
     
     def is_motion(self):
-        return self.state["motion"]
+        return self._is_state("motion")
     
     def set_state_true(self, state_name: str):
+        """请求切换状态，由模拟线程在下一帧开始时应用，可在任意线程调用"""
+        with self._state_lock:
+            self._requested_state = state_name
+
+    def _apply_requests(self):
+        """在模拟线程中应用其他线程请求的动作与状态切换"""
+        with self._state_lock:
+            state_name, self._requested_state = self._requested_state, None
+            motion_name, self._requested_motion = self._requested_motion, None
+            active, self._requested_active = self._requested_active, False
+        if active:
+            self.unchanged_time = 0.0
+        if motion_name is not None:
+            self.motion_now = motion_name
+        if state_name is not None:
+            self._set_state(state_name)
+
+    def _set_state(self, state_name: str):
         for key in self.state:
             if key == state_name:
                 self.state[key] = True
             else:
                 self.state[key] = False
+        if state_name == "motion" and hasattr(self, "l2d_physics"):
+            self.l2d_physics.wake()
+        if self.mixer is not None:
+            self.music_layer.fade_to(1.0 if state_name == "music" else 0.0)
+
+    def is_loaded(self):
+        """模型、混合器与参数帧缓冲是否都已建立"""
+        return self.frame_buffer is not None
+
+    def is_at_rest(self):
+        """模型是否静止：处于跟随状态、无拖动、图层权重无过渡、物理已休眠，且参数已有 0.5 秒未变化 (SetParameterValue 的平滑已收敛)"""
+        if not self.is_track() or any(self.velocity):
+            return False
+        if self.mixer is None or self.mixer.is_fading():
+            return False
+        if not hasattr(self, "l2d_physics") or not self.l2d_physics.is_sleeping():
+            return False
+        return not self._requested_active and self.unchanged_time >= 0.5
+
+    def set_layer_param(self, layer_name: str, param: "str | Soyoc_param_table.ParamHandle", value: float):
+        """
+        设置混合器图层中的参数，模型尚未载入或参数不存在时忽略
+
+        :param layer_name: "track" (视线跟随) 或 "music" (音乐摆动)
+        :param param: 参数名，或由 param_handle() 取得的参数句柄
+        """
+        if self.mixer is None:
+            return
+        if self.mixer.layer(layer_name).set(param, value):
+            with self._state_lock:
+                self._requested_active = True
 
     def set_motion(self, motion_name: str):
-        self.motion_now = motion_name
+        """请求播放动作，与 set_state_true 一样在下一帧开始时应用"""
+        with self._state_lock:
+            self._requested_motion = motion_name
 
     def _load_model_parameters(self, model: live2d.LAppModel):
-        for i in range(model.GetParameterCount()):
-            param = model.GetParameter(i)
-            self.model_params[param.id] = param.default
-            self.model_params_range[param.id] = {
-                "min": param.min,
-                "max": param.max,
-                "default": param.default
-            }
+        self.param_table = Soyoc_param_table.ParamTable.from_model(model)
 
     def get_param_default(self):
-        default = {}
-        for param_name, value in self.model_params_range.items():
-            default[param_name] = value["default"]
-        return default
+        return self.param_table.default_dict()
 
-    def _load_physics(self):
-        """从 *.physics3.json 文件中加载模型参数"""
+    def param_handle(self, param_name: str) -> Soyoc_param_table.ParamHandle:
+        """
+        取得参数句柄，供每帧设置同一参数的调用方解析一次后重复使用
+
+        :return: 参数句柄，模型尚未载入或参数不存在时为 None
+        """
+        if self.param_table is None:
+            return None
+        return self.param_table.handle(param_name)
+
+    def _load_physics(self, restore_cache: bool = True):
+        """
+        从 *.physics3.json 文件中加载模型参数
+
+        :param restore_cache: 是否从上次退出时保存的物理状态热启动，为 False 时总是重新计算静止姿态
+        """
         physics3_file_path = None
         for file_name in os.listdir(self.l2d_folder_name):
             if file_name.endswith(".physics3.json"):
@@ -114,17 +148,61 @@ class Live2DManager:
 
         with open(physics3_file_path, "r", encoding="utf-8") as f:
             physics3_data = json.load(f)
+        self.physics_cache_path = self._physics_cache_path(physics3_file_path)
         
-        self.l2d_physics = Live2DPhysics(
+        self.l2d_physics = Soyoc_physics.Live2DPhysics(
             self.model,
-            self.model_params,
-            self.model_params_range,
+            self.param_table.default_dict(),
+            self.param_table.range_dict(),
             physics3_data["Meta"]["PhysicsSettingCount"],
-            physics3_data["Meta"]["PhysicsDictionary"]
+            physics3_data["Meta"]["PhysicsDictionary"],
+            physics3_data["Meta"].get("Fps", 60),
+            world=Soyoc_physics.PhysicsWorld.shared(physics3_data["Meta"].get("Fps", 60)),
+            effective_forces=physics3_data["Meta"].get("EffectiveForces")
         )
         self.l2d_physics.set_physics_settings(physics3_data["PhysicsSettings"])
+        if restore_cache:
+            self._restore_physics()
+        else:
+            self.l2d_physics.settle()
+
+    def _physics_cache_path(self, physics3_file_path: str):
+        """物理状态缓存文件路径，以模型文件夹名与 .physics3.json 的哈希区分"""
+        with open(physics3_file_path, "rb") as f:
+            digest = hashlib.sha1(f.read()).hexdigest()[:16]
+        model_name = os.path.basename(os.path.normpath(self.l2d_folder_name))
+        return os.path.join(self.config_editor.main_dir, "temp", "physics_cache", f"{model_name}_{digest}.bin")
+
+    def _restore_physics(self):
+        """从上次退出时保存的物理状态热启动，没有可用缓存时直接计算静止姿态"""
+        if os.path.exists(self.physics_cache_path):
+            try:
+                with open(self.physics_cache_path, "rb") as f:
+                    self.l2d_physics.restore(f.read())
+                return
+            except (OSError, ValueError) as e:
+                logging.warning(f"物理状态缓存无法使用，将重新计算静止姿态: {e}")
+        self.l2d_physics.settle()
+
+    def save_physics(self):
+        """保存当前物理状态，下次启动时热启动"""
+        try:
+            os.makedirs(os.path.dirname(self.physics_cache_path), exist_ok=True)
+            with open(self.physics_cache_path, "wb") as f:
+                f.write(self.l2d_physics.snapshot())
+        except OSError as e:
+            logging.warning(f"物理状态缓存保存失败: {e}")
+
+    def release_physics(self):
+        """保存物理状态并从共享物理世界中注销本模型"""
+        if hasattr(self, "l2d_physics"):
+            self.save_physics()
+            self.l2d_physics.release()
     
-    def load_l2d_model(self):
+    def load_l2d_model(self, restore_cache: bool = True):
+        """
+        :param restore_cache: 是否从物理状态缓存热启动，基准测试等需要可复现结果的场合为 False
+        """
         model_json_path = None
         for file_name in os.listdir(self.l2d_folder_name):
             if file_name.endswith(".model3.json"):
@@ -133,40 +211,134 @@ class Live2DManager:
 
         self.model = live2d.LAppModel()
         self.model.LoadModelJson(model_json_path)
+        self._load_model_groups(model_json_path)
 
         self.model.SetAutoBreathEnable(self.config_editor.auto_breath)
         self.model.SetAutoBlinkEnable(self.config_editor.auto_blink)
 
         self._load_model_parameters(self.model)
-        self._load_physics()
-    
+        self._load_physics(restore_cache)
+        self._init_mixer()
+
+    def _load_model_groups(self, model_json_path: str):
+        """读取 model3.json 中的参数组 (EyeBlink, LipSync 等)"""
+        with open(model_json_path, "r", encoding="utf-8") as f:
+            model_json = json.load(f)
+        self.model_groups = {
+            group["Name"]: group.get("Ids", [])
+            for group in model_json.get("Groups", [])
+            if group.get("Target") == "Parameter"
+        }
+
+    def _init_mixer(self):
+        """
+        建立分层参数混合器，自下而上依次为：
+        视线跟随 (常驻)、音乐摆动、动作 (按动作的淡入淡出混合)、物理 (以下层混合结果为输入，覆盖物理输出参数)
+        """
+        table = self.param_table
+        self.mixer = Soyoc_mixer.ParamMixer(table)
+        self.track_layer = self.mixer.add_layer("track", weight=1.0)
+        self.music_layer = self.mixer.add_layer("music", weight=1.0 if self.state["music"] else 0.0)
+        self.motion_layer = self.mixer.add_layer("motion")
+        self.physics_layer = self.mixer.add_layer("physics", weight=1.0, source=self._update_physics_layer)
+        self.physics_layer.mask[self.l2d_physics.io_graph.output_indices] = 1.0
+        self.last_values = self.mixer.values.copy()
+
+        # SDK 自身的物理在每次 Update 中改写物理输出参数，这些参数每帧都推送
+        self.param_pusher = Soyoc_mixer.ParamPusher(
+            self.model,
+            table,
+            always_indices=self.l2d_physics.io_graph.output_indices
+        )
+        # 自动眨眼、自动呼吸开启时由 SDK 驱动的参数，模型未定义参数组时沿用默认参数名
+        blink_ids = self.model_groups.get("EyeBlink") or ["ParamEyeLOpen", "ParamEyeROpen"]
+        breath_ids = self.model_groups.get("Breath") or ["ParamBreath"]
+        self._blink_mask = table.mask(blink_ids)
+        self._breath_mask = table.mask(breath_ids)
+        failed = self.param_pusher.check_persistence(skip=self._blink_mask | self._breath_mask)
+        if len(failed):
+            logging.warning(f"{len(failed)} 个参数的写入值未在 Update 后保留 (如 {table.ids[failed[0]]})，改为每帧推送所有参数")
+        self._excluded_flags = None
+
+        self.frame_values = table.defaults.copy()   # 渲染线程读取的最新一帧
+        self._applied_frame = -1
+        self._applied_time = 0.0
+        self.frame_buffer = Soyoc_simulation.FrameBuffer(len(table))
+
+    def _update_physics_layer(self, layer: Soyoc_mixer.MixerLayer, values: np.ndarray, delta_t: float):
+        """物理图层的数据源：以下层混合结果作为物理输入，输出写入物理图层"""
+        start = Soyoc_clock.FrameClock.now()
+        if any(self.velocity):
+            self.l2d_physics.wake()
+        layer.values[...] = values
+        self.l2d_physics.update_param_values(layer.values, delta_t, self.velocity)
+        self._physics_time += Soyoc_clock.FrameClock.now() - start
+
+    def _update_motion_layer(self):
+        """把正在播放的动作写入动作图层，权重取动作当前时刻的淡入淡出权重"""
+        motion, motion_time, values, end = self.motion_manager.get_motion_frame(self.motion_now)
+        if motion is not None:
+            if motion is not self._playing_motion:
+                self._playing_motion = motion
+                self.motion_layer.clear()
+            if motion.name not in self._motion_indices:
+                self._motion_indices[motion.name] = self.param_table.indices(motion.param_ids)
+            indices, found = self._motion_indices[motion.name]
+            self.motion_layer.set_values(indices, values[found])
+            self.motion_layer.set_weight(motion.fade_weight(motion_time))
+        if end:
+            # 动作在淡出结束时权重已为 0；没有淡出的动作在短时间内过渡回下层
+            self._playing_motion = None
+            self.motion_layer.fade_to(0.0)
+            self._set_state("track")
+
     def l2d_and_glew_init(self):
         live2d.init()
         # live2d.glewInit()
         live2d.glInit()
 
-    def params_update(self):
-        if not self.model:
-            return
-        
-        if self.is_motion():
-            posture, end = self.motion_manager.get_motion_posture(self.motion_now)
-            self.model_params.update(posture)
-            if end:
-                self.set_state_true("track")
-                self.to_default = 0.1 * self.config_editor.refresh_rate
+    def simulate(self):
+        """
+        推进帧时钟，计算一帧参数 (动作、图层混合、物理) 并写入 frame_buffer
+
+        不调用 Live2D 模型，可在模拟线程中运行
+        """
+        start = Soyoc_clock.FrameClock.now()
+        self._physics_time = 0.0
+        delta_t = self.clock.tick()
+        self._apply_requests()
+        if self.state["motion"]:
+            self._update_motion_layer()
+        values = self.mixer.mix(delta_t)
+        self.frame_buffer.write(values, self.clock.time)
 
+        # 记录本帧参数，用于静止判定
+        if np.array_equal(values, self.last_values):
+            self.unchanged_time += delta_t
         else:
-            self.model_params.update(self.l2d_physics.update_model_params(self.model_params, 1 / self.config_editor.refresh_rate, self.velocity))
+            self.unchanged_time = 0.0
+            self.last_values[...] = values
+        self.profiler.add("physics", self._physics_time)
+        self.profiler.add("params", Soyoc_clock.FrameClock.now() - start - self._physics_time)
 
-        for param_name, param_value in self.model_params.items():
-            if self.config_editor.auto_breath and param_name == "ParamBreath":
-                continue
+    def apply_frame(self):
+        """在渲染线程中把 frame_buffer 中最新的一帧推送到模型，没有新帧时不推送"""
+        frame, frame_time = self.frame_buffer.read(self.frame_values)
+        if frame == self._applied_frame:
+            return
+        # SetParameterValue 的平滑系数随距上次推送经过的帧时间缩放，暂停时为 0
+        weight = min((frame_time - self._applied_time) * 30, 1.0)
+        self._applied_frame, self._applied_time = frame, frame_time
 
-            if self.config_editor.auto_blink and param_name in ["ParamEyeLOpen", "ParamEyeROpen"]:
-                continue
+        flags = (self.config_editor.auto_breath, self.config_editor.auto_blink)
+        if flags != self._excluded_flags:
+            self._excluded_flags = flags
+            self.param_pusher.set_excluded((self._breath_mask & flags[0]) | (self._blink_mask & flags[1]))
+        self.param_pusher.push(self.frame_values, weight)
 
-            self.model.SetParameterValue(param_name, param_value, 1 / self.config_editor.refresh_rate * 30)
-    
-    def param_to_default(self):
-        self.model_params.update(self.get_param_default())
+    def params_update(self):
+        """在当前线程中计算并推送一帧参数，用于没有模拟线程的场合 (如离屏基准测试)"""
+        if not self.model:
+            return
+        self.simulate()
+        self.apply_frame()
@@ -2,14 +2,22 @@ import PySide6.QtWidgets as QtWidgets
 import PySide6.QtCore as QtCore
 import PySide6.QtOpenGLWidgets as QtOpenGLWidgets
 import PySide6.QtGui as QtGui
+import PySide6.QtOpenGL as QtOpenGL
 import live2d.v3 as live2d
 import OpenGL.GL as GL
 import Soyoc_core.live2d_manager as Soyoc_l2d_manager
+import Soyoc_core.frame_scheduler as Soyoc_scheduler
+import Soyoc_core.render_scale as Soyoc_render_scale
+import Soyoc_core.simulation as Soyoc_simulation
 import Soyoc_core.Soyoc_utils.audio_analyzer as Soyoc_audio
-import math, random
+import Soyoc_core.Soyoc_utils.frame_profiler as Soyoc_profiler
+import math, random, sys, ctypes, logging, time
 import Soyoc_core.config_editor as Soyoc_config
 import Soyoc_core.chat_window as Soyoc_chat
 
+# 视线跟随每帧设置的参数
+TRACK_PARAMS = ("ParamAngleX", "ParamAngleY", "ParamAngleZ", "ParamBodyAngleX", "ParamEyeBallX", "ParamEyeBallY")
+
 class Live2DWidget(QtOpenGLWidgets.QOpenGLWidget):
     def __init__(self, l2d_manager: Soyoc_l2d_manager.Live2DManager, config_editor: Soyoc_config.ConfigEditor) -> None:
         super().__init__()
@@ -18,6 +26,11 @@ class Live2DWidget(QtOpenGLWidgets.QOpenGLWidget):
         self.setMouseTracking(True)
         self.config_editor = config_editor
         self.config_editor.set_l2d_model_manager(self.l2d_manager)
+        self.profiler = Soyoc_profiler.FrameProfiler.shared()
+        self.render_scaler = Soyoc_render_scale.RenderScaler(*Soyoc_render_scale.parse_render_scale(self.config_editor.render_scale))
+        self.view_size = (0, 0)     # 窗口尺寸 (逻辑像素)
+        self.render_size = None     # 内部渲染尺寸 (物理像素)，渲染比例为 1 时为 None，直接渲染到窗口
+        self.render_fbo: QtOpenGL.QOpenGLFramebufferObject = None
 
         # 监听配置更新信号
         self.config_editor.config_updated.connect(self.on_config_updated)   # 连接信号
@@ -26,7 +39,10 @@ class Live2DWidget(QtOpenGLWidgets.QOpenGLWidget):
         """处理配置更新事件"""
         width, height = self.config_editor.l2d_size.width(), self.config_editor.l2d_size.height()
         self.resize(width, height)  # 调整窗口大小
+        self.render_scaler.configure(*Soyoc_render_scale.parse_render_scale(self.config_editor.render_scale))
         self.resizeGL(width, height)  # 手动调用 resizeGL 触发重绘
+        self.l2d_manager.clock.set_nominal_rate(self.config_editor.refresh_rate)
+        self.l2d_manager.motion_manager.prefetch_actions()  # 预载新选中的待机与点击动作
 
     def initializeGL(self) -> None:
         self.l2d_manager.l2d_and_glew_init()
@@ -38,23 +54,60 @@ class Live2DWidget(QtOpenGLWidgets.QOpenGLWidget):
         GL.glEnable(GL.GL_DEPTH_TEST)
         GL.glClearDepth(1.0)
 
-        self.startTimer(int(1000 / self.config_editor.refresh_rate))
-
     def resizeGL(self, width: int, height: int):
-        self.l2d_manager.model.Resize(width, height)
+        self.view_size = (width, height)
+        self.apply_render_scale()
+
+    def apply_render_scale(self):
+        """按当前渲染比例确定内部渲染尺寸，帧缓冲在下一次 paintGL 中重建"""
+        width, height = self.view_size
+        if self.render_scaler.scale < 1.0:
+            self.render_size = self.render_scaler.render_size(width, height, self.devicePixelRatioF())
+            self.l2d_manager.model.Resize(*self.render_size)
+        else:
+            self.render_size = None
+            self.l2d_manager.model.Resize(width, height)
 
     def paintGL(self) -> None:
+        start = time.perf_counter()
+        self.profiler.mark()
+        if self.render_size is not None:
+            self.bind_render_target()
+        elif self.render_fbo is not None:
+            self.render_fbo = None  # 在上下文中释放不再使用的帧缓冲
         live2d.clearBuffer()
         self.l2d_manager.model.Update()
-        self.l2d_manager.params_update()
+        self.profiler.lap("update")
+        self.l2d_manager.apply_frame()      # 参数由模拟线程计算，这里只推送最新一帧
+        self.profiler.lap("params")
         self.l2d_manager.model.Draw()
-        if self.l2d_manager.to_default > 0:
-            self.l2d_manager.param_to_default()
-            self.l2d_manager.to_default -= 1
+        if self.render_size is not None:
+            self.present_render_target()
+        self.profiler.lap("draw")
+        self.profiler.end_frame()
+
+        if self.render_scaler.report(time.perf_counter() - start, 1 / self.config_editor.refresh_rate):
+            self.apply_render_scale()
+
+    def bind_render_target(self):
+        """绑定内部渲染用的帧缓冲，尺寸变化时重建"""
+        if self.render_fbo is None or self.render_fbo.size() != QtCore.QSize(*self.render_size):
+            fbo_format = QtOpenGL.QOpenGLFramebufferObjectFormat()
+            fbo_format.setAttachment(QtOpenGL.QOpenGLFramebufferObject.Attachment.CombinedDepthStencil)
+            self.render_fbo = QtOpenGL.QOpenGLFramebufferObject(*self.render_size, fbo_format)
+        self.render_fbo.bind()
+        GL.glViewport(0, 0, *self.render_size)
+
+    def present_render_target(self):
+        """把内部渲染结果线性插值放大到窗口的帧缓冲"""
+        ratio = self.devicePixelRatioF()
+        target_width, target_height = int(self.width() * ratio), int(self.height() * ratio)
+        GL.glBindFramebuffer(GL.GL_READ_FRAMEBUFFER, self.render_fbo.handle())
+        GL.glBindFramebuffer(GL.GL_DRAW_FRAMEBUFFER, self.defaultFramebufferObject())
+        GL.glBlitFramebuffer(0, 0, *self.render_size, 0, 0, target_width, target_height, GL.GL_COLOR_BUFFER_BIT, GL.GL_LINEAR)
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.defaultFramebufferObject())
+        GL.glViewport(0, 0, target_width, target_height)
 
-    def timerEvent(self, event: QtCore.QTimerEvent):
-        self.update()
-    
     # 新增鼠标事件传递
     def mousePressEvent(self, event: QtGui.QMouseEvent):
         super().mousePressEvent(event)  # 正常处理事件
@@ -125,6 +178,8 @@ class MessageWindow(QtWidgets.QWidget):
 class MainWindow(QtWidgets.QMainWindow):
     # 定义一个带参数的信号，用于传递消息内容
     show_message_signal = QtCore.Signal(str)  # 信号类型为字符串
+    loudness_changed = QtCore.Signal(bool)      # 音频分析线程 -> GUI 线程：响度越过阈值
+    period_detected = QtCore.Signal(float)      # 音频分析线程 -> GUI 线程：节拍周期
 
     def __init__(self, config_editor: Soyoc_config.ConfigEditor):
         super().__init__()
@@ -138,8 +193,8 @@ class MainWindow(QtWidgets.QMainWindow):
         self.setup_basic_init()
         self.setup_mouse_handling()
         self.setup_animation_and_audio()
-
-        self.startTimer(int(1000 / self.config_editor.refresh_rate))
+        self.setup_profiler()
+        self.setup_frame_scheduler()
 
     def setup_basic_init(self):
         """基础窗口设置"""
@@ -161,6 +216,7 @@ class MainWindow(QtWidgets.QMainWindow):
         # 鼠标跟踪设置
         self.setMouseTracking(True)
         self.last_mouse_pos_timer = None
+        self.track_handles = None   # 模型载入后解析一次的视线跟随参数句柄
         
         # 拖动系统初始化
         self.drag_start_pos = None
@@ -174,26 +230,126 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def setup_animation_and_audio(self):
         """动画和音频系统初始化"""
-        # 动画实例配置
-        self.animation = QtCore.QVariantAnimation(self)
-        self.animation.setDuration(1000)
-        self.animation.setStartValue(0.0)
-        self.animation.setEndValue(1.0)
-        self.animation.setLoopCount(-1)
-        self.animation.valueChanged.connect(self.update_angle_y)
+        # 音乐摆动：相位随帧时钟推进，一个周期为 n_beats_per_cycle 个节拍
+        self.music_swaying = False
+        self.music_cycle = 1.0
+        self.music_phase = 0.0
+        self.music_clock_time = 0.0
+        self.music_period = 0.0
         
-        # 音频分析系统
-        self.audio_analyzer = Soyoc_audio.AudioAnalyzer(loudness_threshold=-70.0)
-        self.audio_timer = QtCore.QTimer(self)
-        self.audio_timer.timeout.connect(self.check_audio_conditions)
-        self.audio_timer.start(100)
+        # 音频分析系统：仅在开启节奏跟随时创建并采集，由分析线程的信号驱动状态切换
+        self.audio_analyzer: Soyoc_audio.AudioAnalyzer = None
+        self.loudness_changed.connect(self.on_loudness_changed)
+        self.period_detected.connect(self.on_period_detected)
+        if self.config_editor.beats_enable:
+            self.start_audio()
 
         self.standby_timer = QtCore.QTimer(self)
         self.standby_timer.timeout.connect(self.play_standby_motion)
         self.standby_timer.start(10000)
 
+    def setup_frame_scheduler(self):
+        """帧循环初始化：光标轮询与重绘由同一个调度器驱动"""
+        self.session_locked = False
+        self.frame_scheduler = Soyoc_scheduler.FrameScheduler(
+            self.l2d_widget,
+            self.config_editor,
+            on_frame=self.on_frame,
+            is_idle=self.l2d_manager.is_at_rest,
+            is_hidden=self.is_hidden
+        )
+        self.register_session_notification()
+
+        # 动作、图层混合与物理在模拟线程中计算，帧率跟随帧调度器的模式
+        self.simulation = Soyoc_simulation.SimulationWorker(self.l2d_manager, self.frame_scheduler.interval)
+        self.frame_scheduler.woken.connect(self.simulation.wake)
+        self.simulation.start()
+        self.frame_scheduler.start()
+
+    def on_frame(self):
+        """每帧渲染前：轮询光标，推进音乐摆动"""
+        self.profiler.mark()
+        self.poll_cursor()
+        if self.music_swaying:
+            if self.l2d_manager.is_track():
+                self.l2d_manager.set_state_true("music")    # 音乐中播放的动作结束后恢复摆动
+            # 帧时钟由模拟线程推进，按两次调用之间经过的帧时间推进相位
+            clock_time = self.l2d_manager.clock.time
+            self.music_phase = (self.music_phase + (clock_time - self.music_clock_time) / self.music_cycle) % 1.0
+            self.music_clock_time = clock_time
+            self.update_angle_y(self.music_phase)
+        self.profiler.lap("input")
+
+    def setup_profiler(self):
+        """帧耗时分析：右键菜单开启后显示统计叠加层，并定期写入 ./logs"""
+        self.profiler = Soyoc_profiler.FrameProfiler.shared()
+
+        self.profiler_overlay = QtWidgets.QLabel(self.l2d_widget)
+        font = QtGui.QFont("Consolas")
+        font.setStyleHint(QtGui.QFont.StyleHint.Monospace)
+        font.setPointSize(8)
+        self.profiler_overlay.setFont(font)
+        self.profiler_overlay.setStyleSheet("color: white; background-color: rgba(0, 0, 0, 160); padding: 4px;")
+        self.profiler_overlay.setAttribute(QtCore.Qt.WidgetAttribute.WA_TransparentForMouseEvents, True)
+        self.profiler_overlay.move(4, 4)
+        self.profiler_overlay.hide()
+
+        self.profiler_timer = QtCore.QTimer(self)
+        self.profiler_timer.timeout.connect(self.update_profiler_overlay)
+        self.profiler_dump_timer = QtCore.QTimer(self)
+        self.profiler_dump_timer.timeout.connect(self.profiler.dump)
+
+    def profiler_switch(self, checked):
+        """开关帧耗时分析"""
+        self.profiler.set_enabled(checked)
+        if checked:
+            self.profiler_timer.start(500)
+            self.profiler_dump_timer.start(10000)
+            self.update_profiler_overlay()
+            self.profiler_overlay.show()
+            self.frame_scheduler.wake()
+        else:
+            self.profiler_timer.stop()
+            self.profiler_dump_timer.stop()
+            self.profiler_overlay.hide()
+
+    def update_profiler_overlay(self):
+        self.profiler_overlay.setText(self.profiler.overlay_text())
+        self.profiler_overlay.adjustSize()
+
+    def is_hidden(self):
+        """窗口隐藏、最小化或会话锁定时不需要重绘"""
+        return not self.isVisible() or self.isMinimized() or self.session_locked
+
+    def register_session_notification(self):
+        """Windows 下订阅会话锁定/解锁通知 (WM_WTSSESSION_CHANGE)"""
+        if sys.platform != "win32":
+            return
+        try:
+            ctypes.windll.wtsapi32.WTSRegisterSessionNotification(int(self.winId()), 0)    # NOTIFY_FOR_THIS_SESSION
+        except (AttributeError, OSError) as e:
+            logging.warning(f"会话锁定通知注册失败: {e}")
+
+    def nativeEvent(self, event_type, message):
+        if sys.platform == "win32" and bytes(event_type) == b"windows_generic_MSG":
+            import ctypes.wintypes
+            msg = ctypes.wintypes.MSG.from_address(int(message))
+            if msg.message == 0x02B1:       # WM_WTSSESSION_CHANGE
+                if msg.wParam == 0x7:       # WTS_SESSION_LOCK
+                    self.session_locked = True
+                elif msg.wParam == 0x8:     # WTS_SESSION_UNLOCK
+                    self.session_locked = False
+                    self.frame_scheduler.wake()
+        return super().nativeEvent(event_type, message)
+
+    def showEvent(self, event: QtGui.QShowEvent):
+        super().showEvent(event)
+        if hasattr(self, "frame_scheduler"):
+            self.frame_scheduler.wake()
+
     def update_size(self):
         self.resize(self.config_editor.l2d_size)
+        self.frame_scheduler.wake()
 
     def contextMenuEvent(self, event: QtGui.QMouseEvent):
         # 创建上下文菜单
@@ -204,6 +360,9 @@ class MainWindow(QtWidgets.QMainWindow):
         menu_beats = QtGui.QAction("节奏跟随", self)
         menu_beats.setCheckable(True)  # 设置为复选框
         menu_beats.setChecked(self.config_editor.beats_enable)  # 设置为当前状态
+        menu_profiler = QtGui.QAction("性能分析", self)
+        menu_profiler.setCheckable(True)
+        menu_profiler.setChecked(self.profiler.enabled)
         menu_setting = QtGui.QAction("设置", self)
         menu_exit = QtGui.QAction("退出", self)
 
@@ -212,12 +371,14 @@ class MainWindow(QtWidgets.QMainWindow):
         font.setPointSize(10)  # 设置字体大小为 10
         menu_chat.setFont(font)
         menu_beats.setFont(font)
+        menu_profiler.setFont(font)
         menu_setting.setFont(font)
         menu_exit.setFont(font)
 
         # 连接动作到槽函数
         menu_chat.triggered.connect(self.open_chat_window)
         menu_beats.triggered.connect(self.beats_switch)
+        menu_profiler.triggered.connect(self.profiler_switch)
         menu_setting.triggered.connect(self.option_selected)
         menu_exit.triggered.connect(self.close)
 
@@ -225,6 +386,7 @@ class MainWindow(QtWidgets.QMainWindow):
         context_menu.addAction(menu_chat)
         context_menu.addSeparator()  # 添加分隔符
         context_menu.addAction(menu_beats)
+        context_menu.addAction(menu_profiler)
         context_menu.addSeparator()  # 添加分隔符
         context_menu.addAction(menu_setting)
         context_menu.addAction(menu_exit)
@@ -249,33 +411,47 @@ class MainWindow(QtWidgets.QMainWindow):
         self.beats_enabled = checked  # 更新状态
         if checked:
             self.config_editor.beats_enable = True
+            self.start_audio()
         else:
             self.config_editor.beats_enable = False
-            self.animation.stop()
-            self.l2d_manager.set_state_true("track")
-            self.audio_analyzer.period_reset()
+            self.stop_audio()
+            if self.music_swaying:
+                self.stop_music_swaying()
 
     def closeEvent(self, event):
         """关闭事件处理"""
-        self.audio_analyzer.stop()  # 停止音频分析器
+        self.stop_audio()  # 停止音频分析器
+        self.profiler.set_enabled(False)    # 写出最后一次帧耗时统计
+        if sys.platform == "win32":
+            try:
+                ctypes.windll.wtsapi32.WTSUnRegisterSessionNotification(int(self.winId()))
+            except (AttributeError, OSError):
+                pass
+        self.simulation.stop()  # 先停止模拟线程，再保存物理状态
+        self.l2d_manager.release_physics()
         self.config_editor.close()
         if isinstance(self.chat_window, Soyoc_chat.ChatWindow):
             self.chat_window.close()
         super().closeEvent(event)
 
-    def timerEvent(self, event: QtCore.QTimerEvent):
+    def poll_cursor(self):
+        """轮询光标位置，更新视线跟随，并检测拖动中鼠标是否停止"""
         x_l2d_center = self.pos().x() + self.config_editor.l2d_size.width() / 2
         y_l2d_center = self.pos().y() + self.config_editor.l2d_size.height() / 3
         dx = (QtGui.QCursor.pos().x() - x_l2d_center) / self.screen_size.width()
         dy = - (QtGui.QCursor.pos().y() - y_l2d_center) / self.screen_size.height()
 
+        if self.track_handles is None and self.l2d_manager.is_loaded():
+            self.track_handles = [self.l2d_manager.param_handle(param_name) for param_name in TRACK_PARAMS]
+        angle_x, angle_y, angle_z, body_angle_x, eye_ball_x, eye_ball_y = self.track_handles or TRACK_PARAMS
+
         if self.l2d_manager.is_track():
-            self.l2d_manager.model_params["ParamAngleX"] = dx * 30 * self.config_editor.tracking_sensitivity
-            self.l2d_manager.model_params["ParamAngleY"] = dy * 30 * self.config_editor.tracking_sensitivity
-            self.l2d_manager.model_params["ParamAngleZ"] = - dx * 30 * self.config_editor.tracking_sensitivity
-            self.l2d_manager.model_params["ParamBodyAngleX"] = dx * 10 * self.config_editor.tracking_sensitivity
-        self.l2d_manager.model_params["ParamEyeBallX"] = dx * 1 * self.config_editor.tracking_sensitivity
-        self.l2d_manager.model_params["ParamEyeBallY"] = dy * 1 * self.config_editor.tracking_sensitivity
+            self.l2d_manager.set_layer_param("track", angle_x, dx * 30 * self.config_editor.tracking_sensitivity)
+            self.l2d_manager.set_layer_param("track", angle_y, dy * 30 * self.config_editor.tracking_sensitivity)
+            self.l2d_manager.set_layer_param("track", angle_z, - dx * 30 * self.config_editor.tracking_sensitivity)
+            self.l2d_manager.set_layer_param("track", body_angle_x, dx * 10 * self.config_editor.tracking_sensitivity)
+        self.l2d_manager.set_layer_param("track", eye_ball_x, dx * 1 * self.config_editor.tracking_sensitivity)
+        self.l2d_manager.set_layer_param("track", eye_ball_y, dy * 1 * self.config_editor.tracking_sensitivity)
 
         # 新增逻辑：拖动状态下持续检测鼠标是否停止移动
         if self.is_dragging:
@@ -295,6 +471,7 @@ class MainWindow(QtWidgets.QMainWindow):
             self.drag_start_pos = event.globalPosition().toPoint()
             self.drag_window_pos = self.pos()
             self.press_timer.start(100)  # 启动长按计时器
+            self.frame_scheduler.wake()
             event.accept()
         else:
             super().mousePressEvent(event)
@@ -306,16 +483,21 @@ class MainWindow(QtWidgets.QMainWindow):
         if self.is_dragging and self.drag_start_pos is not None:
             current_pos = event.globalPosition().toPoint()
             
+            now = self.l2d_manager.clock.now()
             if hasattr(self, 'last_mouse_pos'):
+                # 以两次移动事件的实际间隔计算拖动速度
                 delta_relative = current_pos - self.last_mouse_pos
-                self.l2d_manager.velocity = [delta_relative.x() / (1 / self.config_editor.refresh_rate), delta_relative.y() / (1 / self.config_editor.refresh_rate)]
+                delta_t = max(now - self.last_mouse_time, 1e-3)
+                self.l2d_manager.velocity = [delta_relative.x() / delta_t, delta_relative.y() / delta_t]
             
             self.last_mouse_pos = current_pos
+            self.last_mouse_time = now
 
             delta = current_pos - self.drag_start_pos
             new_pos = self.drag_window_pos + delta
             self.move(new_pos)
             self.update_message_position()
+            self.frame_scheduler.wake()
             event.accept()
             # 同步更新定时器的位置记录
             self.last_mouse_pos_timer = current_pos
@@ -330,6 +512,7 @@ class MainWindow(QtWidgets.QMainWindow):
                 self.drag_start_pos = None
                 self.drag_window_pos = None
                 self.l2d_manager.velocity = [0, 0]
+                self.frame_scheduler.wake()
             else:
                 # self.show_message_signal.emit("哦？")
                 self.config_editor.popup_message("哦？") # 测试用
@@ -340,6 +523,20 @@ class MainWindow(QtWidgets.QMainWindow):
         else:
             super().mouseReleaseEvent(event)
 
+    def keyPressEvent(self, event: QtGui.QKeyEvent):
+        """调试用：Pause 键暂停/恢复帧时钟，暂停时 F10 单步推进一帧"""
+        if event.key() == QtCore.Qt.Key.Key_Pause:
+            self.l2d_manager.clock.toggle_pause()
+            self.frame_scheduler.wake()
+            event.accept()
+        elif event.key() == QtCore.Qt.Key.Key_F10 and self.l2d_manager.clock.paused:
+            self.l2d_manager.clock.step()
+            self.simulation.wake()
+            self.l2d_widget.update()
+            event.accept()
+        else:
+            super().keyPressEvent(event)
+
     def play_click_motion(self):
         """播放随机点击动作"""
         if not len(self.config_editor.click_action):
@@ -347,6 +544,7 @@ class MainWindow(QtWidgets.QMainWindow):
         motion_name = random.choice(self.config_editor.click_action)["name"]
         self.l2d_manager.set_motion(motion_name)
         self.l2d_manager.set_state_true("motion")
+        self.frame_scheduler.wake()
 
     def play_standby_motion(self):
         """播放随机待机动作"""
@@ -359,39 +557,76 @@ class MainWindow(QtWidgets.QMainWindow):
         motion_name = random.choice(self.config_editor.standby_action)["name"]
         self.l2d_manager.set_motion(motion_name)
         self.l2d_manager.set_state_true("motion")
+        self.frame_scheduler.wake()
     
-    def check_audio_conditions(self):
-        """检查音频条件并控制动画状态"""
-        if not self.config_editor.beats_enable:
-            return
-
-        if not self.audio_analyzer.loudness_flag:
-            if self.animation.state() == QtCore.QAbstractAnimation.State.Running:
-                self.animation.stop()
-                self.l2d_manager.set_state_true("track")
-                self.audio_analyzer.period_reset()
+    def start_audio(self):
+        """创建音频分析器并开始采集，启动失败时关闭节奏跟随 (右键菜单按 beats_enable 显示勾选状态)"""
+        if self.audio_analyzer is not None:
             return
-        elif self.l2d_manager.is_track():
-            if not self.audio_analyzer.record_and_analyze_is_alive() and self.audio_analyzer.period == 0:
-                self.audio_analyzer.start_detection()
+        self.audio_analyzer = Soyoc_audio.AudioAnalyzer(
+            loudness_threshold=-70.0,
+            debug_dump_dir=self.config_editor.beats_debug_dump or None,
+            on_loudness_changed=self.loudness_changed.emit,
+            on_period_detected=self.period_detected.emit
+        )
+        if not self.audio_analyzer.start():
+            logging.warning("音频分析器启动失败，节奏跟随不可用")
+            self.audio_analyzer = None
+            self.beats_enabled = False
+            self.config_editor.beats_enable = False
 
-        if self.audio_analyzer.period <= 0 or self.n_beats_per_cycle <= 0:
+    def stop_audio(self):
+        """停止采集并释放音频分析器 (音频流、线程与 PortAudio)"""
+        if self.audio_analyzer is None:
             return
-
+        self.audio_analyzer.stop()
+        self.audio_analyzer = None
+        self.music_period = 0.0
+
+    def on_loudness_changed(self, loud):
+        """响度越过阈值：变响时开始节拍检测，变静时停止摆动"""
+        if self.audio_analyzer is None:
+            return  # 分析器已停止，丢弃排队中的信号
+        self.profiler.mark()
+        if loud:
+            self.audio_analyzer.start_detection()
+        else:
+            self.audio_analyzer.period_reset()
+            self.music_period = 0.0
+            if self.music_swaying:
+                self.stop_music_swaying()
+        self.profiler.lap("audio")
+
+    def on_period_detected(self, period):
+        """节拍检测完成：更新摆动周期并进入音乐状态"""
+        if self.audio_analyzer is None or not self.audio_analyzer.loudness_flag:
+            return  # 检测期间已停止或音乐已结束
+        self.profiler.mark()
+        self.music_period = period
+        if period > 0 and self.n_beats_per_cycle > 0:
+            self.start_music_swaying()
+        self.profiler.lap("audio")
+
+    def start_music_swaying(self):
+        """按 music_period 开始或继续音乐摆动，动作播放中则在动作结束后 (on_frame) 进入音乐状态"""
         if self.l2d_manager.is_track():
             self.l2d_manager.set_state_true("music")
 
-        # 更新动画参数
-        new_duration = int(self.n_beats_per_cycle * self.audio_analyzer.period * 1000)
-        if self.animation.duration() != new_duration:
-            self.animation.setDuration(new_duration)
+        # 更新摆动周期，相位在 on_frame 中随帧时钟推进
+        self.music_cycle = self.n_beats_per_cycle * self.music_period
+        if not self.music_swaying:
+            self.music_swaying = True
+            self.music_phase = 0.0
+            self.music_clock_time = self.l2d_manager.clock.time
+            self.frame_scheduler.wake()
 
-        if self.animation.state() != QtCore.QAbstractAnimation.State.Running:
-            self.animation.start()
+    def stop_music_swaying(self):
+        self.music_swaying = False
+        self.l2d_manager.set_state_true("track")
 
     def update_angle_y(self, t):
         """根据音频周期更新角度（镜像拼接 Sigmoid 实现循环）"""
-        if self.audio_analyzer.period <= 0:
+        if self.music_period <= 0:
             return
 
         angle_y = math.cos(2 * math.pi / (1 / 2) * t)
@@ -405,16 +640,14 @@ class MainWindow(QtWidgets.QMainWindow):
         angle_x = swing_sigmoid(t)
 
         # 更新模型参数
-        if self.audio_analyzer.period < 0.8:
-            self.l2d_manager.model_params["ParamAngleY"] = - 30 * angle_y
-            self.l2d_manager.model_params["ParamAngleX"] = 30 * angle_x
-            self.l2d_manager.model_params["ParamAngleZ"] = - 30 * angle_x  # Z轴同步X轴
-            self.l2d_manager.model_params["ParamBodyAngleX"] = - 10 *  angle_x
+        if self.music_period < 0.8:
+            self.l2d_manager.set_layer_param("music", "ParamAngleY", - 30 * angle_y)
+            self.l2d_manager.set_layer_param("music", "ParamAngleX", 30 * angle_x)
+            self.l2d_manager.set_layer_param("music", "ParamAngleZ", - 30 * angle_x)  # Z轴同步X轴
+            self.l2d_manager.set_layer_param("music", "ParamBodyAngleX", - 10 * angle_x)
         else:
-            self.l2d_manager.model_params["ParamAngleZ"] = 20 * angle_x
-            self.l2d_manager.model_params["ParamBodyAngleZ"] = 10 * angle_x
-
-        self.l2d_widget.update()
+            self.l2d_manager.set_layer_param("music", "ParamAngleZ", 20 * angle_x)
+            self.l2d_manager.set_layer_param("music", "ParamBodyAngleZ", 10 * angle_x)
 
     def open_message_window(self, message):
         """根据接收到的消息内容创建 MessageWindow"""
@@ -0,0 +1,161 @@
+import numpy as np
+import hashlib
+import logging
+import json
+import mmap
+import os
+import struct
+
+# 动作缓存的文件头：魔数, 版本, 索引长度
+CACHE_MAGIC = b"SYMC"
+CACHE_VERSION = 2
+CACHE_HEADER = struct.Struct("<4sHQ")
+CACHE_ALIGN = 8
+
+def file_digest(file_path: str) -> str:
+    """计算文件内容的 sha1"""
+    with open(file_path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def _align(offset: int) -> int:
+    return (offset + CACHE_ALIGN - 1) // CACHE_ALIGN * CACHE_ALIGN
+
+class MotionCache:
+    def __init__(self, cache_path: str):
+        """
+        单个模型所有动作的编译缓存，避免每次启动都解析全部 *.motion3.json
+
+        文件由文件头、JSON 索引与按 8 字节对齐的段表数组组成，索引中的偏移量相对于索引之后的数据区；
+        读取时整个文件以 mmap 映射，段表数组直接以 np.frombuffer 视图访问，不复制数据；
+        每个动作以源文件的大小、修改时间与内容哈希判定是否过期
+
+        :param cache_path: 缓存文件路径
+        """
+        self.cache_path = cache_path
+        self.entries: dict[str, dict] = {}
+        self._file = None
+        self._buffer = None
+
+    def open(self) -> bool:
+        """映射缓存文件并读取索引，文件不存在或损坏时返回 False"""
+        self.close()
+        if not os.path.exists(self.cache_path):
+            return False
+        try:
+            self._file = open(self.cache_path, "rb")
+            self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self._buffer) < CACHE_HEADER.size:
+                raise ValueError("动作缓存长度不符")
+            magic, version, index_size = CACHE_HEADER.unpack_from(self._buffer)
+            if magic != CACHE_MAGIC or version != CACHE_VERSION:
+                raise ValueError("动作缓存格式不符")
+            if len(self._buffer) < CACHE_HEADER.size + index_size:
+                raise ValueError("动作缓存长度不符")
+            index = self._buffer[CACHE_HEADER.size:CACHE_HEADER.size + index_size]
+            self.entries = json.loads(index.decode("utf-8"))
+            self._data_start = _align(CACHE_HEADER.size + index_size)
+            for entry in self.entries.values():
+                if self._data_start + entry["offset"] + self._entry_size(entry) > len(self._buffer):
+                    raise ValueError("动作缓存长度不符")
+            return True
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.warning(f"动作缓存 {self.cache_path} 无法使用，将重新解析动作文件: {e}")
+            self.close()
+            return False
+
+    def close(self):
+        """释放文件映射，调用前需释放所有由 get() 取出的数组视图"""
+        self.entries = {}
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def is_fresh(self, name: str, file_path: str) -> bool:
+        """
+        判断缓存中的动作与源文件是否一致
+
+        大小与修改时间都一致时直接视为有效；否则比较内容哈希，哈希一致时更新索引中的大小与修改时间
+        """
+        entry = self.entries.get(name)
+        if entry is None:
+            return False
+        try:
+            stat = os.stat(file_path)
+            if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                return True
+            if entry["size"] != stat.st_size or entry["sha1"] != file_digest(file_path):
+                return False
+        except OSError:
+            return False
+        entry["size"], entry["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+        entry["touched"] = True
+        return True
+
+    def is_touched(self) -> bool:
+        """是否有动作仅修改时间变化，需要重写索引"""
+        return any(entry.get("touched", False) for entry in self.entries.values())
+
+    def get(self, name: str) -> dict:
+        """
+        取出一个动作的缓存数据
+
+        :return: 字典，包含 duration, fps, fade_in_time, fade_out_time, param_ids
+                 以及映射在缓存文件上的只读数组 segment_types, segment_points, curve_offsets
+        """
+        entry = self.entries[name]
+        offset = self._data_start + entry["offset"]
+        segment_num, curve_num = entry["segment_num"], len(entry["param_ids"])
+        segment_points = np.frombuffer(self._buffer, "<f8", segment_num * 8, offset).reshape(-1, 8)
+        offset += segment_points.nbytes
+        curve_offsets = np.frombuffer(self._buffer, "<i8", curve_num + 1, offset)
+        offset += curve_offsets.nbytes
+        segment_types = np.frombuffer(self._buffer, np.int8, segment_num, offset)
+        return {
+            "duration": entry["duration"],
+            "fps": entry["fps"],
+            "fade_in_time": entry["fade_in_time"],
+            "fade_out_time": entry["fade_out_time"],
+            "param_ids": entry["param_ids"],
+            "segment_types": segment_types,
+            "segment_points": segment_points,
+            "curve_offsets": curve_offsets,
+        }
+
+    @staticmethod
+    def _entry_size(entry: dict) -> int:
+        return _align(entry["segment_num"] * 8 * 8 + (len(entry["param_ids"]) + 1) * 8 + entry["segment_num"])
+
+    def write(self, records: dict[str, dict]):
+        """
+        写入缓存文件，先写临时文件再替换，避免中途退出留下损坏的缓存
+
+        :param records: 动作名 -> 字典，包含 get() 返回的全部字段，以及源文件的 size, mtime_ns, sha1
+        """
+        entries = {}
+        offset = 0
+        for name, record in records.items():
+            entry = {key: record[key] for key in ("size", "mtime_ns", "sha1", "duration", "fps", "fade_in_time", "fade_out_time")}
+            entry["param_ids"] = list(record["param_ids"])
+            entry["segment_num"] = len(record["segment_types"])
+            entry["offset"] = offset
+            entries[name] = entry
+            offset += self._entry_size(entry)
+        index = json.dumps(entries, ensure_ascii=False).encode("utf-8")
+        data_start = _align(CACHE_HEADER.size + len(index))
+
+        self.close()
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        temp_path = self.cache_path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, len(index)))
+            f.write(index)
+            for entry, record in zip(entries.values(), records.values()):
+                f.write(b"\0" * (data_start + entry["offset"] - f.tell()))
+                f.write(np.ascontiguousarray(record["segment_points"], dtype="<f8").tobytes())
+                f.write(np.ascontiguousarray(record["curve_offsets"], dtype="<i8").tobytes())
+                f.write(np.ascontiguousarray(record["segment_types"], dtype=np.int8).tobytes())
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+        os.replace(temp_path, self.cache_path)
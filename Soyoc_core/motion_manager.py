@@ -1,193 +1,490 @@
 import Soyoc_core.config_editor as Soyoc_config
+import Soyoc_core.motion_cache as Soyoc_motion_cache
+import Soyoc_core.param_mixer as Soyoc_mixer
+import Soyoc_core.frame_clock as Soyoc_clock
 import os
 import json
-import datetime
-
-class StraightLine:
-    def __init__(self, start_point: list[float], end_point: list[float]):
-        self.start_time = start_point[0]
-        self.start_value = start_point[1]
-        self.end_time = end_point[0]
-        self.end_value = end_point[1]
-
-    def get_value(self, t: float):
-        if t < self.start_time or t > self.end_time:
-            raise ValueError(f"StraightLine: time must be between {self.start_time} and {self.end_time}, but got {t}")
-        if self.start_time == self.end_time:
-            return self.start_value
-        ratio = (t - self.start_time) / (self.end_time - self.start_time)
-        return self.start_value + ratio * (self.end_value - self.start_value)
-
-class BezierCurve:
-    def __init__(self, start_point: list[float], control_point: list[float], end_point: list[float]):
-        self.start_point = start_point  # [t0, v0]
-        self.control1 = control_point[0:2]  # [t1, v1]
-        self.control2 = control_point[2:4]  # [t2, v2]
-        self.end_point = end_point  # [t3, v3]
-
-    def get_value(self, t: float):
-        t0, v0 = self.start_point
-        t3, v3 = self.end_point
-        if t < t0 or t > t3:
-            raise ValueError(f"BezierCurve: time must be between {t0} and {t3}, but got {t}")
-
-        # 二分法求解贝塞尔曲线x(t)=target_time的k值
-        def bezier_x(k):
-            return ( (1 - k)**3 * t0 +
-                     3 * (1 - k)**2 * k * self.control1[0] +
-                     3 * (1 - k) * k**2 * self.control2[0] +
-                     k**3 * t3 )
-
-        low, high = 0.0, 1.0
-        epsilon = 1e-6
-        for _ in range(100):  # 最多迭代100次
-            mid = (low + high) / 2
-            current_t = bezier_x(mid)
-            if abs(current_t - t) < epsilon:
-                break
-            if current_t < t:
-                low = mid
-            else:
-                high = mid
+import hashlib
+import logging
+import math
+import threading
+import collections
+import numpy as np
 
-        k = (low + high) / 2
+# 段类型 (与 motion3.json 的 Segments 一致)
+SEGMENT_LINEAR = 0
+SEGMENT_BEZIER = 1
+SEGMENT_STEPPED = 2
+SEGMENT_INVERSE_STEPPED = 3
 
-        # 计算对应的值
-        value = ( (1 - k)**3 * v0 +
-                  3 * (1 - k)**2 * k * self.control1[1] +
-                  3 * (1 - k) * k**2 * self.control2[1] +
-                  k**3 * v3 )
-        return value
+BAKE_CHUNK_FRAMES = 256
 
 class Motion:
     def __init__(self, name: str, group: str, index: int):
         self.name = name
         self.group = group
         self.index = index
-        self.curves = {}
-    
-    def set_info(self, duration: float, fps: int):
+        self.param_ids: list[str] = []
+        self._segment_types: list[int] = []
+        self._segment_points: list[list[float]] = []
+        self._curve_offsets: list[int] = [0]
+        self.compiled = False
+        self.baked: np.ndarray = None   # 预烘焙的 [帧数 x 曲线数] 采样表
+        self.bake_rate = None
+
+    def set_info(self, duration: float, fps: int, fade_in_time: float = 1.0, fade_out_time: float = 1.0):
+        """
+        :param fade_in_time: 淡入时长 (motion3.json 的 Meta.FadeInTime，缺省为 1 秒)
+        :param fade_out_time: 淡出时长 (motion3.json 的 Meta.FadeOutTime，缺省为 1 秒)
+        """
         self.duration = duration
         self.fps = fps
-    
+        self.fade_in_time = fade_in_time
+        self.fade_out_time = fade_out_time
+
+    def fade_weight(self, time: float) -> float:
+        """time 时刻的淡入淡出权重，淡出在动作结束时完成 (与 Cubism SDK 一致)"""
+        weight = 1.0
+        if self.fade_in_time > 0:
+            weight *= Soyoc_mixer.ease_sine(time / self.fade_in_time)
+        if self.fade_out_time > 0:
+            weight *= Soyoc_mixer.ease_sine((self.duration - time) / self.fade_out_time)
+        return weight
+
     def add_curve(self, param_name: str, curve_data: list):
-        start_time_list = []
-        end_time_list = []
-        curve_list = []
-        current_start_time = curve_data[0]  # 初始时间
+        """
+        解析一条曲线的 Segments，追加到结构数组形式的段表中
 
+        每段保存为 [t0, v0, t1, v1, t2, v2, t3, v3]，直线与阶梯段的控制点与端点相同
+        """
         i = 0
         start_point = curve_data[i:i+2]
         i += 2
 
         while i < len(curve_data):
-            if i >= len(curve_data):
-                break
-            line_type = curve_data[i]
+            line_type = int(curve_data[i])
             i += 1
 
-            if line_type == 0:  # 直线
-                end_point = curve_data[i:i+2]
-                i += 2
-                start_time_list.append(current_start_time)
-                end_time = end_point[0]
-                end_time_list.append(end_time)
-                curve_list.append(StraightLine(start_point, end_point))
-                current_start_time = end_time
-                start_point = end_point
-
-            elif line_type == 1:  # 曲线
+            if line_type == SEGMENT_BEZIER:  # 曲线
                 control_point = curve_data[i:i+4]
                 i += 4
-                end_point = curve_data[i:i+2]
-                i += 2
-                start_time_list.append(current_start_time)
-                end_time = end_point[0]
-                end_time_list.append(end_time)
-                curve_list.append(BezierCurve(start_point, control_point, end_point))
-                current_start_time = end_time
-                start_point = end_point
-
-        self.curves[param_name] = {
-            "start_time": start_time_list,
-            "end_time": end_time_list,
-            "curve": curve_list
-        }
-    
+            elif line_type in (SEGMENT_LINEAR, SEGMENT_STEPPED, SEGMENT_INVERSE_STEPPED):  # 直线, 阶梯, 反向阶梯
+                control_point = start_point + curve_data[i:i+2]
+            else:
+                raise ValueError(f"Motion {self.name}: unknown segment type {line_type} in {param_name}")
+            end_point = curve_data[i:i+2]
+            i += 2
+
+            self._segment_types.append(line_type)
+            self._segment_points.append(start_point + control_point + end_point)
+            start_point = end_point
+
+        # 没有任何段的曲线视为一个停留在起点的阶梯段
+        if len(self._segment_types) == self._curve_offsets[-1]:
+            self._segment_types.append(SEGMENT_STEPPED)
+            self._segment_points.append(start_point * 4)
+
+        self.param_ids.append(param_name)
+        self._curve_offsets.append(len(self._segment_types))
+        self.compiled = False
+
+    def compile(self):
+        """将段表转换为 numpy 数组，并预计算多项式系数与分段查找表"""
+        self.segment_types = np.array(self._segment_types, dtype=np.int8)
+        self.segment_points = np.array(self._segment_points, dtype=np.float64).reshape(-1, 8)
+        self.curve_offsets = np.array(self._curve_offsets, dtype=np.int64)
+        self._compile_tables()
+
+    def load_record(self, record: dict):
+        """
+        从动作缓存的数据载入已编译的段表，跳过 JSON 解析
+
+        :param record: MotionCache.get() 或 parse_motion_file() 返回的字典
+        """
+        self.set_info(record["duration"], record["fps"], record["fade_in_time"], record["fade_out_time"])
+        self.param_ids = list(record["param_ids"])
+        self.segment_types = record["segment_types"]
+        self.segment_points = record["segment_points"]
+        self.curve_offsets = record["curve_offsets"]
+        self._compile_tables()
+
+    def _compile_tables(self):
+        """
+        由段表预计算每帧求值所需的系数表与查找表
+
+        所有段类型统一表示为参数 k 的三次多项式：时间 x(k) = ((a k + b) k + c) k + t0，
+        值 v(k) = ((av k + bv) k + cv) k + v0；直线的 x(k) 为一次式，牛顿迭代一步即精确收敛，
+        阶梯段的值为常数，因此每帧不需要按类型分支
+        """
+        t0, v0, t1, v1, t2, v2, t3, v3 = self.segment_points.T
+        bezier = self.segment_types == SEGMENT_BEZIER
+        length = t3 - t0
+        c = np.where(bezier, 3 * (t1 - t0), length)
+        b = np.where(bezier, 3 * (t2 - 2 * t1 + t0), 0.0)
+        a = np.where(bezier, length - c - b, 0.0)
+        cv = np.where(bezier, 3 * (v1 - v0), v3 - v0)
+        bv = np.where(bezier, 3 * (v2 - 2 * v1 + v0), 0.0)
+        av = np.where(bezier, v3 - v0 - cv - bv, 0.0)
+        constant = (self.segment_types == SEGMENT_STEPPED) | (self.segment_types == SEGMENT_INVERSE_STEPPED)
+        start_value = np.where(self.segment_types == SEGMENT_INVERSE_STEPPED, v3, v0)
+        av, bv, cv = (np.where(constant, 0.0, coefficient) for coefficient in (av, bv, cv))
+        inverse_length = np.divide(1.0, length, out=np.zeros_like(length), where=length > 0)
+        self.segment_table = np.stack([t0, t3, inverse_length, a, b, c, 3 * a, 2 * b, start_value, av, bv, cv], axis=1)
+
+        # 各曲线的段结束时间在曲线内有序，加上 曲线下标 * 跨度 后全局有序，
+        # 一次 searchsorted 即可为所有曲线找到当前段
+        curve_num = len(self.curve_offsets) - 1
+        self.time_span = float(max(np.max(np.abs(self.segment_points[:, [0, 6]]), initial=0.0), self.duration) + 1.0) * 2
+        curve_ids = np.repeat(np.arange(curve_num), np.diff(self.curve_offsets))
+        self.end_keys = curve_ids * self.time_span + t3
+        self.curve_key_base = np.arange(curve_num) * self.time_span
+        self.first_segments = self.curve_offsets[:-1]
+        self.last_segments = self.curve_offsets[1:] - 1
+
+        # 缓存上一帧的段与参数 k，时间连续推进时作为牛顿迭代的初值
+        self._cursor_segments = np.full(curve_num, -1, dtype=np.int64)
+        self._cursor_k = np.zeros(curve_num, dtype=np.float64)
+        self.compiled = True
+
+    @property
+    def nbytes(self) -> int:
+        """编译后占用的内存字节数 (映射在动作缓存文件上的段表不计入)"""
+        arrays = [self.segment_table, self.end_keys, self.curve_key_base, self._cursor_segments, self._cursor_k]
+        arrays += [array for array in (self.segment_types, self.segment_points, self.curve_offsets) if array.flags.owndata]
+        if self.baked is not None:
+            arrays.append(self.baked)
+        return sum(array.nbytes for array in arrays)
+
+    def bake_frames(self, rate: float) -> int:
+        """以 rate 的频率烘焙时的帧数，最后一帧不早于动作结束"""
+        return max(math.ceil(self.duration * rate - 1e-9), 1) + 1
+
+    def bake_nbytes(self, rate: float) -> int:
+        """以 rate 的频率烘焙时采样表占用的字节数"""
+        return self.bake_frames(rate) * len(self.param_ids) * np.dtype(np.float32).itemsize
+
+    def bake(self, rate: float = None):
+        """
+        以固定频率对所有曲线采样，生成 float32 的 [帧数 x 曲线数] 采样表，
+        之后 evaluate() 只需在相邻两帧之间线性插值，开销与曲线复杂度无关
+
+        阶梯段的跳变会被插值为一帧内的过渡
+
+        :param rate: 采样频率，默认使用动作文件中的 Fps
+        """
+        if not self.compiled:
+            self.compile()
+        rate = float(rate or self.fps)
+        times = np.arange(self.bake_frames(rate)) / rate
+        self.baked = np.empty((len(times), len(self.param_ids)), dtype=np.float32)
+        for start in range(0, len(times), BAKE_CHUNK_FRAMES):  # 分块采样以限制临时数组的大小
+            self.baked[start:start + BAKE_CHUNK_FRAMES] = self.sample(times[start:start + BAKE_CHUNK_FRAMES])
+        self.bake_rate = rate
+
+    def unbake(self):
+        """释放采样表，恢复逐帧解析求值"""
+        self.baked = None
+        self.bake_rate = None
+
+    def sample(self, times: np.ndarray) -> np.ndarray:
+        """对多个时刻解析求值，返回 [时刻数 x 曲线数] 的数组"""
+        if not self.compiled:
+            self.compile()
+        times = np.asarray(times, dtype=np.float64)[:, None]
+        segments = self.find_segments(times)
+        t0, t3, inverse_length, a, b, c, a3, b2, v0, av, bv, cv = np.moveaxis(self.segment_table[segments], -1, 0)
+        times = np.clip(times, t0, t3)
+        k = solve_cubic_parameter((times - t0) * inverse_length, a, b, c, a3, b2, t0, times)
+        return ((av * k + bv) * k + cv) * k + v0
+
+    def find_segments(self, time: float) -> np.ndarray:
+        """返回各曲线在 time 时刻所在段的下标，超出范围时取首段或末段"""
+        segments = np.searchsorted(self.end_keys, self.curve_key_base + time, side="left")
+        return np.clip(segments, self.first_segments, self.last_segments)
+
+    def evaluate(self, time: float) -> np.ndarray:
+        """在 time 时刻一次性计算所有曲线的值，顺序与 param_ids 一致"""
+        if self.baked is not None:
+            position = min(max(time, 0.0), self.duration) * self.bake_rate
+            index = min(int(position), len(self.baked) - 2)
+            row = self.baked[index]
+            return row + (self.baked[index + 1] - row) * (position - index)
+        if not self.compiled:
+            self.compile()
+        segments = self.find_segments(time)
+        t0, t3, inverse_length, a, b, c, a3, b2, v0, av, bv, cv = self.segment_table[segments].T
+        time = np.clip(time, t0, t3)
+
+        # 同一段内沿用上一帧的 k，否则以线性插值为初值
+        k = np.where(segments == self._cursor_segments, self._cursor_k, (time - t0) * inverse_length)
+        k = solve_cubic_parameter(k, a, b, c, a3, b2, t0, time)
+        self._cursor_segments, self._cursor_k = segments, k
+        return ((av * k + bv) * k + cv) * k + v0
+
     def get_posture(self, time: float):
-        posture = {}
-        for param_name, curve_param in self.curves.items():
-            for i in range(len(curve_param["curve"])):
-                start = curve_param["start_time"][i]
-                end = curve_param["end_time"][i]
-                if start <= time <= end:
-                    posture[param_name] = curve_param["curve"][i].get_value(time)
-                    break  # 找到后跳出循环
-        return posture
+        return dict(zip(self.param_ids, self.evaluate(time).tolist()))
+
+def parse_motion_file(name: str, file_path: str) -> dict:
+    """
+    解析 *.motion3.json 为动作缓存的数据
+
+    :return: 字典，包含段表数组、duration, fps, fade_in_time, fade_out_time, param_ids 以及源文件的 size, mtime_ns, sha1
+    """
+    stat = os.stat(file_path)
+    with open(file_path, "rb") as file:
+        content = file.read()
+    json_data = json.loads(content.decode("utf-8"))
+
+    motion = Motion(name, None, None)
+    meta = json_data["Meta"]
+    motion.set_info(meta["Duration"], meta["Fps"], meta.get("FadeInTime", 1.0), meta.get("FadeOutTime", 1.0))
+    for curve in json_data["Curves"]:
+        if "Param" in curve["Id"]:
+            motion.add_curve(curve["Id"], curve["Segments"])
+    motion.compile()
+    return {
+        "duration": motion.duration,
+        "fps": motion.fps,
+        "fade_in_time": motion.fade_in_time,
+        "fade_out_time": motion.fade_out_time,
+        "param_ids": motion.param_ids,
+        "segment_types": motion.segment_types,
+        "segment_points": motion.segment_points,
+        "curve_offsets": motion.curve_offsets,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha1": hashlib.sha1(content).hexdigest(),
+    }
+
+def solve_cubic_parameter(k: np.ndarray,
+                          a: np.ndarray, b: np.ndarray, c: np.ndarray,
+                          a3: np.ndarray, b2: np.ndarray, t0: np.ndarray,
+                          time: np.ndarray,
+                          tolerance: float = 1e-7,
+                          iterations: int = 8) -> np.ndarray:
+    """
+    求解单调三次多项式 ((a k + b) k + c) k + t0 = time 在 [0, 1] 内的根 (向量化)
+    从初值 k 开始做牛顿迭代，未在 iterations 次内收敛的元素退化为二分法
+
+    :param a3: 3 * a
+    :param b2: 2 * b
+    """
+    for _ in range(iterations):
+        error = ((a * k + b) * k + c) * k + t0 - time
+        if not (np.abs(error) > tolerance).any():
+            return k
+        derivative = np.maximum((a3 * k + b2) * k + c, 1e-12)
+        k = np.clip(k - error / derivative, 0.0, 1.0)
+
+    # 控制点贴近端点等导数接近 0 的情况下牛顿法可能来回振荡
+    error = ((a * k + b) * k + c) * k + t0 - time
+    unsolved = np.abs(error) > tolerance
+    if unsolved.any():
+        a, b, c, t0, time = a[unsolved], b[unsolved], c[unsolved], t0[unsolved], time[unsolved]
+        low, high = np.zeros_like(time), np.ones_like(time)
+        for _ in range(60):
+            middle = (low + high) / 2
+            below = ((a * middle + b) * middle + c) * middle + t0 < time
+            low = np.where(below, middle, low)
+            high = np.where(below, high, middle)
+        k = k.copy()
+        k[unsolved] = (low + high) / 2
+    return k
 
 class AnimationController:
-    def __init__(self):
+    def __init__(self, clock: Soyoc_clock.FrameClock = None):
+        """:param clock: 提供动画时间的帧时钟，默认为共享帧时钟"""
+        self.clock = clock if clock is not None else Soyoc_clock.FrameClock.shared()
         self.start_time = None
 
     def set_start_time(self):
-        self.start_time = datetime.datetime.now()
-    
+        self.start_time = self.clock.time_ns
+
     def get_duration(self):
-        if not self.start_time:
+        if self.start_time is None:
             return 0.0
-        return (datetime.datetime.now() - self.start_time).total_seconds()
+        return (self.clock.time_ns - self.start_time) / 1e9
 
     def destroy(self):
         self.start_time = None
 
 class MotionManager:
-    def __init__(self, config_editor):
+    def __init__(self, config_editor, clock: Soyoc_clock.FrameClock = None):
+        """:param clock: 动作播放使用的帧时钟，默认为共享帧时钟"""
         self.config_editor = config_editor
-        self.motion_list = []
+        self.motion_index: dict[str, dict] = {}                                  # 动作名 -> 动作组, 索引与文件路径
+        self.motions: collections.OrderedDict[str, Motion] = collections.OrderedDict()   # 已载入的动作，按最近使用排序
+        self.motions_nbytes = 0
+        self.baked_nbytes = 0
+        self._motions_lock = threading.Lock()
         self._init_motions()
         self.motion_now: Motion = None
-        self.animation = AnimationController()
+        self.animation = AnimationController(clock)
+        self.prefetch_actions()
 
     def set_motion_end_callback(self, callback_function):
         self.motion_end_callback = callback_function
 
     def _init_motions(self):
-        motion_path = os.path.join(self.config_editor.main_dir, self.config_editor.l2d_model, "motion")
-        motion_tree_info = self.config_editor.motions
+        """建立动作索引并校验动作缓存，动作本身在首次使用时才载入"""
+        model_dir = os.path.join(self.config_editor.main_dir, self.config_editor.l2d_model)
+        motion_path = os.path.join(model_dir, "motion")
+        for motion_name, group_and_index in self.config_editor.motions.items():
+            self.motion_index[motion_name] = {
+                "group": group_and_index["group"],
+                "index": group_and_index["index"],
+                "file_path": os.path.join(motion_path, motion_name + ".motion3.json"),
+            }
 
-        for motion_name, group_and_index in motion_tree_info.items():
-            file_path = os.path.join(motion_path, motion_name + ".motion3.json")
-            with open(file_path, "r", encoding="utf-8") as file:
-                json_data = json.load(file)
+        model_name = os.path.basename(os.path.normpath(model_dir))
+        self.motion_cache = Soyoc_motion_cache.MotionCache(
+            os.path.join(self.config_editor.main_dir, "temp", "motion_cache", f"{model_name}.bin"))
+        self._fallback_records = self._update_motion_cache({name: info["file_path"] for name, info in self.motion_index.items()})
 
-            motion = Motion(motion_name, group_and_index["group"], group_and_index["index"])
-            motion.set_info(json_data["Meta"]["Duration"], json_data["Meta"]["Fps"])
-            for curve in json_data["Curves"]:
-                if "Param" in curve["Id"]:
-                    motion.add_curve(curve["Id"], curve["Segments"])
-            self.motion_list.append(motion)
+    def _update_motion_cache(self, file_paths: dict[str, str]) -> dict[str, dict]:
+        """
+        校验动作缓存，缓存缺失、损坏或有动作文件变化时只重新解析变化的动作并重写缓存
 
-    def get_motion_posture(self, motion_name: str):
-        # 动画已结束且未找到动作时返回空
+        :param file_paths: 动作名 -> *.motion3.json 路径
+        :return: 缓存无法写入时返回解析得到的数据，供之后载入动作使用，否则返回空字典
+        """
+        cache = self.motion_cache
+        cache.open()
+        stale = {name for name, path in file_paths.items() if not cache.is_fresh(name, path)}
+        if not stale and not cache.is_touched() and set(cache.entries) == set(file_paths):
+            return {}
+
+        records = {}
+        for name, path in file_paths.items():
+            if name in stale:
+                records[name] = parse_motion_file(name, path)
+            else:
+                # 复制出仍然有效的动作，重写缓存前需释放对旧文件映射的引用
+                record = {key: np.array(value) if isinstance(value, np.ndarray) else value for key, value in cache.get(name).items()}
+                record.update({key: cache.entries[name][key] for key in ("size", "mtime_ns", "sha1")})
+                records[name] = record
+
+        try:
+            cache.write(records)
+        except OSError as e:
+            logging.warning(f"动作缓存保存失败: {e}")
+            return records
+        if not cache.open():
+            return records
+        return {}
+
+    def get_motion(self, motion_name: str) -> Motion:
+        """
+        按名字取得动作，未载入时从动作缓存载入，并在超出内存预算时淘汰最久未使用的动作
+
+        待机与点击动作常驻内存，不参与淘汰；动作不存在时返回 None
+        """
+        with self._motions_lock:
+            motion = self.motions.get(motion_name)
+            if motion is not None:
+                self.motions.move_to_end(motion_name)
+                return motion
+        info = self.motion_index.get(motion_name)
+        if info is None:
+            return None
+
+        # 在锁外载入，避免预取线程载入其他动作时阻塞主线程
+        motion = Motion(motion_name, info["group"], info["index"])
+        record = self._fallback_records.get(motion_name)
+        if record is None:
+            if motion_name in self.motion_cache.entries:
+                record = self.motion_cache.get(motion_name)
+            else:
+                record = parse_motion_file(motion_name, info["file_path"])
+        motion.load_record(record)
+        bake_rate = self._reserve_bake(motion)
+        if bake_rate:
+            motion.bake(bake_rate)
+
+        with self._motions_lock:
+            if motion_name in self.motions:  # 其他线程已先一步载入
+                if motion.baked is not None:
+                    self.baked_nbytes -= motion.baked.nbytes
+                self.motions.move_to_end(motion_name)
+                return self.motions[motion_name]
+            self.motions[motion_name] = motion
+            self.motions_nbytes += motion.nbytes
+            self._evict_motions()
+        return motion
+
+    def _evict_motions(self):
+        """淘汰最久未使用的动作直到内存占用不超过预算 (刚使用的动作除外)，调用时需持有 _motions_lock"""
+        budget = self.config_editor.motion_memory_budget * 1024 * 1024
+        pinned = self._action_names()
+        for motion_name in list(self.motions)[:-1]:
+            if self.motions_nbytes <= budget:
+                break
+            if motion_name in pinned:
+                continue
+            motion = self.motions.pop(motion_name)
+            self.motions_nbytes -= motion.nbytes
+            if motion.baked is not None:
+                self.baked_nbytes -= motion.baked.nbytes
+
+    def _reserve_bake(self, motion: Motion) -> float:
+        """
+        判断动作是否需要烘焙，需要时在烘焙预算中预留空间
+
+        :return: 烘焙频率，不烘焙时返回 None
+        """
+        bake_mode = self.config_editor.motion_bake
+        if bake_mode == "none" or (bake_mode == "actions" and motion.name not in self._action_names()):
+            return None
+        rate = self.config_editor.motion_bake_rate or motion.fps
+        nbytes = motion.bake_nbytes(rate)
+        with self._motions_lock:
+            if self.baked_nbytes + nbytes > self.config_editor.motion_bake_budget * 1024 * 1024:
+                return None
+            self.baked_nbytes += nbytes
+        return rate
+
+    def _action_names(self) -> set[str]:
+        """配置中的待机与点击动作名"""
+        return {action["name"] for action in self.config_editor.standby_action + self.config_editor.click_action}
+
+    def prefetch_actions(self):
+        """在后台线程中预先载入待机与点击动作，使播放动作时不需要读取磁盘"""
+        motion_names = [name for name in self._action_names() if name in self.motion_index]
+        threading.Thread(target=self._prefetch, args=(motion_names,), daemon=True).start()
+
+    def _prefetch(self, motion_names: list[str]):
+        for motion_name in motion_names:
+            try:
+                self.get_motion(motion_name)
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"预载动作 {motion_name} 失败: {e}")
+
+    def get_motion_frame(self, motion_name: str):
+        """
+        取得正在播放的动作在当前时刻的值，没有正在播放的动作时开始播放 motion_name
+
+        :return: (动作, 当前时刻, 各曲线的值, 是否结束)，动作不存在时返回 (None, 0.0, None, 1)
+        """
         if self.motion_now is None:
-            # 寻找对应动作
-            target_motion = None
-            for motion in self.motion_list:
-                if motion.name == motion_name:
-                    target_motion = motion
-                    break
+            target_motion = self.get_motion(motion_name)
             if not target_motion:
-                return {}
+                logging.warning(f"动作 {motion_name} 不存在")
+                return None, 0.0, None, 1
             self.motion_now = target_motion
             self.animation.set_start_time()
 
+        motion = self.motion_now
         current_duration = self.animation.get_duration()
-        if current_duration <= self.motion_now.duration:
-            end = 0
-            return self.motion_now.get_posture(current_duration), end
+        if current_duration <= motion.duration:
+            return motion, current_duration, motion.evaluate(current_duration), 0
         else:  # 动画结束后返回最后一帧
-            end = 1
-            final_posture = self.motion_now.get_posture(self.motion_now.duration)
             self.motion_now = None
             self.animation.destroy()
-            return final_posture, end
\ No newline at end of file
+            return motion, motion.duration, motion.evaluate(motion.duration), 1
+
+    def get_motion_posture(self, motion_name: str):
+        """与 get_motion_frame 相同，但以参数名 -> 值的字典返回姿态: (姿态, 是否结束)"""
+        motion, _, values, end = self.get_motion_frame(motion_name)
+        if motion is None:
+            return {}, end
+        return dict(zip(motion.param_ids, values.tolist())), end
@@ -0,0 +1,243 @@
+import numpy as np
+import math
+import Soyoc_core.param_table as Soyoc_param_table
+
+# 图层切换时权重过渡的默认时长 (秒)
+LAYER_FADE_TIME = 0.3
+
+def ease_sine(x: float) -> float:
+    """0~1 的正弦缓动，与 Cubism SDK 的 GetEasingSine 一致"""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    return 0.5 - 0.5 * math.cos(math.pi * x)
+
+class MixerLayer:
+    def __init__(self, name: str, table: Soyoc_param_table.ParamTable, weight: float = 0.0, source=None):
+        """
+        混合器中的一个图层，保存该图层驱动的参数值与覆盖掩码
+
+        :param name: 图层名
+        :param table: 模型参数表，由混合器共享
+        :param weight: 初始权重
+        :param source: 可选的回调 source(layer, values, delta_t)，混合到本图层前调用，
+                       values 为下层混合后的参数向量，用于物理等依赖下层结果的图层
+        """
+        self.name = name
+        self.table = table
+        self.values = np.zeros(len(table), dtype=np.float32)
+        self.mask = np.zeros(len(table), dtype=np.float32)  # 1 表示本图层驱动该参数
+        self.weight = weight
+        self.target_weight = weight
+        self.fade_speed = 0.0   # 每秒权重变化量
+        self.source = source
+
+    def set(self, param: "str | Soyoc_param_table.ParamHandle", value: float) -> bool:
+        """
+        设置单个参数的值，模型中不存在的参数被忽略
+
+        :param param: 参数名或参数句柄
+        :return: 参数值或覆盖状态是否发生变化
+        """
+        if isinstance(param, Soyoc_param_table.ParamHandle):
+            index = param.index
+        else:
+            index = self.table.index.get(param)
+            if index is None:
+                return False
+        value = self.values.dtype.type(value)
+        changed = self.values[index] != value or self.mask[index] == 0.0
+        self.values[index] = value
+        self.mask[index] = 1.0
+        return bool(changed)
+
+    def set_values(self, indices: np.ndarray, values: np.ndarray):
+        """按稠密参数向量下标批量设置参数的值"""
+        self.values[indices] = values
+        self.mask[indices] = 1.0
+
+    def clear(self):
+        """清空本图层驱动的参数"""
+        self.mask.fill(0.0)
+
+    def set_weight(self, weight: float):
+        """立即设置权重，并停止正在进行的过渡"""
+        self.weight = self.target_weight = weight
+
+    def fade_to(self, weight: float, duration: float = LAYER_FADE_TIME):
+        """
+        在 duration 秒内把权重线性过渡到 weight
+
+        :param duration: 过渡时长，不大于 0 时立即生效
+        """
+        self.target_weight = weight
+        if duration <= 0:
+            self.weight = weight
+        else:
+            self.fade_speed = abs(weight - self.weight) / duration
+
+    def is_fading(self) -> bool:
+        return self.weight != self.target_weight
+
+    def advance(self, delta_t: float):
+        """推进权重过渡"""
+        if self.weight < self.target_weight:
+            self.weight = min(self.weight + self.fade_speed * delta_t, self.target_weight)
+        elif self.weight > self.target_weight:
+            self.weight = max(self.weight - self.fade_speed * delta_t, self.target_weight)
+
+class ParamMixer:
+    def __init__(self, table: Soyoc_param_table.ParamTable):
+        """
+        分层参数混合器：各图层在稠密参数向量上按顺序覆盖混合，
+
+            values = values + (layer.values - values) * layer.mask * layer.weight
+
+        最底层为参数默认值，图层权重为 0 时该图层不参与运算；混合结果写入参数表的 values
+
+        :param table: 模型参数表，决定稠密参数向量的顺序
+        """
+        self.table = table
+        self.values = table.values
+        self.layers: list[MixerLayer] = []
+        self._blend = np.empty_like(self.values)
+
+    def add_layer(self, name: str, weight: float = 0.0, source=None) -> MixerLayer:
+        """在最上方添加图层，参数见 MixerLayer"""
+        layer = MixerLayer(name, self.table, weight, source)
+        self.layers.append(layer)
+        return layer
+
+    def layer(self, name: str) -> MixerLayer:
+        for layer in self.layers:
+            if layer.name == name:
+                return layer
+        raise KeyError(name)
+
+    def is_fading(self) -> bool:
+        """是否有图层正在过渡权重"""
+        return any(layer.is_fading() for layer in self.layers)
+
+    def mix(self, delta_t: float) -> np.ndarray:
+        """
+        推进各图层的权重过渡并自下而上混合所有图层，结果限制在各参数的取值范围内
+
+        :param delta_t: 距上一帧的时间 (秒)
+        :return: 混合后的稠密参数向量 (参数表的 values)
+        """
+        values, blend = self.values, self._blend
+        self.table.reset(values)
+        for layer in self.layers:
+            layer.advance(delta_t)
+            if layer.source is not None:
+                layer.source(layer, values, delta_t)
+            if layer.weight <= 0.0:
+                continue
+            np.subtract(layer.values, values, out=blend)
+            np.multiply(blend, layer.mask, out=blend)
+            np.multiply(blend, layer.weight, out=blend)
+            np.add(values, blend, out=values)
+        self.table.clamp(values)
+        return values
+
+# 推送阈值：与上次推送值之差小于 参数范围 * PUSH_EPSILON 的参数不再推送
+PUSH_EPSILON = 1e-4
+
+class ParamPusher:
+    def __init__(self, model, table: Soyoc_param_table.ParamTable, always_indices=()):
+        """
+        把混合结果推送到 Live2D 模型：按参数下标调用 SetIndexParamValue，并记录每个参数在模型中的当前值，
+        变化小于阈值的参数不推送，省去大部分不变参数每帧一次的 Python -> C++ 调用
+
+        跳过不变的参数要求 SetIndexParamValue 写入的值在之后的 Update 中保留 (live2d-py 0.5 同时写入 Update 开头
+        LoadParameters 恢复的参数存档)，载入模型后由 check_persistence() 实测，不满足时改为每帧推送所有参数；
+        模型自身在 Update 中逐帧改写的参数 (自动眨眼、自动呼吸) 不推送，SDK 物理的输出参数则每帧都推送
+
+        :param model: live2d.LAppModel
+        :param table: 由该模型建立的参数表，默认值即模型载入后的初始值
+        :param always_indices: 每帧都推送的参数下标
+        """
+        self.model = model
+        self.values = table.defaults.copy()     # 模型中各参数的当前值
+        self.table = table
+        self._epsilon = np.maximum(np.abs(table.maximum - table.minimum), 1e-6) * PUSH_EPSILON
+        self._epsilon[np.asarray(always_indices, dtype=np.int64)] = -1.0
+        self._threshold = self._epsilon.copy()
+        self._excluded = np.zeros(len(self.values), dtype=bool)
+        self._diff = np.empty_like(self.values)
+        self._abs_diff = np.empty_like(self.values)
+        self._dirty = np.empty(len(self.values), dtype=bool)
+
+    def check_persistence(self, skip: np.ndarray = None, frames: int = 1) -> np.ndarray:
+        """
+        检查写入的参数值能否在之后的 Update 中保留：把参与差量推送的参数写为另一个值，
+        调用 frames 次 model.Update() 后以 GetParameterValue 读回，再恢复原值；
+        有参数未保留时，说明模型在 Update 中恢复了写入前的参数，此后每帧推送所有参数
+
+        需在载入模型后、开始推送前调用
+
+        :param skip: 布尔数组，标记模型在 Update 中自行改写的参数 (自动眨眼、自动呼吸)，不参与检查
+        :param frames: 写入后调用 Update 的次数
+        :return: 未保留写入值的参数下标
+        """
+        probe = (self._epsilon >= 0) & (self.table.maximum > self.table.minimum)
+        if skip is not None:
+            probe &= ~np.asarray(skip, dtype=bool)
+        indices = np.flatnonzero(probe)
+        minimum, maximum = self.table.minimum[indices], self.table.maximum[indices]
+        # 检查值取范围中点，与当前值过近时取四分之一处
+        test_values = (minimum + maximum) * 0.5
+        near = np.abs(test_values - self.values[indices]) <= self._epsilon[indices] * 10
+        test_values[near] = (minimum + (maximum - minimum) * 0.25)[near]
+
+        for index, value in zip(indices.tolist(), test_values.tolist()):
+            self.model.SetIndexParamValue(index, value, 1.0)
+        for _ in range(frames):
+            self.model.Update()
+        read_back = np.array([self.model.GetParameterValue(index) for index in indices.tolist()], dtype=np.float32)
+        failed = indices[np.abs(read_back - test_values) > self._epsilon[indices] * 10]
+
+        for index, value in zip(indices.tolist(), self.values[indices].tolist()):
+            self.model.SetIndexParamValue(index, value, 1.0)
+        if len(failed):
+            self._epsilon[...] = -1.0
+            self._threshold[...] = self._epsilon
+            self._threshold[self._excluded] = np.inf
+        return failed
+
+    def set_excluded(self, excluded: np.ndarray):
+        """
+        设置不推送的参数
+
+        :param excluded: 布尔数组，True 表示该参数由模型自身驱动
+        """
+        excluded = np.asarray(excluded, dtype=bool)
+        if np.array_equal(excluded, self._excluded):
+            return
+        # 重新开始推送的参数在排除期间被模型改写过，读回模型中的当前值
+        for index in np.flatnonzero(self._excluded & ~excluded).tolist():
+            self.values[index] = self.model.GetParameterValue(index)
+        self._excluded = excluded.copy()
+        self._threshold[...] = self._epsilon
+        self._threshold[excluded] = np.inf
+
+    def push(self, values: np.ndarray, weight: float) -> int:
+        """
+        推送与模型当前值相差超过阈值的参数，模型中的值按 current + (value - current) * weight 更新
+
+        :param values: 混合后的稠密参数向量
+        :param weight: SetParameterValue 的混合权重，为 0 时不推送
+        :return: 本帧推送的参数数量
+        """
+        if weight <= 0.0:
+            return 0
+        diff, abs_diff, dirty = self._diff, self._abs_diff, self._dirty
+        np.subtract(values, self.values, out=diff)
+        np.abs(diff, out=abs_diff)
+        np.greater(abs_diff, self._threshold, out=dirty)
+        indices = np.flatnonzero(dirty)
+        for index, value in zip(indices.tolist(), values[indices].tolist()):
+            self.model.SetIndexParamValue(index, value, weight)
+        self.values[indices] += diff[indices] * np.float32(weight)
+        return len(indices)
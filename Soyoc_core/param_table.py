@@ -0,0 +1,117 @@
+import numpy as np
+
+class ParamHandle:
+    __slots__ = ("table", "id", "index")
+
+    def __init__(self, table: "ParamTable", param_id: str, index: int):
+        """
+        参数句柄：解析一次参数名后按下标访问参数表，避免每帧按字符串查找
+
+        :param table: 所属的参数表
+        :param param_id: 参数名
+        :param index: 参数在稠密参数向量中的下标
+        """
+        self.table = table
+        self.id = param_id
+        self.index = index
+
+    @property
+    def minimum(self) -> float:
+        return float(self.table.minimum[self.index])
+
+    @property
+    def maximum(self) -> float:
+        return float(self.table.maximum[self.index])
+
+    @property
+    def default(self) -> float:
+        return float(self.table.defaults[self.index])
+
+    def get(self) -> float:
+        return float(self.table.values[self.index])
+
+    def set(self, value: float):
+        self.table.values[self.index] = value
+
+class ParamTable:
+    def __init__(self, param_ids: list[str], minimum, maximum, defaults):
+        """
+        模型参数表：参数名按模型中的顺序编号，取值、最小值、最大值、默认值各为一个 float32 数组，
+        下标与 Live2D 模型的参数下标一致；混合器、物理、动作与推送都以同一顺序的稠密参数向量交换数据
+
+        :param param_ids: 参数名列表
+        :param minimum: 各参数的最小值
+        :param maximum: 各参数的最大值
+        :param defaults: 各参数的默认值
+        """
+        self.ids = list(param_ids)
+        self.index = {param_id: index for index, param_id in enumerate(self.ids)}
+        self.minimum = np.array(minimum, dtype=np.float32)
+        self.maximum = np.array(maximum, dtype=np.float32)
+        self.defaults = np.array(defaults, dtype=np.float32)
+        self.values = self.defaults.copy()  # 最近一次混合后的参数值
+        self._handles: dict[str, ParamHandle] = {}
+
+    @classmethod
+    def from_model(cls, model) -> "ParamTable":
+        """由 live2d.LAppModel 的 GetParameterCount / GetParameter 建立参数表"""
+        params = [model.GetParameter(index) for index in range(model.GetParameterCount())]
+        return cls(
+            [param.id for param in params],
+            [param.min for param in params],
+            [param.max for param in params],
+            [param.default for param in params]
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, param_id: str) -> bool:
+        return param_id in self.index
+
+    def handle(self, param_id: str) -> ParamHandle:
+        """
+        取得参数句柄
+
+        :return: 参数句柄，模型中不存在该参数时为 None
+        """
+        handle = self._handles.get(param_id)
+        if handle is None and param_id in self.index:
+            handle = self._handles[param_id] = ParamHandle(self, param_id, self.index[param_id])
+        return handle
+
+    def indices(self, param_ids: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        将参数名列表映射为稠密参数向量的下标
+
+        :return: (下标数组, 布尔数组)，布尔数组标记 param_ids 中模型存在的参数，下标数组只包含这些参数
+        """
+        found = np.array([param_id in self.index for param_id in param_ids], dtype=bool)
+        indices = np.array([self.index[param_id] for param_id in param_ids if param_id in self.index], dtype=np.int64)
+        return indices, found
+
+    def mask(self, param_ids: list[str]) -> np.ndarray:
+        """布尔数组，标记 param_ids 中的参数"""
+        mask = np.zeros(len(self.ids), dtype=bool)
+        mask[self.indices(param_ids)[0]] = True
+        return mask
+
+    def reset(self, values: np.ndarray = None):
+        """把参数向量 (默认为 self.values) 恢复为默认值"""
+        np.copyto(self.values if values is None else values, self.defaults)
+
+    def clamp(self, values: np.ndarray = None):
+        """把参数向量 (默认为 self.values) 限制在各参数的取值范围内"""
+        values = self.values if values is None else values
+        np.clip(values, self.minimum, self.maximum, out=values)
+
+    def range_dict(self) -> dict[str, dict[str, float]]:
+        """{"参数名": {"min": , "max": , "default": }}，用于物理等按参数名配置的模块"""
+        return {
+            param_id: {"min": float(minimum), "max": float(maximum), "default": float(default)}
+            for param_id, minimum, maximum, default in zip(self.ids, self.minimum, self.maximum, self.defaults)
+        }
+
+    def default_dict(self) -> dict[str, float]:
+        """{"参数名": 默认值}"""
+        return {param_id: float(default) for param_id, default in zip(self.ids, self.defaults)}
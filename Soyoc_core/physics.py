@@ -1,7 +1,475 @@
 import numpy as np
+import logging
+import math
+import struct
 
-class PhysicsSimulator:
-    def __init__(self, 
+# 与 Cubism SDK 一致的物理常量
+AIR_RESISTANCE = 5.0
+MOVEMENT_THRESHOLD = 0.001
+
+# 物理状态快照的文件头：魔数, 版本, 粒子链数, 每条粒子链保存的粒子数
+SNAPSHOT_MAGIC = b"SYPS"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<4sHII")
+
+class BatchedPhysicsSimulator:
+    def __init__(self,
+                 strands: list[dict],
+                 gravity: list = [0.0, -1],
+                 air_resistance: float = 1.0,
+                 movement_threshold: float = 0.01,
+                 sleep_frames: int = 30):
+        """
+        批量物理模拟器：将多条粒子链打包为填充后的结构数组，一次推进所有粒子链
+
+        状态按 (粒子下标, 分量, 粒子链) 存储，同一粒子下标的所有粒子链在内存中连续；
+        每步只写入预分配的缓冲区，稳态下不产生任何堆分配
+
+        :param strands: 每条粒子链的参数字典列表，字典包含等长列表 radius, delay, acceleration, mobility，
+                        可选 gravity (该粒子链的基础重力方向) 与 threshold (该粒子链的移动阈值)
+        :param gravity: 基础重力方向，粒子链未指定 gravity 时使用
+        :param air_resistance: 空气阻力系数
+        :param movement_threshold: 移动阈值，同时作为静止判定的速度阈值，粒子链未指定 threshold 时使用
+        :param sleep_frames: 输入不变且所有粒子速度低于阈值持续的帧数，达到后粒子链进入休眠
+        """
+        if not strands:
+            raise ValueError("strands 不能为空")
+
+        keys = ["radius", "delay", "acceleration", "mobility"]
+        for strand in strands:
+            if not all(isinstance(strand[key], list) for key in keys):
+                raise TypeError("radius, delay, acceleration, mobility 必须为列表")
+            if not all(len(strand[key]) == len(strand["radius"]) for key in keys):
+                raise ValueError("同一粒子链的参数列表长度必须一致")
+
+        self.strand_num = len(strands)
+        self.strand_counts = np.array([len(strand["radius"]) for strand in strands], dtype=np.int64)
+        self.max_count = int(self.strand_counts.max())
+        shape = (self.max_count, self.strand_num)
+
+        # 粒子参数 (max_count x strand_num，填充部分为 0)
+        self.radius = np.zeros(shape, dtype=np.float32)
+        self.delay = np.zeros(shape, dtype=np.float32)
+        self.acceleration = np.zeros(shape, dtype=np.float32)
+        self.mobility = np.zeros(shape, dtype=np.float32)
+        for index, strand in enumerate(strands):
+            count = self.strand_counts[index]
+            self.radius[:count, index] = strand["radius"]
+            self.delay[:count, index] = strand["delay"]
+            self.acceleration[:count, index] = strand["acceleration"]
+            self.mobility[:count, index] = strand["mobility"]
+
+        # 有效粒子与末端粒子掩码
+        self.valid = np.arange(self.max_count)[:, None] < self.strand_counts[None, :]
+        self.is_tip = np.arange(self.max_count)[:, None] == (self.strand_counts - 1)[None, :]
+
+        # 粒子状态 (max_count x 2 x strand_num)，初始时各粒子沿重力方向以 radius 为间距自然下垂
+        self.gravity = np.empty((2, self.strand_num), dtype=np.float32)
+        self.gravity.T[:] = [strand.get("gravity", gravity) for strand in strands]
+        self.gravity /= np.maximum(np.hypot(self.gravity[0], self.gravity[1]), 1e-6)
+        self._position = np.cumsum(self.radius, axis=0)[:, None, :] * self.gravity[None, :, :]
+        self._position *= self.valid[:, None, :]
+        self._velocity = np.zeros((self.max_count, 2, self.strand_num), dtype=np.float32)
+        self._last_gravity = np.empty((self.max_count, 2, self.strand_num), dtype=np.float32)
+        self._last_gravity[:] = self.gravity
+        self._tip = np.ascontiguousarray(self._position[self.strand_counts - 1, :, np.arange(self.strand_num)].T)
+
+        # 对外的只读视图，形如 (strand_num, max_count, 2) 与 (strand_num, 2)
+        self.particle_positions = self._position.transpose(2, 0, 1)
+        self.particle_velocities = self._velocity.transpose(2, 0, 1)
+        self.tip_positions = self._tip.T
+        for view in (self.particle_positions, self.particle_velocities, self.tip_positions):
+            view.flags.writeable = False
+
+        # 输入缓冲区：调用 step() 前直接写入
+        self.translation = np.zeros((2, self.strand_num), dtype=np.float32)   # 根节点位移
+        self.angle = np.zeros(self.strand_num, dtype=np.float32)              # 整体旋转角度 (度)
+        self.wind = np.zeros((2, self.strand_num), dtype=np.float32)          # 风力方向
+
+        # 环境参数
+        self.air_resistance = air_resistance
+        self.threshold = np.array([strand.get("threshold", movement_threshold) for strand in strands], dtype=np.float32)
+
+        # 休眠状态 (输入为 根节点位移, 重力, 风力)
+        self.sleep_frames = sleep_frames
+        self.rest_frames = np.zeros(self.strand_num, dtype=np.int64)
+        self.sleeping = np.zeros(self.strand_num, dtype=bool)
+        self._inputs = np.zeros((6, self.strand_num), dtype=np.float32)
+        self._last_inputs = np.full((6, self.strand_num), np.nan, dtype=np.float32)
+
+        self._allocate_scratch()
+
+    def _allocate_scratch(self):
+        """预分配每步使用的临时缓冲区、常量与各粒子下标的视图"""
+        def buffer(dtype=np.float32):
+            return np.zeros(self.strand_num, dtype=dtype)
+
+        def constant(value, dtype=np.float32):
+            return np.array(value, dtype=dtype)
+
+        self._cos_t, self._sin_t, self._temp, self._norm = buffer(), buffer(), buffer(), buffer()
+        self._current_gravity = np.zeros((2, self.strand_num), dtype=np.float32)
+        self._input_diff = np.zeros((6, self.strand_num), dtype=np.float32)
+        self._max_diff = buffer()
+        self._effective_delay, self._safe_delay, self._delay_squared = buffer(), buffer(), buffer()
+        self._cross, self._dot, self._radian, self._cos_r, self._sin_r = buffer(), buffer(), buffer(), buffer(), buffer()
+        self._last_x, self._last_y = buffer(), buffer()
+        self._dir_x, self._dir_y, self._new_x, self._new_y = buffer(), buffer(), buffer(), buffer()
+        self._velocity_x, self._velocity_y = buffer(), buffer()
+        self._unchanged, self._awake, self._active, self._mask = buffer(bool), buffer(bool), buffer(bool), buffer(bool)
+        self._moving, self._at_rest = buffer(bool), buffer(bool)
+        self._rest_next = buffer(np.int64)
+        self._awake_float = buffer()
+        self._ones_row = np.ones((1, self.strand_num), dtype=np.float32)
+        self._awake_count = np.zeros(1, dtype=np.float32)
+        self._any_awake = np.zeros(1, dtype=bool)
+
+        self._deg2rad = constant(np.pi / 180)
+        self._dt30 = constant(0.0)
+        self._inv_air = constant(1 / self.air_resistance)
+        self._threshold = self.threshold
+        self._epsilon = constant(1e-6)
+        self._tiny = constant(1e-30)
+        self._zero = constant(0.0)
+        self._one = constant(1.0)
+        self._half = constant(0.5)
+        self._zero_int = constant(0, np.int64)
+        self._one_int = constant(1, np.int64)
+        self._sleep_frames = constant(self.sleep_frames, np.int64)
+
+        # 预先取好的行视图，避免每步切片产生新的数组对象
+        self._gravity_x, self._gravity_y = self.gravity[0], self.gravity[1]
+        self._current_x, self._current_y = self._current_gravity[0], self._current_gravity[1]
+        self._translation_x, self._translation_y = self.translation[0], self.translation[1]
+        self._wind_x, self._wind_y = self.wind[0], self.wind[1]
+        self._tip_x, self._tip_y = self._tip[0], self._tip[1]
+        self._input_rows = [self._inputs[row] for row in range(6)]
+        self._diff_rows = [self._input_diff[row] for row in range(6)]
+        self._pos_x = [self._position[i, 0] for i in range(self.max_count)]
+        self._pos_y = [self._position[i, 1] for i in range(self.max_count)]
+        self._vel_x = [self._velocity[i, 0] for i in range(self.max_count)]
+        self._vel_y = [self._velocity[i, 1] for i in range(self.max_count)]
+        self._last_gravity_x = [self._last_gravity[i, 0] for i in range(self.max_count)]
+        self._last_gravity_y = [self._last_gravity[i, 1] for i in range(self.max_count)]
+        self._radius_rows = [self.radius[i] for i in range(self.max_count)]
+        self._delay_rows = [self.delay[i] for i in range(self.max_count)]
+        self._acceleration_rows = [self.acceleration[i] for i in range(self.max_count)]
+        self._mobility_rows = [self.mobility[i] for i in range(self.max_count)]
+        self._valid_rows = [self.valid[i] for i in range(self.max_count)]
+        self._tip_rows = [self.is_tip[i] for i in range(self.max_count)]
+
+    def update(self,
+               delta_time: float,
+               total_translation=None,
+               total_angle=None,
+               wind_direction=None):
+        """
+        写入输入缓冲区后推进一步，便于以数组或列表传参
+
+        :param delta_time: 时间步长 (秒)
+        :param total_translation: 各粒子链根节点位移，形如 (strand_num, 2)
+        :param total_angle: 各粒子链整体旋转角度 (度)，形如 (strand_num,) 或标量
+        :param wind_direction: 风力方向，形如 (strand_num, 2) 或 (2,)
+        :return: 是否有粒子链被推进 (全部休眠时返回 False)
+        """
+        if total_translation is not None:
+            self.translation.T[:] = total_translation
+        if total_angle is not None:
+            self.angle[:] = total_angle
+        if wind_direction is not None:
+            self.wind.T[:] = wind_direction
+        return self.step(delta_time)
+
+    def step(self, delta_time: float):
+        """
+        以 translation, angle, wind 缓冲区为输入推进所有粒子链一个时间步
+        只有父子粒子间的递推保留循环，且在粒子链维度上向量化
+
+        :param delta_time: 时间步长 (秒)
+        :return: 是否有粒子链被推进 (全部休眠时返回 False)
+        """
+        temp = self._temp
+        current_x, current_y = self._current_x, self._current_y
+
+        # 旋转基础重力并保持单位向量特性
+        np.multiply(self.angle, self._deg2rad, out=temp)
+        np.cos(temp, out=self._cos_t)
+        np.sin(temp, out=self._sin_t)
+        np.multiply(self._cos_t, self._gravity_x, out=current_x)
+        np.multiply(self._sin_t, self._gravity_y, out=temp)
+        np.subtract(current_x, temp, out=current_x)
+        np.multiply(self._sin_t, self._gravity_x, out=current_y)
+        np.multiply(self._cos_t, self._gravity_y, out=temp)
+        np.add(current_y, temp, out=current_y)
+        np.hypot(current_x, current_y, out=self._norm)
+        np.maximum(self._norm, self._epsilon, out=self._norm)
+        np.divide(current_x, self._norm, out=current_x)
+        np.divide(current_y, self._norm, out=current_y)
+
+        # 输入变化时立即唤醒，全部休眠则跳过本次模拟
+        inputs, diffs = self._input_rows, self._diff_rows
+        np.copyto(inputs[0], self._translation_x)
+        np.copyto(inputs[1], self._translation_y)
+        np.copyto(inputs[2], current_x)
+        np.copyto(inputs[3], current_y)
+        np.copyto(inputs[4], self._wind_x)
+        np.copyto(inputs[5], self._wind_y)
+        np.subtract(self._inputs, self._last_inputs, out=self._input_diff)
+        np.abs(self._input_diff, out=self._input_diff)
+        max_diff = self._max_diff
+        np.maximum(diffs[0], diffs[1], out=max_diff)
+        np.maximum(max_diff, diffs[2], out=max_diff)
+        np.maximum(max_diff, diffs[3], out=max_diff)
+        np.maximum(max_diff, diffs[4], out=max_diff)
+        np.maximum(max_diff, diffs[5], out=max_diff)
+        np.less_equal(max_diff, self._epsilon, out=self._unchanged)   # 首帧为 NaN，视为变化
+        np.copyto(self._last_inputs, self._inputs)
+        np.logical_and(self.sleeping, self._unchanged, out=self.sleeping)
+        awake = self._awake
+        np.logical_not(self.sleeping, out=awake)
+        np.copyto(self._awake_float, awake)
+        np.dot(self._ones_row, self._awake_float, out=self._awake_count)   # 归约会分配临时对象，以矩阵乘法计数
+        np.greater(self._awake_count, self._half, out=self._any_awake)
+        if not self._any_awake:
+            return False
+
+        # 根节点
+        np.copyto(self._pos_x[0], self._translation_x)
+        np.copyto(self._pos_y[0], self._translation_y)
+        np.putmask(self._tip_x, self._tip_rows[0], self._translation_x)
+        np.putmask(self._tip_y, self._tip_rows[0], self._translation_y)
+
+        self._dt30.fill(delta_time * 30)
+        active, mask, moving = self._active, self._mask, self._moving
+        cross, dot, radian, cos_r, sin_r = self._cross, self._dot, self._radian, self._cos_r, self._sin_r
+        dir_x, dir_y, new_x, new_y = self._dir_x, self._dir_y, self._new_x, self._new_y
+        last_x, last_y, velocity_x, velocity_y = self._last_x, self._last_y, self._velocity_x, self._velocity_y
+        effective_delay, delay_squared = self._effective_delay, self._delay_squared
+        moving.fill(False)
+
+        # 父子粒子递推
+        i = 1
+        while i < self.max_count:
+            pos_x, pos_y = self._pos_x[i], self._pos_y[i]
+            prev_x, prev_y = self._pos_x[i - 1], self._pos_y[i - 1]
+            vel_x, vel_y = self._vel_x[i], self._vel_y[i]
+            last_gravity_x, last_gravity_y = self._last_gravity_x[i], self._last_gravity_y[i]
+            np.logical_and(self._valid_rows[i], awake, out=active)
+
+            # 保存上一帧位置并应用延迟
+            np.copyto(last_x, pos_x)
+            np.copyto(last_y, pos_y)
+            np.multiply(self._delay_rows[i], self._dt30, out=effective_delay)
+            np.multiply(effective_delay, effective_delay, out=delay_squared)
+
+            # 角度差 (上一帧重力与当前重力)
+            np.multiply(last_gravity_x, current_y, out=cross)
+            np.multiply(last_gravity_y, current_x, out=temp)
+            np.subtract(cross, temp, out=cross)
+            np.multiply(last_gravity_x, current_x, out=dot)
+            np.multiply(last_gravity_y, current_y, out=temp)
+            np.add(dot, temp, out=dot)
+            np.arctan2(cross, dot, out=radian)
+            np.multiply(radian, self._inv_air, out=radian)
+            np.cos(radian, out=cos_r)
+            np.sin(radian, out=sin_r)
+
+            # 旋转方向
+            np.subtract(pos_x, prev_x, out=dir_x)
+            np.subtract(pos_y, prev_y, out=dir_y)
+            np.multiply(cos_r, dir_x, out=new_x)
+            np.multiply(sin_r, dir_y, out=temp)
+            np.subtract(new_x, temp, out=new_x)
+            np.multiply(sin_r, dir_x, out=new_y)
+            np.multiply(cos_r, dir_y, out=temp)
+            np.add(new_y, temp, out=new_y)
+
+            # 叠加速度与受力 (重力 * 加速度 + 风力)
+            np.multiply(vel_x, effective_delay, out=temp)
+            np.add(new_x, temp, out=new_x)
+            np.multiply(vel_y, effective_delay, out=temp)
+            np.add(new_y, temp, out=new_y)
+            np.multiply(current_x, self._acceleration_rows[i], out=temp)
+            np.add(temp, self._wind_x, out=temp)
+            np.multiply(temp, delay_squared, out=temp)
+            np.add(new_x, temp, out=new_x)
+            np.multiply(current_y, self._acceleration_rows[i], out=temp)
+            np.add(temp, self._wind_y, out=temp)
+            np.multiply(temp, delay_squared, out=temp)
+            np.add(new_y, temp, out=new_y)
+
+            # 约束长度
+            np.hypot(new_x, new_y, out=self._norm)
+            np.maximum(self._norm, self._tiny, out=self._norm)
+            np.divide(self._radius_rows[i], self._norm, out=self._norm)
+            np.multiply(new_x, self._norm, out=new_x)
+            np.multiply(new_y, self._norm, out=new_y)
+            np.add(prev_x, new_x, out=new_x)
+            np.add(prev_y, new_y, out=new_y)
+
+            # 应用移动阈值
+            np.abs(new_x, out=temp)
+            np.less(temp, self._threshold, out=mask)
+            np.putmask(new_x, mask, self._zero)
+            np.putmask(pos_x, active, new_x)
+            np.putmask(pos_y, active, new_y)
+
+            # 更新速度
+            np.equal(effective_delay, self._zero, out=mask)
+            np.copyto(self._safe_delay, effective_delay)
+            np.putmask(self._safe_delay, mask, self._one)
+            np.divide(self._mobility_rows[i], self._safe_delay, out=self._safe_delay)
+            np.subtract(pos_x, last_x, out=velocity_x)
+            np.multiply(velocity_x, self._safe_delay, out=velocity_x)
+            np.subtract(pos_y, last_y, out=velocity_y)
+            np.multiply(velocity_y, self._safe_delay, out=velocity_y)
+            np.putmask(velocity_x, mask, self._zero)
+            np.putmask(velocity_y, mask, self._zero)
+            np.putmask(vel_x, active, velocity_x)
+            np.putmask(vel_y, active, velocity_y)
+
+            # 更新重力记录与末端位置
+            np.putmask(last_gravity_x, active, current_x)
+            np.putmask(last_gravity_y, active, current_y)
+            np.putmask(self._tip_x, self._tip_rows[i], pos_x)
+            np.putmask(self._tip_y, self._tip_rows[i], pos_y)
+
+            # 静止检测：记录是否有粒子速度超过阈值
+            np.abs(vel_x, out=temp)
+            np.greater_equal(temp, self._threshold, out=mask)
+            np.logical_or(moving, mask, out=moving)
+            np.abs(vel_y, out=temp)
+            np.greater_equal(temp, self._threshold, out=mask)
+            np.logical_or(moving, mask, out=moving)
+            i += 1
+
+        # 输入不变且所有粒子速度低于阈值的帧数达到 sleep_frames 后休眠
+        at_rest = self._at_rest
+        np.logical_not(moving, out=at_rest)
+        np.logical_and(at_rest, self._unchanged, out=at_rest)
+        np.logical_and(at_rest, awake, out=at_rest)
+        np.add(self.rest_frames, self._one_int, out=self._rest_next)
+        np.putmask(self.rest_frames, awake, self._zero_int)
+        np.putmask(self.rest_frames, at_rest, self._rest_next)
+        np.greater_equal(self.rest_frames, self._sleep_frames, out=mask)
+        np.logical_or(self.sleeping, mask, out=self.sleeping)
+        return True
+
+    def wake(self):
+        """立即唤醒所有粒子链"""
+        self.sleeping[:] = False
+        self.rest_frames[:] = 0
+
+    def is_sleeping(self) -> bool:
+        """是否所有粒子链都已休眠"""
+        return np.count_nonzero(self.sleeping) == self.strand_num
+
+    def set_inertial_force(self,
+                           force_x: float,
+                           force_y: float,
+                           gravity_x: np.ndarray = None,
+                           gravity_y: np.ndarray = None,
+                           base_x: float = 0.0,
+                           base_y: float = -1.0):
+        """
+        根据惯性力修改粒子链的重力方向 (不产生堆分配)
+
+        :param gravity_x: 要修改的重力 x 分量视图，默认为所有粒子链
+        :param gravity_y: 要修改的重力 y 分量视图，默认为所有粒子链
+        :param base_x: 无惯性力时的重力方向 x 分量
+        :param base_y: 无惯性力时的重力方向 y 分量
+        """
+        norm = math.hypot(force_x, force_y)
+        if norm != 0:
+            force_x, force_y = force_x / norm, force_y / norm
+
+        direction_x, direction_y = base_x + force_x * 0.9, base_y + force_y * 0.9
+        norm = math.hypot(direction_x, direction_y)
+        if norm == 0:
+            direction_x, direction_y, norm = base_x, base_y, 1.0
+        (self._gravity_x if gravity_x is None else gravity_x).fill(direction_x / norm)
+        (self._gravity_y if gravity_y is None else gravity_y).fill(direction_y / norm)
+
+    def _snapshot_fields(self, strands: slice, count: int) -> list:
+        """快照中依次保存的状态视图与其存储类型"""
+        return [
+            (self._position[:count, :, strands], "<f4"),
+            (self._velocity[:count, :, strands], "<f4"),
+            (self._last_gravity[:count, :, strands], "<f4"),
+            (self.gravity[:, strands], "<f4"),
+            (self._tip[:, strands], "<f4"),
+            (self.translation[:, strands], "<f4"),
+            (self.angle[strands], "<f4"),
+            (self.wind[:, strands], "<f4"),
+            (self._last_inputs[:, strands], "<f4"),
+            (self.rest_frames[strands], "<i4"),
+            (self.sleeping[strands], "u1"),
+        ]
+
+    def snapshot(self, strands: slice = slice(None)) -> bytes:
+        """
+        将粒子链的完整状态打包为紧凑的二进制数据
+
+        :param strands: 要保存的粒子链范围，默认为所有粒子链
+        """
+        counts = self.strand_counts[strands]
+        count = int(counts.max())
+        blob = [SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(counts), count), counts.astype("<i4").tobytes()]
+        for view, dtype in self._snapshot_fields(strands, count):
+            blob.append(np.ascontiguousarray(view, dtype=dtype).tobytes())
+        return b"".join(blob)
+
+    def restore(self, blob: bytes, strands: slice = slice(None)):
+        """
+        从 snapshot() 的数据恢复粒子链状态，粒子链数量与各自的粒子数必须一致
+
+        :param strands: 要恢复的粒子链范围，默认为所有粒子链
+        """
+        if len(blob) < SNAPSHOT_HEADER.size:
+            raise ValueError("物理状态快照长度不符")
+        magic, version, strand_num, count = SNAPSHOT_HEADER.unpack_from(blob)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError("物理状态快照格式不符")
+        counts = self.strand_counts[strands]
+        offset = SNAPSHOT_HEADER.size
+        if len(blob) < offset + strand_num * 4:
+            raise ValueError("物理状态快照长度不符")
+        if strand_num != len(counts) or not np.array_equal(np.frombuffer(blob, "<i4", strand_num, offset), counts):
+            raise ValueError("物理状态快照与当前粒子链结构不符")
+        offset += strand_num * 4
+
+        fields = self._snapshot_fields(strands, count)
+        if len(blob) != offset + sum(view.size * np.dtype(dtype).itemsize for view, dtype in fields):
+            raise ValueError("物理状态快照长度不符")
+        for view, dtype in fields:
+            view[...] = np.frombuffer(blob, dtype, view.size, offset).reshape(view.shape)
+            offset += view.size * np.dtype(dtype).itemsize
+
+    def copy_state_from(self, other: "BatchedPhysicsSimulator", source: slice, target: slice):
+        """
+        从另一个模拟器复制一段粒子链的状态，用于增删粒子链后重建模拟器时保留运动状态
+
+        :param other: 源模拟器
+        :param source: 源模拟器中的粒子链范围
+        :param target: 本模拟器中的粒子链范围，长度需与 source 一致
+        """
+        count = min(self.max_count, other.max_count)
+        self._position[:count, :, target] = other._position[:count, :, source]
+        self._velocity[:count, :, target] = other._velocity[:count, :, source]
+        self._last_gravity[:count, :, target] = other._last_gravity[:count, :, source]
+        self._tip[:, target] = other._tip[:, source]
+        self._last_inputs[:, target] = other._last_inputs[:, source]
+        for name in ("gravity", "translation", "wind"):
+            getattr(self, name)[:, target] = getattr(other, name)[:, source]
+        for name in ("angle", "rest_frames", "sleeping"):
+            getattr(self, name)[target] = getattr(other, name)[source]
+
+    def change_gravity(self, inertial_force: list):
+        """根据惯性力修改所有粒子链的重力方向"""
+        self.set_inertial_force(float(inertial_force[0]), float(inertial_force[1]))
+
+class PhysicsSimulator(BatchedPhysicsSimulator):
+    def __init__(self,
                  strand_count: int,
                  particle_radius: list,  # 输入为列表
                  delay: list,            # 输入为列表
@@ -11,6 +479,8 @@ class PhysicsSimulator:
                  air_resistance: float = 1.0,
                  movement_threshold: float = 0.01):
         """
+        单条粒子链模拟器，即只含一条粒子链的 BatchedPhysicsSimulator
+
         :param strand_count: 粒子总数
         :param particle_radius: 每个粒子的半径列表，长度需为 strand_count
         :param delay: 每个粒子的延迟列表，长度需为 strand_count
@@ -22,27 +492,35 @@ class PhysicsSimulator:
         # 参数验证
         if not all(isinstance(lst, list) for lst in [particle_radius, delay, acceleration, mobility]):
             raise TypeError("particle_radius, delay, acceleration, mobility 必须为列表")
-        
+
         if not all(len(lst) == strand_count for lst in [particle_radius, delay, acceleration, mobility]):
             raise ValueError(f"所有参数列表长度必须等于 strand_count ({strand_count})")
 
-        # 转换为 NumPy 数组以优化计算
+        super().__init__(
+            strands=[{
+                "radius": particle_radius,
+                "delay": delay,
+                "acceleration": acceleration,
+                "mobility": mobility
+            }],
+            gravity=gravity,
+            air_resistance=air_resistance,
+            movement_threshold=movement_threshold
+        )
         self.strand_count = strand_count
-        self.gravity = np.array(gravity, dtype=np.float32)
-        self.particles = {
-            'position': np.zeros((strand_count, 2), dtype=np.float32),
-            'velocity': np.zeros((strand_count, 2), dtype=np.float32),
-            'last_position': np.zeros((strand_count, 2), dtype=np.float32),
-            'last_gravity': np.tile(self.gravity, (strand_count, 1)),
-            'radius': np.array(particle_radius, dtype=np.float32),
-            'delay': np.array(delay, dtype=np.float32),
-            'acceleration': np.array(acceleration, dtype=np.float32),
-            'mobility': np.array(mobility, dtype=np.float32)
+
+    @property
+    def particles(self) -> dict:
+        """粒子状态字典 (均为批量数组的视图)"""
+        return {
+            'position': self.particle_positions[0],
+            'velocity': self.particle_velocities[0],
+            'last_gravity': self._last_gravity[:, :, 0],
+            'radius': self.radius[:, 0],
+            'delay': self.delay[:, 0],
+            'acceleration': self.acceleration[:, 0],
+            'mobility': self.mobility[:, 0]
         }
-        
-        # 环境参数
-        self.air_resistance = air_resistance
-        self.threshold = movement_threshold
 
     def update(self,
                delta_time: float,
@@ -54,100 +532,14 @@ class PhysicsSimulator:
         :param total_translation: 根节点位移 (形如 [x, y] 的列表)
         :param total_angle: 整体旋转角度 (度)
         :param wind_direction: 风力方向 (形如 [x, y] 的列表)
+        :return: 是否推进了模拟 (休眠时返回 False)
         """
-        # 将输入列表转换为 NumPy 数组
-        total_translation = np.array(total_translation, dtype=np.float32)
-        wind_direction = np.array(wind_direction, dtype=np.float32)
-
-        # 更新根节点位置
-        self.particles['position'][0] = total_translation
-
-        # 修改重力方向计算（现在基于输入重力）
-        total_radian = np.deg2rad(total_angle)
-        rotation_matrix = np.array([
-            [np.cos(total_radian), -np.sin(total_radian)],
-            [np.sin(total_radian), np.cos(total_radian)]
-        ])
-        current_gravity = rotation_matrix @ self.gravity  # 旋转基础重力
-
-        # 保持单位向量特性
-        gravity_norm = np.linalg.norm(current_gravity)
-        if gravity_norm > 1e-6:
-            current_gravity /= gravity_norm
-
-        # 更新粒子状态
-        for i in range(1, self.strand_count):
-            prev_idx = i-1
-            curr_idx = i
-
-            # 保存上一帧位置
-            self.particles['last_position'][curr_idx] = self.particles['position'][curr_idx]
-
-            # 计算受力
-            gravity_force = current_gravity * self.particles['acceleration'][curr_idx]
-            total_force = gravity_force + wind_direction
-
-            # 应用延迟
-            effective_delay = self.particles['delay'][curr_idx] * delta_time * 30
-
-            # 计算方向变化
-            direction = self.particles['position'][curr_idx] - self.particles['position'][prev_idx]
-            
-            # 计算角度差
-            last_gravity = self.particles['last_gravity'][curr_idx]
-            angle_diff = np.arctan2(
-                np.cross(last_gravity, current_gravity),
-                np.dot(last_gravity, current_gravity)
-            )
-            radian = angle_diff / self.air_resistance
-
-            # 应用旋转
-            cos_r, sin_r = np.cos(radian), np.sin(radian)
-            rotation_matrix = np.array([[cos_r, -sin_r], [sin_r, cos_r]])
-            rotated_direction = rotation_matrix @ direction
-
-            # 计算新位置
-            base_pos = self.particles['position'][prev_idx] + rotated_direction
-            velocity_effect = self.particles['velocity'][curr_idx] * effective_delay
-            force_effect = total_force * (effective_delay ** 2)
-            new_pos = base_pos + velocity_effect + force_effect
-
-            # 约束长度
-            new_dir = new_pos - self.particles['position'][prev_idx]
-            # if new_dir == [0, 0] and new_dir == [0, 0]:
-            #     unit_dir = 1
-            # else:
-            unit_dir = new_dir / np.linalg.norm(new_dir)
-            constrained_pos = self.particles['position'][prev_idx] + unit_dir * self.particles['radius'][curr_idx]
-
-            # 应用移动阈值
-            if abs(constrained_pos[0]) < self.threshold:
-                constrained_pos[0] = 0.0
-            self.particles['position'][curr_idx] = constrained_pos
-
-            # 更新速度
-            if effective_delay != 0:
-                delta_pos = self.particles['position'][curr_idx] - self.particles['last_position'][curr_idx]
-                self.particles['velocity'][curr_idx] = delta_pos * (self.particles['mobility'][curr_idx] / effective_delay)
-            else:
-                self.particles['velocity'][curr_idx] = np.zeros(2, dtype=np.float32)
-
-            # 更新重力记录
-            self.particles['last_gravity'][curr_idx] = current_gravity
+        return super().update(delta_time, [total_translation], total_angle, wind_direction)
 
     @property
     def positions(self) -> list:
         """获取所有粒子位置 (返回列表的列表)"""
-        return [pos.tolist() for pos in self.particles['position']]
-    
-    def change_gravity(self, inertial_force: list):
-        # 将输入转换为 numpy 数组
-        inertial_force = np.array(inertial_force, dtype=np.float32)
-        if np.linalg.norm(inertial_force) != 0:
-            inertial_force = inertial_force / np.linalg.norm(inertial_force)
-        
-        self.gravity = [0, -1] + np.array(inertial_force, dtype=np.float32) * 0.9
-        self.gravity = self.gravity / np.linalg.norm(self.gravity)
+        return self.particle_positions[0].tolist()
 
 class PhysicsSetting:
     def __init__(self, id: str, name: str):
@@ -155,60 +547,585 @@ class PhysicsSetting:
         self.name = name
         self.input_params = []
         self.output_params = []
-        self.physics_simulator: PhysicsSimulator
-    
+        self.vertices: dict = {}
+        self.normalization = {
+            "Position": {"Minimum": -10, "Default": 0, "Maximum": 10},
+            "Angle": {"Minimum": -10, "Default": 0, "Maximum": 10}
+        }
+
     def get_id(self):
         return self.id
-    
+
     def add_input_param(self, input_params: list[dict]):
         for input_param in input_params:
             self.input_params.append(
                 {
                     "id": input_param["Source"]["Id"],
                     "weight": input_param["Weight"] / 100,
-                    "reflect": input_param["Reflect"]
+                    "reflect": input_param["Reflect"],
+                    "type": input_param.get("Type", "X")
                 }
             )
-    
+
     def add_output_param(self, output_params: list[dict]):
         for output_param in output_params:
             self.output_params.append(
                 {
                     "id": output_param["Destination"]["Id"],
                     "weight": output_param["Weight"] / 100,
-                    "reflect": output_param["Reflect"]
+                    "reflect": output_param["Reflect"],
+                    "type": output_param.get("Type", "Angle"),
+                    "scale": output_param.get("Scale", 1),
+                    "vertex_index": output_param.get("VertexIndex", 1)
                 }
             )
-    
-    def add_physics_simulator(self, count: int, mobility: list, delay: list, acceleration: list, radius: list):
-        self.physics_simulator = PhysicsSimulator(
-            strand_count=count,
-            mobility=mobility,
-            delay=delay,
-            acceleration=acceleration,
-            particle_radius=radius,
-        )
-    
-    def calculate_output_delta(self, model_params: list, delta_t: float):
-        delta_input = 0
-        for input_param in self.input_params:
-            if input_param["reflect"]:
-                delta_input -= model_params[input_param["id"]] * input_param["weight"]
-            else:
-                delta_input += model_params[input_param["id"]] * input_param["weight"]
-        
-        self.physics_simulator.update(delta_time=delta_t, total_translation=[delta_input, 0])
-        delta_output = self.physics_simulator.positions[-1][0] - self.physics_simulator.positions[0][0]
-
-        output_delta = {}
-        for output_param in self.output_params:
-            if output_param["reflect"]:
-                output_delta[output_param["id"]] = - delta_output * output_param["weight"]
+
+    def set_normalization(self, normalization: dict):
+        """设置输入的归一化范围 (Position 用于 X/Y 输入，Angle 用于 Angle 输入)"""
+        for key in self.normalization:
+            self.normalization[key].update(normalization.get(key, {}))
+
+    def add_vertices(self, mobility: list, delay: list, acceleration: list, radius: list):
+        self.vertices = {
+            "radius": radius,
+            "delay": delay,
+            "acceleration": acceleration,
+            "mobility": mobility,
+            "threshold": MOVEMENT_THRESHOLD * self.normalization["Position"]["Maximum"]
+        }
+
+class PhysicsIOGraph:
+    def __init__(self, physics_settings: list[PhysicsSetting], param_ids: list[str], model_params_range: dict, gravity: list = [0.0, -1.0]):
+        """
+        加载时将 physics3.json 的 Input/Output 表编译为稠密参数向量上的扁平系数数组与矩阵，
+        归一化范围、输出缩放、顶点下标与有效力均在此预计算，每帧只做矩阵乘法与逐元素运算
+
+        :param physics_settings: 已添加输入输出参数与归一化范围的 PhysicsSetting 列表
+        :param param_ids: 稠密参数向量中各参数的 id，顺序即向量下标
+        :param model_params_range: 模型参数范围字典
+        :param gravity: Meta.EffectiveForces.Gravity，VertexIndex 为 1 的角度输出以其反方向为基准
+        """
+        self.param_index = {param_id: index for index, param_id in enumerate(param_ids)}
+        self.physics_settings = physics_settings
+        self.strand_counts = [len(physics_setting.vertices["radius"]) for physics_setting in physics_settings]
+        param_num, setting_num = len(param_ids), len(physics_settings)
+
+        # 输入：每个输入项一列，先按参数范围与 Normalization 归一化，再按 Type 累加到 X/Y/Angle
+        inputs = []
+        for row, physics_setting in enumerate(physics_settings):
+            for input_param in physics_setting.input_params:
+                if input_param["id"] not in self.param_index:
+                    logging.warning(f"物理输入参数 {input_param['id']} 不存在于模型中，已忽略")
+                elif input_param["type"] not in ("X", "Y", "Angle"):
+                    logging.warning(f"物理输入参数 {input_param['id']} 的类型 {input_param['type']} 无法识别，已忽略")
+                else:
+                    inputs.append((row, input_param))
+        self.input_ids = list(dict.fromkeys(input_param["id"] for _, input_param in inputs))
+        self.input_indices = np.array([self.param_index[param_id] for param_id in self.input_ids], dtype=np.intp)
+
+        input_num = len(inputs)
+        self.input_select = np.zeros((input_num, param_num), dtype=np.float32)
+        self.input_minimum, self.input_maximum, self.input_middle = (np.zeros(input_num, dtype=np.float32) for _ in range(3))
+        self.input_ratio_positive, self.input_ratio_negative, self.input_normalized_middle = (np.zeros(input_num, dtype=np.float32) for _ in range(3))
+        self.translation_x_weights = np.zeros((setting_num, input_num), dtype=np.float32)
+        self.translation_y_weights = np.zeros((setting_num, input_num), dtype=np.float32)
+        self.angle_weights = np.zeros((setting_num, input_num), dtype=np.float32)
+        for column, (row, input_param) in enumerate(inputs):
+            param_range = model_params_range[input_param["id"]]
+            minimum, maximum = min(param_range["min"], param_range["max"]), max(param_range["min"], param_range["max"])
+            middle = minimum + (maximum - minimum) / 2
+            normalization = self.physics_settings[row].normalization["Angle" if input_param["type"] == "Angle" else "Position"]
+            normalized_minimum = min(normalization["Minimum"], normalization["Maximum"])
+            normalized_maximum = max(normalization["Minimum"], normalization["Maximum"])
+
+            self.input_select[column, self.param_index[input_param["id"]]] = 1
+            self.input_minimum[column], self.input_maximum[column], self.input_middle[column] = minimum, maximum, middle
+            self.input_ratio_positive[column] = (normalized_maximum - normalization["Default"]) / (maximum - middle) if maximum != middle else 0
+            self.input_ratio_negative[column] = (normalized_minimum - normalization["Default"]) / (minimum - middle) if minimum != middle else 0
+            self.input_normalized_middle[column] = normalization["Default"]
+
+            # 与 Cubism SDK 一致，未反向的输入取负；角度取负后即为模拟器的重力旋转角度
+            sign = 1 if input_param["reflect"] else -1
+            if input_param["type"] == "X":
+                self.translation_x_weights[row, column] += sign * input_param["weight"]
+            elif input_param["type"] == "Y":
+                self.translation_y_weights[row, column] += sign * input_param["weight"]
             else:
-                output_delta[output_param["id"]] = delta_output * output_param["weight"]
-        return output_delta
+                self.angle_weights[row, column] -= sign * input_param["weight"]
+
+        # 输出：同一参数被多个 PhysicsSetting 输出时以最后一个为准
+        output_source = {}
+        for row, physics_setting in enumerate(physics_settings):
+            for output_param in physics_setting.output_params:
+                if output_param["id"] not in self.param_index:
+                    logging.warning(f"物理输出参数 {output_param['id']} 不存在于模型中，已忽略")
+                elif output_param["type"] not in ("X", "Y", "Angle"):
+                    logging.warning(f"物理输出参数 {output_param['id']} 的类型 {output_param['type']} 无法识别，已忽略")
+                elif not 1 <= output_param["vertex_index"] < self.strand_counts[row]:
+                    logging.warning(f"物理输出参数 {output_param['id']} 的 VertexIndex 超出粒子数量，已忽略")
+                else:
+                    output_source.pop(output_param["id"], None)
+                    output_source[output_param["id"]] = (row, output_param)
+        self.output_ids = list(output_source.keys())
+        self.output_indices = np.array([self.param_index[param_id] for param_id in self.output_ids], dtype=np.intp)
+        self.output_sources = list(output_source.values())
+
+        output_num = len(self.output_ids)
+        self.output_select = np.zeros((output_num, param_num), dtype=np.float32)
+        self.output_select[np.arange(output_num), self.output_indices] = 1
+        self.is_x, self.is_y, self.is_angle, self.output_sign = (np.zeros(output_num, dtype=np.float32) for _ in range(4))
+        self.output_scale, self.output_weight, self.output_keep = (np.zeros(output_num, dtype=np.float32) for _ in range(3))
+        self.output_minimum, self.output_maximum = np.zeros(output_num, dtype=np.float32), np.zeros(output_num, dtype=np.float32)
+        self.parent_offset_x, self.parent_offset_y = np.zeros(output_num, dtype=np.float32), np.zeros(output_num, dtype=np.float32)
+        for column, (param_id, (row, output_param)) in enumerate(output_source.items()):
+            self.is_x[column] = output_param["type"] == "X"
+            self.is_y[column] = output_param["type"] == "Y"
+            self.is_angle[column] = output_param["type"] == "Angle"
+            self.output_sign[column] = -1 if output_param["reflect"] else 1
+            self.output_scale[column] = output_param["scale"]
+            self.output_weight[column] = min(output_param["weight"], 1)
+            self.output_keep[column] = 1 - self.output_weight[column]
+            self.output_minimum[column] = min(model_params_range[param_id]["min"], model_params_range[param_id]["max"])
+            self.output_maximum[column] = max(model_params_range[param_id]["min"], model_params_range[param_id]["max"])
+            if output_param["vertex_index"] == 1:
+                self.parent_offset_x[column], self.parent_offset_y[column] = - gravity[0], - gravity[1]
+
+        self._allocate_scratch(setting_num, input_num, output_num)
+
+    def _allocate_scratch(self, setting_num: int, input_num: int, output_num: int):
+        """预分配每帧使用的临时缓冲区与常量"""
+        self._input_values, self._input_positive, self._input_negative = (np.zeros(input_num, dtype=np.float32) for _ in range(3))
+        self._last_input_values = np.full(input_num, np.nan, dtype=np.float32)
+        self._input_difference_row = self._input_negative.reshape(1, input_num)
+        self._input_difference = np.zeros(1, dtype=np.float32)
+        self._cos, self._sin, self._temp = (np.zeros(setting_num, dtype=np.float32) for _ in range(3))
+        self._translation_x, self._translation_y = np.zeros(output_num, dtype=np.float32), np.zeros(output_num, dtype=np.float32)
+        self._parent_x, self._parent_y = np.zeros(output_num, dtype=np.float32), np.zeros(output_num, dtype=np.float32)
+        self._angle, self._output_temp = np.zeros(output_num, dtype=np.float32), np.zeros(output_num, dtype=np.float32)
+        self._current_values = np.zeros(output_num, dtype=np.float32)
+        self._zero = np.array(0.0, dtype=np.float32)
+        self._pi = np.array(np.pi, dtype=np.float32)
+        self._two_pi = np.array(2 * np.pi, dtype=np.float32)
+        self._deg2rad = np.array(np.pi / 180, dtype=np.float32)
+
+    def bind_layout(self, max_count: int, strand_num: int, strand_offset: int):
+        """
+        按模拟器的状态布局编译输出矩阵，作用于展平后的 (max_count x 2 x strand_num) 粒子位置
+
+        :param strand_offset: 本图的第一个 PhysicsSetting 在模拟器中的粒子链下标
+        """
+        def column(vertex: int, axis: int, row: int) -> int:
+            return (vertex * 2 + axis) * strand_num + strand_offset + row
+
+        size = max_count * 2 * strand_num
+        output_num = len(self.output_ids)
+        self.translation_x_matrix, self.translation_y_matrix, self.parent_x_matrix, self.parent_y_matrix = (
+            np.zeros((output_num, size), dtype=np.float32) for _ in range(4))
+        for index, (row, output_param) in enumerate(self.output_sources):
+            vertex = output_param["vertex_index"]
+            for axis, translation_matrix, parent_matrix in ((0, self.translation_x_matrix, self.parent_x_matrix),
+                                                            (1, self.translation_y_matrix, self.parent_y_matrix)):
+                translation_matrix[index, column(vertex, axis, row)] += 1
+                translation_matrix[index, column(vertex - 1, axis, row)] -= 1
+                if vertex >= 2:
+                    parent_matrix[index, column(vertex - 1, axis, row)] += 1
+                    parent_matrix[index, column(vertex - 2, axis, row)] -= 1
+
+    def gather(self, param_values: np.ndarray, translation_x: np.ndarray, translation_y: np.ndarray, angle: np.ndarray):
+        """
+        从稠密参数向量计算各 PhysicsSetting 的根节点位移与重力旋转角度 (不产生堆分配)
+
+        :param translation_x: 输出的根节点 x 位移，长度为 PhysicsSetting 数
+        :param translation_y: 输出的根节点 y 位移
+        :param angle: 输出的重力旋转角度 (度)
+        """
+        values, positive, negative = self._input_values, self._input_positive, self._input_negative
+        np.dot(self.input_select, param_values, out=values)
+
+        # 输入参数与上次相同时沿用上次的结果 (首次调用时差值为 NaN)
+        np.subtract(values, self._last_input_values, out=negative)
+        np.dot(self._input_difference_row, negative, out=self._input_difference)
+        if not self._input_difference:
+            return
+        np.copyto(self._last_input_values, values)
+
+        np.minimum(values, self.input_maximum, out=values)
+        np.maximum(values, self.input_minimum, out=values)
+        np.subtract(values, self.input_middle, out=values)
+        np.maximum(values, self._zero, out=positive)
+        np.multiply(positive, self.input_ratio_positive, out=positive)
+        np.minimum(values, self._zero, out=negative)
+        np.multiply(negative, self.input_ratio_negative, out=negative)
+        np.add(positive, negative, out=values)
+        np.add(values, self.input_normalized_middle, out=values)
+
+        np.dot(self.translation_x_weights, values, out=translation_x)
+        np.dot(self.translation_y_weights, values, out=translation_y)
+        np.dot(self.angle_weights, values, out=angle)
+
+        # 位移随整体角度旋转，与 Cubism SDK 一致，y 分量使用旋转后的 x
+        np.multiply(angle, self._deg2rad, out=self._temp)
+        np.cos(self._temp, out=self._cos)
+        np.sin(self._temp, out=self._sin)
+        np.multiply(translation_x, self._cos, out=translation_x)
+        np.multiply(translation_y, self._sin, out=self._temp)
+        np.subtract(translation_x, self._temp, out=translation_x)
+        np.multiply(translation_x, self._sin, out=self._temp)
+        np.multiply(translation_y, self._cos, out=translation_y)
+        np.add(translation_y, self._temp, out=translation_y)
+
+    def evaluate(self, positions: np.ndarray, out: np.ndarray):
+        """
+        由粒子位置计算各输出在缩放前的值 (不产生堆分配)
+
+        :param positions: 展平后的粒子位置
+        :param out: 输出值，X/Y 输出为位移，Angle 输出为相对父粒子方向的弧度
+        """
+        translation_x, translation_y, parent_x, parent_y = self._translation_x, self._translation_y, self._parent_x, self._parent_y
+        np.dot(self.translation_x_matrix, positions, out=translation_x)
+        np.dot(self.translation_y_matrix, positions, out=translation_y)
+        np.dot(self.parent_x_matrix, positions, out=parent_x)
+        np.dot(self.parent_y_matrix, positions, out=parent_y)
+        np.add(parent_x, self.parent_offset_x, out=parent_x)
+        np.add(parent_y, self.parent_offset_y, out=parent_y)
+
+        # 角度差归一化到 [-pi, pi)
+        np.arctan2(translation_y, translation_x, out=self._angle)
+        np.arctan2(parent_y, parent_x, out=self._output_temp)
+        np.subtract(self._angle, self._output_temp, out=self._angle)
+        np.add(self._angle, self._pi, out=self._angle)
+        np.mod(self._angle, self._two_pi, out=self._angle)
+        np.subtract(self._angle, self._pi, out=self._angle)
+
+        np.multiply(translation_x, self.is_x, out=out)
+        np.multiply(translation_y, self.is_y, out=self._output_temp)
+        np.add(out, self._output_temp, out=out)
+        np.multiply(self._angle, self.is_angle, out=self._output_temp)
+        np.add(out, self._output_temp, out=out)
+        np.multiply(out, self.output_sign, out=out)
+
+    def scatter(self, output_values: np.ndarray, param_values: np.ndarray):
+        """
+        输出值乘以 Scale 后限制在参数范围内，按 Weight 与参数当前值混合并写回稠密参数向量 (不产生堆分配)
+
+        :param output_values: evaluate 计算的输出值，运算中会被改写
+        """
+        np.multiply(output_values, self.output_scale, out=output_values)
+        np.minimum(output_values, self.output_maximum, out=output_values)
+        np.maximum(output_values, self.output_minimum, out=output_values)
+        np.multiply(output_values, self.output_weight, out=output_values)
+        np.dot(self.output_select, param_values, out=self._current_values)
+        np.multiply(self._current_values, self.output_keep, out=self._current_values)
+        np.add(output_values, self._current_values, out=output_values)
+        param_values.put(self.output_indices, output_values)
+
+class PhysicsWorld:
+    _shared: dict = {}
+
+    def __init__(self, fps: float = 60, max_substeps: int = 4):
+        """
+        物理世界：多个模型注册各自的 PhysicsSetting 后，所有粒子链打包在同一个批量模拟器中，
+        每帧一次批量更新推进全部模型，各模型占据状态数组中连续的一段粒子链
+
+        :param fps: 固定物理步长的帧率
+        :param max_substeps: 每次推进的最大子步数
+        """
+        self.physics_delta = 1 / (fps if fps and fps > 0 else 60)
+        self.max_substeps = max_substeps
+        self.accumulator = 0.0
+        self.instances: list[Live2DPhysics] = []
+        self.simulator: BatchedPhysicsSimulator = None
+        self.alpha = np.zeros((), dtype=np.float32)
+
+    @classmethod
+    def shared(cls, fps: float = 60) -> "PhysicsWorld":
+        """获取进程内共享的物理世界，物理帧率相同的模型共用同一个世界"""
+        if fps not in cls._shared:
+            cls._shared[fps] = cls(fps)
+        return cls._shared[fps]
 
-    def inertial_simulation(self, velocity: list, delta_t: float):
+    def register(self, instance: "Live2DPhysics"):
+        """注册模型，其粒子链追加到状态数组末尾"""
+        if instance not in self.instances:
+            self.instances.append(instance)
+            self._rebuild()
+
+    def unregister(self, instance: "Live2DPhysics"):
+        """注销模型，其余模型的运动状态保持不变"""
+        if instance in self.instances:
+            self.instances.remove(instance)
+            self._rebuild()
+
+    def is_leader(self, instance: "Live2DPhysics") -> bool:
+        """第一个注册的模型负责推进整个世界"""
+        return self.instances[0] is instance
+
+    def _rebuild(self):
+        """按注册顺序重建批量模拟器与缓冲区，并重新绑定各模型的视图"""
+        old_simulator, old_ranges = self.simulator, [instance.strand_range for instance in self.instances]
+        strands = [strand for instance in self.instances for strand in instance.strands]
+        if not strands:
+            self.simulator = None
+            return
+
+        self.simulator = BatchedPhysicsSimulator(strands, air_resistance=AIR_RESISTANCE)
+        strand_num = len(strands)
+
+        # 输入缓冲区的三行依次为根节点 x 位移、y 位移与重力旋转角度
+        self.input_target = np.zeros((3, strand_num), dtype=np.float32)
+        self.input_last = np.zeros((3, strand_num), dtype=np.float32)
+        self.input_delta = np.zeros((3, strand_num), dtype=np.float32)
+        self.input_now = np.zeros((3, strand_num), dtype=np.float32)
+        self.input_now_translation, self.input_now_angle = self.input_now[:2], self.input_now[2]
+        self.fraction = np.zeros((), dtype=np.float32)
+        self.positions = self.simulator._position.reshape(-1)
+
+        start = 0
+        for instance, old_range in zip(self.instances, old_ranges):
+            strand_range = slice(start, start + len(instance.strands))
+            if old_simulator is not None and old_range is not None:
+                self.simulator.copy_state_from(old_simulator, old_range, strand_range)
+                self.input_target[:, strand_range] = instance.input_target
+                self.input_last[:, strand_range] = instance.input_last
+            instance.bind(self, strand_range)
+            start = strand_range.stop
+
+    def advance(self, delta_t: float):
+        """
+        按固定步长推进所有模型，并更新渲染插值系数 (不产生堆分配)
+
+        :param delta_t: 距上一渲染帧的时间 (秒)
+        """
+        np.subtract(self.input_target, self.input_last, out=self.input_delta)
+
+        self.accumulator += delta_t
+        # 内置 min/max 会为参数构造元组，热路径中改用条件表达式
+        substeps = int((self.accumulator + 1e-9) / self.physics_delta)
+        substeps = substeps if substeps < self.max_substeps else self.max_substeps
+        substep = 1
+        while substep <= substeps:
+            # 一帧内多个子步时对输入做线性插值
+            self.fraction.fill(substep / substeps)
+            np.multiply(self.input_delta, self.fraction, out=self.input_now)
+            np.add(self.input_now, self.input_last, out=self.input_now)
+            np.copyto(self.simulator.translation, self.input_now_translation)
+            np.copyto(self.simulator.angle, self.input_now_angle)
+            self._step()
+            substep += 1
+        self.accumulator -= substeps * self.physics_delta
+        if self.accumulator >= self.physics_delta:
+            # 超出子步上限时丢弃积压时间，避免卡顿后连续追帧
+            self.accumulator %= self.physics_delta
+        np.copyto(self.input_last, self.input_target)
+
+        # 渲染时在最近两次物理状态之间插值
+        self.alpha.fill(self.accumulator / self.physics_delta if self.accumulator > 0 else 0.0)
+
+    def _step(self):
+        """以固定步长推进一次物理模拟，输入已写入 simulator 的缓冲区"""
         mass = 1
-        gravity = [- mass * velocity[0] / delta_t, - mass * velocity[1] / delta_t]
-        self.physics_simulator.change_gravity(gravity)
+        delta_t = self.physics_delta
+        index = 0
+        while index < len(self.instances):
+            # 各模型的拖动速度只影响自己的粒子链
+            instance = self.instances[index]
+            self.simulator.set_inertial_force(- mass * instance.velocity[0] / delta_t, - mass * instance.velocity[1] / delta_t,
+                                              instance.gravity_x, instance.gravity_y, instance.base_gravity[0], instance.base_gravity[1])
+            np.copyto(instance.previous_outputs, instance.current_outputs)
+            index += 1
+        if self.simulator.step(delta_t):
+            index = 0
+            while index < len(self.instances):
+                instance = self.instances[index]
+                instance.io_graph.evaluate(self.positions, out=instance.current_outputs)
+                index += 1
+
+class Live2DPhysics:
+    def __init__(self, model, model_params: dict, model_params_range: dict, physics_setting_count: int, physics_dictionary: list[dict], fps: float = 60, max_substeps: int = 4, world: PhysicsWorld = None, effective_forces: dict = None):
+        """
+        :param fps: 物理帧率 (physics3.json 的 Meta.Fps)，指定 world 时以 world 的帧率为准
+        :param world: 所在的物理世界，默认为独占的物理世界
+        :param effective_forces: physics3.json 的 Meta.EffectiveForces，包含 Gravity 与 Wind
+        """
+        self.model = model
+        self.model_params = model_params.copy()
+        self.model_params_range = model_params_range
+        self.physics_setting_count = physics_setting_count
+        self.world = world if world is not None else PhysicsWorld(fps, max_substeps)
+        self.strand_range: slice = None
+        self.velocity = [0.0, 0.0]
+
+        # 有效力：粒子链沿重力的反方向下垂 (与 Cubism SDK 的坐标系一致)
+        effective_forces = effective_forces or {}
+        gravity = effective_forces.get("Gravity", {"X": 0, "Y": -1})
+        wind = effective_forces.get("Wind", {"X": 0, "Y": 0})
+        self.gravity = [gravity["X"], gravity["Y"]]
+        self.wind = [wind["X"], wind["Y"]]
+        norm = math.hypot(*self.gravity) or 1
+        self.base_gravity = [- self.gravity[0] / norm, - self.gravity[1] / norm]
+
+        self.physics_settings: list[PhysicsSetting] = []
+        for item in physics_dictionary:
+            physics_setting = PhysicsSetting(item["Id"], item["Name"])
+            self.physics_settings.append(physics_setting)
+    
+    def set_physics_settings(self, physics_setting_params: list[dict]):
+        if len(physics_setting_params) is not self.physics_setting_count:
+            logging.error("PhysicsSettings 长度与 PhysicsSettingCount 不符，请检查 .physics3.json 文件")
+            return
+
+        for index, physics_setting_param in enumerate(physics_setting_params):
+            if physics_setting_param["Id"] == self.physics_settings[index].get_id():
+                self.physics_settings[index].add_input_param(physics_setting_param["Input"])
+                self.physics_settings[index].add_output_param(physics_setting_param["Output"])
+                self.physics_settings[index].set_normalization(physics_setting_param.get("Normalization", {}))
+                self.physics_settings[index].add_vertices(
+                    mobility=[item["Mobility"] for item in physics_setting_param["Vertices"]],
+                    delay=[item["Delay"] for item in physics_setting_param["Vertices"]],
+                    acceleration=[item["Acceleration"] for item in physics_setting_param["Vertices"]],
+                    radius=[item["Radius"] for item in physics_setting_param["Vertices"]])
+            else:
+                logging.warning("PhysicsSettings 顺序与 PhysicsDictionary 不一致，请检查 .physics3.json 文件")
+
+        # 编译输入输出表，参数向量顺序与 model_params_range 一致
+        self.param_ids = list(self.model_params_range.keys())
+        self.io_graph = PhysicsIOGraph(self.physics_settings, self.param_ids, self.model_params_range, self.gravity)
+        self.param_values = np.array([self.model_params.get(param_id, 0.0) for param_id in self.param_ids], dtype=np.float32)
+
+        # 最近两次物理步的输出，用于渲染插值
+        output_num = len(self.io_graph.output_ids)
+        self.previous_outputs = np.zeros(output_num, dtype=np.float32)
+        self.current_outputs = np.zeros(output_num, dtype=np.float32)
+        self.output_values = np.zeros(output_num, dtype=np.float32)
+
+        # 所有 PhysicsSetting 的粒子链注册进物理世界，与其他模型一起批量推进
+        self.strands = [dict(physics_setting.vertices, gravity=self.base_gravity) for physics_setting in self.physics_settings]
+        self.world.register(self)
+
+    def bind(self, world: PhysicsWorld, strand_range: slice):
+        """绑定本模型在物理世界状态数组中的粒子链范围，世界重建后由 PhysicsWorld 调用"""
+        is_new = self.strand_range is None
+        self.strand_range = strand_range
+        simulator = world.simulator
+        self.physics_simulator = simulator
+        self.input_target = world.input_target[:, strand_range]
+        self.input_last = world.input_last[:, strand_range]
+        self.target_x, self.target_y, self.target_angle = world.input_target[0, strand_range], world.input_target[1, strand_range], world.input_target[2, strand_range]
+        self.gravity_x = simulator.gravity[0, strand_range]
+        self.gravity_y = simulator.gravity[1, strand_range]
+        self.sleeping = simulator.sleeping[strand_range]
+        self.rest_frames = simulator.rest_frames[strand_range]
+        simulator.wind[0, strand_range] = self.wind[0]
+        simulator.wind[1, strand_range] = self.wind[1]
+        self.io_graph.bind_layout(simulator.max_count, simulator.strand_num, strand_range.start)
+        if is_new:
+            self.io_graph.evaluate(world.positions, out=self.current_outputs)
+            np.copyto(self.previous_outputs, self.current_outputs)
+
+    def _snapshot_extras(self) -> list:
+        """除粒子链外需要保存的本模型状态：输入目标值与最近两次物理步的输出"""
+        return [self.input_target, self.input_last, self.previous_outputs, self.current_outputs]
+
+    def snapshot(self) -> bytes:
+        """将本模型的完整物理状态打包为紧凑的二进制数据"""
+        simulator_blob = self.physics_simulator.snapshot(self.strand_range)
+        extras = np.concatenate([extra.ravel() for extra in self._snapshot_extras()]).astype("<f4")
+        return struct.pack("<I", len(simulator_blob)) + simulator_blob + extras.tobytes()
+
+    def restore(self, blob: bytes):
+        """从 snapshot() 的数据恢复本模型的物理状态，结构不符时抛出 ValueError"""
+        if len(blob) < 4:
+            raise ValueError("物理状态快照长度不符")
+        size, = struct.unpack_from("<I", blob)
+        extras = self._snapshot_extras()
+        if len(blob) != 4 + size + sum(extra.size for extra in extras) * 4:
+            raise ValueError("物理状态快照长度不符")
+        self.physics_simulator.restore(blob[4:4 + size], self.strand_range)
+        offset = 4 + size
+        for extra in extras:
+            extra[...] = np.frombuffer(blob, "<f4", extra.size, offset).reshape(extra.shape)
+            offset += extra.size * 4
+
+    def settle(self, max_steps: int = 600):
+        """
+        以当前参数、无拖动的状态静默推进物理直到本模型休眠，得到静止姿态并保存为 rest_pose
+
+        :param max_steps: 最多推进的物理步数
+        """
+        self.submit_inputs(self.param_values, [0.0, 0.0])
+        steps = 0
+        while not self.is_sleeping() and steps < max_steps:
+            self.world.advance(self.world.physics_delta)
+            steps += 1
+        self.rest_pose = self.snapshot()
+
+    def reset_to_rest(self):
+        """回到 settle() 得到的静止姿态，无需重新模拟预热帧"""
+        if getattr(self, "rest_pose", None) is None:
+            self.settle()
+        else:
+            self.restore(self.rest_pose)
+
+    def release(self):
+        """从物理世界中注销本模型"""
+        self.world.unregister(self)
+
+    def is_sleeping(self) -> bool:
+        """本模型的所有 PhysicsSetting 是否都已休眠 (输出不再变化)"""
+        return bool(self.sleeping.all())
+
+    def wake(self):
+        """立即唤醒本模型的物理模拟"""
+        self.sleeping[:] = False
+        self.rest_frames[:] = 0
+
+    def submit_inputs(self, param_values: np.ndarray, velocity: list):
+        """
+        将本模型的物理输入写入物理世界，随下一次 PhysicsWorld.advance 生效
+
+        :param param_values: 稠密参数向量，顺序与 self.param_ids 一致
+        :param velocity: 拖动速度
+        """
+        self.velocity = velocity
+        self.io_graph.gather(param_values, self.target_x, self.target_y, self.target_angle)
+
+    def apply_outputs(self, param_values: np.ndarray):
+        """在最近两次物理状态之间插值输出，并写回稠密参数向量"""
+        np.subtract(self.current_outputs, self.previous_outputs, out=self.output_values)
+        np.multiply(self.output_values, self.world.alpha, out=self.output_values)
+        np.add(self.output_values, self.previous_outputs, out=self.output_values)
+        self.io_graph.scatter(self.output_values, param_values)
+        return param_values
+
+    def update_param_values(self, param_values: np.ndarray, delta_t: float, velocity: list):
+        """
+        在稠密参数向量上更新物理，输出参数直接写回向量
+        只在预分配的缓冲区上运算，稳态下不产生堆分配
+
+        物理世界由第一个注册的模型推进，其余模型的输入在下一帧生效；
+        需要同帧生效时，可对所有模型依次调用 submit_inputs，再调用 PhysicsWorld.advance 与 apply_outputs
+
+        :param param_values: 稠密参数向量，顺序与 self.param_ids 一致
+        :param delta_t: 距上一渲染帧的时间 (秒)，物理内部按固定步长累加推进
+        :param velocity: 拖动速度
+        """
+        self.submit_inputs(param_values, velocity)
+        if self.world.is_leader(self):
+            self.world.advance(delta_t)
+        return self.apply_outputs(param_values)
+
+    def update_model_params(self, new_model_params: dict, delta_t: float, velocity: list):
+        """
+        :param new_model_params: 当前帧的模型参数
+        :param delta_t: 距上一渲染帧的时间 (秒)，物理内部按固定步长累加推进
+        :param velocity: 拖动速度
+        """
+        # 只读取物理输入涉及的参数，以及按 Weight 与物理结果混合的输出参数
+        self.param_values[self.io_graph.input_indices] = [new_model_params[param_id] for param_id in self.io_graph.input_ids]
+        self.param_values[self.io_graph.output_indices] = [new_model_params.get(param_id, 0.0) for param_id in self.io_graph.output_ids]
+        self.update_param_values(self.param_values, delta_t, velocity)
+
+        self.model_params.update(new_model_params)
+        self.model_params.update(zip(self.io_graph.output_ids, self.param_values[self.io_graph.output_indices].tolist()))
+
+        return self.model_params
@@ -0,0 +1,78 @@
+# 可选的渲染比例，自动模式在其中逐级调整
+RENDER_SCALES = (1.0, 0.875, 0.75, 0.625, 0.5)
+RENDER_BUDGET = 0.5         # 渲染耗时预算占帧间隔的比例
+RENDER_HEADROOM = 0.5       # 耗时低于 预算 * RENDER_HEADROOM 时提高渲染比例
+ADJUST_FRAMES = 30          # 连续超出或低于预算的帧数达到该值才调整，避免来回切换
+
+def parse_render_scale(value) -> tuple[float, bool]:
+    """
+    解析配置中的渲染比例
+
+    :param value: 0.5~1.0 的数值，或 "auto"
+    :return: (渲染比例, 是否自动调整)，自动模式从 1.0 开始
+    """
+    if isinstance(value, str) and value.lower() == "auto":
+        return 1.0, True
+    try:
+        return min(max(float(value), RENDER_SCALES[-1]), 1.0), False
+    except (TypeError, ValueError):
+        return 1.0, False
+
+class RenderScaler:
+    def __init__(self, scale: float = 1.0, auto: bool = False):
+        """
+        内部渲染比例：模型先以 窗口物理像素 * scale 的尺寸渲染，再线性插值放大到窗口；
+        自动模式按渲染耗时在 RENDER_SCALES 中逐级降低或恢复比例
+
+        :param scale: 固定的渲染比例，自动模式下为初始比例
+        :param auto: 是否按渲染耗时自动调整
+        """
+        self.scale = scale
+        self.auto = auto
+        self._over = 0      # 连续超出预算的帧数
+        self._under = 0     # 连续低于预算余量的帧数
+
+    def configure(self, scale: float, auto: bool):
+        self.scale = scale
+        self.auto = auto
+        self._over = self._under = 0
+
+    def render_size(self, width: int, height: int, device_pixel_ratio: float) -> tuple[int, int]:
+        """
+        :param width: 窗口宽度 (逻辑像素)
+        :param height: 窗口高度 (逻辑像素)
+        :return: 内部渲染尺寸 (物理像素)
+        """
+        scale = device_pixel_ratio * self.scale
+        return max(int(round(width * scale)), 1), max(int(round(height * scale)), 1)
+
+    def report(self, render_time: float, frame_interval: float) -> bool:
+        """
+        报告一帧的渲染耗时，自动模式下按需调整渲染比例
+
+        :param render_time: 本帧渲染耗时 (秒)
+        :param frame_interval: 目标帧间隔 (秒)
+        :return: 渲染比例是否改变
+        """
+        if not self.auto:
+            return False
+        budget = frame_interval * RENDER_BUDGET
+        if render_time > budget:
+            self._over += 1
+            self._under = 0
+        elif render_time < budget * RENDER_HEADROOM:
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = self._under = 0
+
+        index = min(range(len(RENDER_SCALES)), key=lambda i: abs(RENDER_SCALES[i] - self.scale))
+        if self._over >= ADJUST_FRAMES and index < len(RENDER_SCALES) - 1:
+            index += 1
+        elif self._under >= ADJUST_FRAMES and index > 0:
+            index -= 1
+        else:
+            return False
+        self.scale = RENDER_SCALES[index]
+        self._over = self._under = 0
+        return True
@@ -0,0 +1,99 @@
+import numpy as np
+import threading
+import logging
+import time
+
+WAKE_POLL = 0.05    # 模拟线程等待下一帧时检查唤醒的最长间隔 (秒)
+
+class FrameBuffer:
+    def __init__(self, param_num: int, slots: int = 3):
+        """
+        参数帧的三缓冲：模拟线程依次写入各缓冲区并发布，渲染线程复制最新发布的一帧
+
+        每个缓冲区带有序号，写入前置为 -1，写完后置为帧号；读取时在复制前后比较序号，
+        序号不一致说明复制期间被覆盖，重新读取 (seqlock)，双方都不需要加锁
+
+        :param param_num: 参数数量
+        :param slots: 缓冲区数量，写入方最近发布的一帧在之后 slots - 1 次写入内不会被覆盖
+        """
+        self.values = np.zeros((slots, param_num), dtype=np.float32)
+        self.times = np.zeros(slots, dtype=np.float64)
+        self.sequences = [-1] * slots
+        self.published = -1     # 最新发布的缓冲区
+        self._frame = 0
+
+    def write(self, values: np.ndarray, frame_time: float):
+        """
+        写入并发布一帧，只能由一个线程调用
+
+        :param values: 稠密参数向量
+        :param frame_time: 该帧的累计帧时间 (秒)
+        """
+        slot = (self.published + 1) % len(self.sequences)
+        self.sequences[slot] = -1
+        self.values[slot] = values
+        self.times[slot] = frame_time
+        self._frame += 1
+        self.sequences[slot] = self._frame
+        self.published = slot
+
+    def read(self, out: np.ndarray) -> tuple[int, float]:
+        """
+        把最新发布的一帧复制到 out
+
+        :return: (帧号, 累计帧时间)，尚未发布任何帧时帧号为 -1
+        """
+        while True:
+            slot = self.published
+            if slot < 0:
+                return -1, 0.0
+            sequence = self.sequences[slot]
+            if sequence >= 0:
+                out[...] = self.values[slot]
+                frame_time = float(self.times[slot])
+                if self.sequences[slot] == sequence:
+                    return sequence, frame_time
+            time.sleep(0)   # 写入方正在覆盖该缓冲区，让出 GIL 而不是空转
+
+class SimulationWorker(threading.Thread):
+    def __init__(self, l2d_manager, interval):
+        """
+        模拟线程：按帧间隔调用 l2d_manager.simulate() 计算动作、图层混合与物理，
+        结果写入 l2d_manager.frame_buffer，GUI 线程的 paintGL 只读取最新一帧并绘制
+
+        :param l2d_manager: Live2DManager
+        :param interval: 返回当前帧间隔 (秒) 的回调，与帧调度器的模式一致
+        """
+        super().__init__(name="Soyoc-simulation", daemon=True)
+        self.l2d_manager = l2d_manager
+        self.interval = interval
+        self._woken = False
+        self._stopped = False
+
+    def wake(self):
+        """立即开始下一帧，用于从低频模式恢复全速"""
+        self._woken = True
+
+    def stop(self):
+        """停止模拟线程并等待当前帧结束"""
+        self._stopped = True
+        if self.is_alive():
+            self.join()
+
+    def run(self):
+        while not self._stopped:
+            start = time.perf_counter()
+            if self.l2d_manager.is_loaded():
+                try:
+                    self.l2d_manager.simulate()
+                except Exception:
+                    logging.exception("参数模拟出错")
+
+            # time.sleep 在 Windows 上为高精度计时，分段等待以便及时响应唤醒
+            deadline = start + self.interval()
+            while not self._woken and not self._stopped:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                time.sleep(min(remaining, WAKE_POLL))
+            self._woken = False